@@ -0,0 +1,145 @@
+"""base schema of the paperless module
+
+Crea lo schema `paperless` con le tabelle della gerarchia dei documenti (categorie,
+utenze, anni, tipi di documento, documenti e path), i tag, le cartelle escluse
+dalla scansione e le scansioni in attesa. È la radice della catena delle migrazioni.
+
+Un database creato in precedenza con una migrazione 'init' generata localmente
+(vedi `setup.sh`) o con `Base.metadata.create_all` contiene già queste tabelle:
+va allineato alla catena con `alembic stamp 0c7d2e5a1f36` (vedi setup-dev.md)
+prima di eseguire `alembic upgrade head`.
+
+Revision ID: 0c7d2e5a1f36
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0c7d2e5a1f36'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tabelle con un nome univoco e indicizzato, nell'ordine di creazione
+NAMED_TABLES = ['categories', 'utilities', 'years', 'document_types', 'tags']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(sa.text("CREATE SCHEMA IF NOT EXISTS paperless"))
+
+    op.create_table(
+        'categories',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        schema='paperless'
+    )
+    op.create_table(
+        'utilities',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        schema='paperless'
+    )
+    op.create_table(
+        'years',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('name', sa.Integer(), nullable=False),
+        sa.CheckConstraint('name >= 2000', name='check_year_range'),
+        sa.PrimaryKeyConstraint('id'),
+        schema='paperless'
+    )
+    op.create_table(
+        'document_types',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.CheckConstraint("name IN ('paid', 'not_paid', 'default')", name='check_valid_document_type'),
+        sa.PrimaryKeyConstraint('id'),
+        schema='paperless'
+    )
+    op.create_table(
+        'tags',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        schema='paperless'
+    )
+    for table in NAMED_TABLES:
+        op.create_index(f'ix_paperless_{table}_name', table, ['name'], unique=True, schema='paperless')
+
+    op.create_table(
+        'documents',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('pages', sa.Integer(), nullable=True),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        schema='paperless'
+    )
+    op.create_table(
+        'paths',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('category', sa.Integer(), nullable=False),
+        sa.Column('utility', sa.Integer(), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('document_type', sa.Integer(), nullable=False),
+        sa.Column('document', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['category'], ['paperless.categories.id']),
+        sa.ForeignKeyConstraint(['utility'], ['paperless.utilities.id']),
+        sa.ForeignKeyConstraint(['year'], ['paperless.years.id']),
+        sa.ForeignKeyConstraint(['document_type'], ['paperless.document_types.id']),
+        sa.ForeignKeyConstraint(['document'], ['paperless.documents.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('category', 'utility', 'year', 'document_type', 'document',
+                            name='unique_path_constraint'),
+        schema='paperless'
+    )
+    op.create_table(
+        'document_tags',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['document_id'], ['paperless.documents.id']),
+        sa.ForeignKeyConstraint(['tag_id'], ['paperless.tags.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('document_id', 'tag_id', name='unique_document_tag'),
+        schema='paperless'
+    )
+    op.create_table(
+        'excluded_paths',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('reason', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        schema='paperless'
+    )
+    op.create_index('ix_paperless_excluded_paths_path', 'excluded_paths', ['path'], unique=True,
+                    schema='paperless')
+    op.create_table(
+        'pending_scans',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('category', sa.String(), nullable=False),
+        sa.Column('utility', sa.String(), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('document_type', sa.String(), nullable=False),
+        sa.Column('document', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        schema='paperless'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('pending_scans', 'excluded_paths', 'document_tags', 'paths', 'documents',
+                  *reversed(NAMED_TABLES)):
+        op.drop_table(table, schema='paperless')
@@ -0,0 +1,44 @@
+"""trigram indexes on category, utility and document names
+
+Abilita l'estensione pg_trgm e crea gli indici GIN sui nomi usati
+dalla ricerca fuzzy (`/api/paperless/search`).
+
+Revision ID: 3f1c2a9d7b10
+Revises: 0c7d2e5a1f36
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2a9d7b10'
+down_revision: Union[str, None] = '0c7d2e5a1f36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ['categories', 'utilities', 'documents']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(sa.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+    for table in TABLES:
+        op.create_index(
+            f'ix_{table}_name_trgm',
+            table,
+            ['name'],
+            schema='paperless',
+            postgresql_using='gin',
+            postgresql_ops={'name': 'gin_trgm_ops'},
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.drop_index(f'ix_{table}_name_trgm', table_name=table, schema='paperless')
@@ -0,0 +1,48 @@
+"""index of the files stored in document folders
+
+Crea la tabella `paperless.document_files`: per ogni file di una cartella documento
+il `Path` di appartenenza, dimensione, mtime e hash del contenuto (vedi `manage_database.files`).
+L'indice su `content_hash` serve alla ricerca dei duplicati.
+
+Revision ID: 5b2e8c41f0a3
+Revises: a83e5c07d2f4
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2e8c41f0a3'
+down_revision: Union[str, None] = 'a83e5c07d2f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'document_files',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('path_id', sa.Integer(), nullable=False),
+        sa.Column('filename', sa.String(), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('mtime_ns', sa.BigInteger(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('pages', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['path_id'], ['paperless.paths.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('path_id', 'filename', name='unique_document_file'),
+        schema='paperless'
+    )
+    op.create_index('ix_paperless_document_files_content_hash', 'document_files', ['content_hash'],
+                    schema='paperless')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_paperless_document_files_content_hash', table_name='document_files', schema='paperless')
+    op.drop_table('document_files', schema='paperless')
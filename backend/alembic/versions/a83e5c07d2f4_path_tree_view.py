@@ -0,0 +1,60 @@
+"""materialized view with resolved paths for tree browsing
+
+Crea la vista materializzata `paperless.path_tree`: una riga per ogni `Path`
+con gli id e i nomi dei cinque livelli e il path completo come stringa.
+La vista viene aggiornata dalla sincronizzazione (vedi `manage_database.views`).
+
+Revision ID: a83e5c07d2f4
+Revises: 3f1c2a9d7b10
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a83e5c07d2f4'
+down_revision: Union[str, None] = '3f1c2a9d7b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(sa.text("""
+        CREATE MATERIALIZED VIEW paperless.path_tree AS
+        SELECT
+            p.id,
+            p.category AS category_id,
+            p.utility AS utility_id,
+            p.year AS year_id,
+            p.document_type AS document_type_id,
+            p.document AS document_id,
+            c.name AS category,
+            u.name AS utility,
+            y.name::text AS year,
+            dt.name AS document_type,
+            d.name AS document,
+            concat_ws('/', c.name, u.name, y.name::text, dt.name, d.name) AS full_path
+        FROM paperless.paths p
+        JOIN paperless.categories c ON p.category = c.id
+        JOIN paperless.utilities u ON p.utility = u.id
+        JOIN paperless.years y ON p.year = y.id
+        JOIN paperless.document_types dt ON p.document_type = dt.id
+        JOIN paperless.documents d ON p.document = d.id
+        WITH DATA
+    """))
+
+    # Indice univoco: necessario per REFRESH MATERIALIZED VIEW CONCURRENTLY
+    op.create_index('ix_path_tree_id', 'path_tree', ['id'], unique=True, schema='paperless')
+    # Ricerca per prefisso (LIKE 'Banca/Enel/%') indipendente dalla collation
+    op.create_index('ix_path_tree_full_path', 'path_tree', ['full_path'], schema='paperless',
+                    postgresql_ops={'full_path': 'text_pattern_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(sa.text("DROP MATERIALIZED VIEW IF EXISTS paperless.path_tree"))
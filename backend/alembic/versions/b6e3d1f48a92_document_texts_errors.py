@@ -0,0 +1,36 @@
+"""failed text extractions are recorded and retried
+
+Aggiunge a `paperless.document_texts` l'ultimo errore di estrazione e il numero di
+tentativi falliti con lo stesso hash: un file la cui estrazione è fallita viene
+rielaborato dalle estrazioni successive, fino a `MAX_ATTEMPTS` tentativi
+(vedi `manage_database.extraction`).
+
+Revision ID: b6e3d1f48a92
+Revises: f3a8c2d91b07
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e3d1f48a92'
+down_revision: Union[str, None] = 'f3a8c2d91b07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('document_texts', sa.Column('error', sa.String(), nullable=True), schema='paperless')
+    op.add_column('document_texts', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+                  schema='paperless')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in ('attempts', 'error'):
+        op.drop_column('document_texts', column, schema='paperless')
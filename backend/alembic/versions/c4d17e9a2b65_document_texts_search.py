@@ -0,0 +1,48 @@
+"""extracted text of indexed files with full-text search
+
+Crea la tabella `paperless.document_texts` con il testo estratto dai file indicizzati
+(vedi `manage_database.extraction`) e la colonna generata `search_vector`,
+indicizzata con GIN per la ricerca full-text (`/api/paperless/search/text`).
+
+Revision ID: c4d17e9a2b65
+Revises: 5b2e8c41f0a3
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d17e9a2b65'
+down_revision: Union[str, None] = '5b2e8c41f0a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'document_texts',
+        sa.Column('file_id', sa.Integer(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('method', sa.String(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('search_vector', postgresql.TSVECTOR(),
+                  sa.Computed("to_tsvector('italian', content)", persisted=True), nullable=True),
+        sa.CheckConstraint("method IN ('text', 'ocr', 'none')", name='check_valid_extraction_method'),
+        sa.ForeignKeyConstraint(['file_id'], ['paperless.document_files.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('file_id'),
+        schema='paperless'
+    )
+    op.create_index('ix_document_texts_search_vector', 'document_texts', ['search_vector'],
+                    schema='paperless', postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_document_texts_search_vector', table_name='document_texts', schema='paperless')
+    op.drop_table('document_texts', schema='paperless')
@@ -0,0 +1,46 @@
+"""state of pending scans for the ingestion worker
+
+Aggiunge a `paperless.pending_scans` le colonne usate dall'archiviazione delle
+scansioni (vedi `manage_database.ingestion`): file della cartella di acquisizione,
+stato, tentativi falliti, ultimo errore e data di creazione.
+
+Revision ID: e91b6d4c3a27
+Revises: c4d17e9a2b65
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e91b6d4c3a27'
+down_revision: Union[str, None] = 'c4d17e9a2b65'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('pending_scans', sa.Column('filename', sa.String(), nullable=True), schema='paperless')
+    op.add_column('pending_scans', sa.Column('status', sa.String(), server_default='pending', nullable=False),
+                  schema='paperless')
+    op.add_column('pending_scans', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+                  schema='paperless')
+    op.add_column('pending_scans', sa.Column('error', sa.String(), nullable=True), schema='paperless')
+    op.add_column('pending_scans', sa.Column('created_at', sa.DateTime(timezone=True),
+                                             server_default=sa.text('now()'), nullable=False),
+                  schema='paperless')
+    op.create_check_constraint('check_valid_scan_status', 'pending_scans', "status IN ('pending', 'failed')",
+                               schema='paperless')
+    op.create_index('ix_paperless_pending_scans_status', 'pending_scans', ['status'], schema='paperless')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_paperless_pending_scans_status', table_name='pending_scans', schema='paperless')
+    op.drop_constraint('check_valid_scan_status', 'pending_scans', schema='paperless')
+    for column in ('created_at', 'error', 'attempts', 'status', 'filename'):
+        op.drop_column('pending_scans', column, schema='paperless')
@@ -0,0 +1,69 @@
+"""data generation counter bumped by triggers
+
+Crea la tabella `paperless.generations` con il contatore 'data' e i trigger che lo
+incrementano, una volta per transazione, a ogni scrittura nelle tabelle della gerarchia
+e dei tag, qualunque sia il processo che la esegue. Le cache del server confrontano
+il contatore con la generazione dei dati che contengono (vedi `paperless.generation`).
+
+I trigger sono `BEFORE ... FOR EACH STATEMENT`: il lock sulla riga del contatore viene
+preso prima dei lock sulle righe modificate, così che due transazioni in scrittura si
+mettano in coda sul contatore invece di bloccarsi a vicenda.
+
+Revision ID: f3a8c2d91b07
+Revises: e91b6d4c3a27
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8c2d91b07'
+down_revision: Union[str, None] = 'e91b6d4c3a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ['categories', 'utilities', 'years', 'document_types', 'documents', 'paths', 'tags', 'document_tags']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'generations',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('value', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('xact', sa.BigInteger(), nullable=True),
+        sa.PrimaryKeyConstraint('name'),
+        schema='paperless'
+    )
+    op.execute(sa.text("INSERT INTO paperless.generations (name) VALUES ('data')"))
+
+    # Le istruzioni successive della stessa transazione trovano `xact` già aggiornato
+    op.execute(sa.text("""
+        CREATE FUNCTION paperless.bump_data_generation() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE paperless.generations
+            SET value = value + 1, xact = txid_current()
+            WHERE name = 'data' AND xact IS DISTINCT FROM txid_current();
+            RETURN NULL;
+        END
+        $$
+    """))
+    for table in TABLES:
+        op.execute(sa.text(
+            f"CREATE TRIGGER {table}_data_generation "
+            f"BEFORE INSERT OR UPDATE OR DELETE OR TRUNCATE ON paperless.{table} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION paperless.bump_data_generation()"
+        ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.execute(sa.text(f"DROP TRIGGER IF EXISTS {table}_data_generation ON paperless.{table}"))
+    op.execute(sa.text("DROP FUNCTION IF EXISTS paperless.bump_data_generation()"))
+    op.drop_table('generations', schema='paperless')
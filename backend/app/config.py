@@ -40,6 +40,124 @@ def get_db_port():
     return os.getenv("DATABASE_PORT", "15432")
 
 
+def get_db_pool_size():
+    """
+    Restituisce il numero di connessioni mantenute aperte nel pool.
+
+    Legge la variabile d'ambiente DATABASE_POOL_SIZE, con fallback su 5.
+
+    Returns:
+        int: dimensione del pool.
+    """
+    return int(os.getenv("DATABASE_POOL_SIZE", "5"))
+
+
+def get_db_max_overflow():
+    """
+    Restituisce il numero di connessioni extra concesse oltre il pool nei picchi di carico.
+
+    Legge la variabile d'ambiente DATABASE_MAX_OVERFLOW, con fallback su 10.
+
+    Returns:
+        int: connessioni extra ammesse.
+    """
+    return int(os.getenv("DATABASE_MAX_OVERFLOW", "10"))
+
+
+def get_db_pool_pre_ping():
+    """
+    Restituisce True se le connessioni del pool vanno verificate prima dell'uso.
+
+    Legge la variabile d'ambiente DATABASE_POOL_PRE_PING, con fallback su 'true'.
+    Qualsiasi valore diverso da 'true' (case sensitive) sarà considerato False.
+
+    Returns:
+        bool: verifica delle connessioni abilitata o meno.
+    """
+    return os.getenv("DATABASE_POOL_PRE_PING", "true") == "true"
+
+
+def get_db_pool_recycle():
+    """
+    Restituisce dopo quanti secondi una connessione del pool viene sostituita.
+
+    Legge la variabile d'ambiente DATABASE_POOL_RECYCLE, con fallback su 1800.
+    Il valore -1 disabilita il ricambio.
+
+    Returns:
+        int: durata massima di una connessione in secondi.
+    """
+    return int(os.getenv("DATABASE_POOL_RECYCLE", "1800"))
+
+
+def get_cache_backend():
+    """
+    Restituisce il backend della cache delle risposte.
+
+    Legge la variabile d'ambiente CACHE_BACKEND, con fallback su 'memory':
+    - 'memory': cache LRU nel processo;
+    - 'redis': server Redis (o compatibile) indicato da REDIS_URL;
+    - 'local': sostituto in memoria di Redis, utile per sviluppo e test.
+
+    Returns:
+        str: nome del backend.
+    """
+    return os.getenv("CACHE_BACKEND", "memory")
+
+
+def get_redis_url():
+    """
+    Restituisce l'indirizzo del server Redis usato dalla cache delle risposte.
+
+    Legge la variabile d'ambiente REDIS_URL, con fallback su 'redis://localhost:6379/0'.
+
+    Returns:
+        str: URL di connessione a Redis.
+    """
+    return os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+def get_data_generation_ttl():
+    """
+    Restituisce per quanti secondi la generazione dei dati letta dal database viene
+    riusata prima di rileggerla: è il ritardo massimo con cui le cache del server
+    vedono le modifiche fatte da un altro processo (es. una sincronizzazione da riga di comando).
+
+    Legge la variabile d'ambiente DATA_GENERATION_TTL, con fallback su 1.
+
+    Returns:
+        float: durata in secondi.
+    """
+    return float(os.getenv("DATA_GENERATION_TTL", "1"))
+
+
+def get_preview_cache_size():
+    """
+    Restituisce lo spazio massimo su disco occupato dalla cache delle anteprime.
+
+    Legge la variabile d'ambiente PREVIEW_CACHE_SIZE (in MB), con fallback su 512.
+    Oltre questa soglia le anteprime usate meno di recente vengono eliminate.
+
+    Returns:
+        int: dimensione massima della cache in byte.
+    """
+    return int(os.getenv("PREVIEW_CACHE_SIZE", "512")) * 1024 * 1024
+
+
+def get_preview_prewarm():
+    """
+    Restituisce True se le anteprime dei path creati da una sincronizzazione
+    vanno generate subito, invece che alla prima richiesta.
+
+    Legge la variabile d'ambiente PREVIEW_PREWARM, con fallback su 'false'.
+    Qualsiasi valore diverso da 'true' (case sensitive) sarà considerato False.
+
+    Returns:
+        bool: pre-generazione delle anteprime abilitata o meno.
+    """
+    return os.getenv("PREVIEW_PREWARM", "false") == "true"
+
+
 def get_cors_origins():
     """
     Recupera l'indirizzo del frontend per l'header CORS.
@@ -56,4 +174,13 @@ def get_cors_origins():
 DEBUG_MODE = get_debug_mode()
 DATABASE_NAME = get_db_name()
 DATABASE_PORT = get_db_port()
+DATABASE_POOL_SIZE = get_db_pool_size()
+DATABASE_MAX_OVERFLOW = get_db_max_overflow()
+DATABASE_POOL_PRE_PING = get_db_pool_pre_ping()
+DATABASE_POOL_RECYCLE = get_db_pool_recycle()
 FRONTEND_ADDRESS = get_cors_origins()
+CACHE_BACKEND = get_cache_backend()
+REDIS_URL = get_redis_url()
+DATA_GENERATION_TTL = get_data_generation_ttl()
+PREVIEW_CACHE_SIZE = get_preview_cache_size()
+PREVIEW_PREWARM = get_preview_prewarm()
@@ -1,19 +1,54 @@
 # backend/app/database.py
+import asyncio
+from contextlib import contextmanager
 from getpass import getuser
+from typing import Iterator
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+
+from app.config import DATABASE_MAX_OVERFLOW, DATABASE_NAME, DATABASE_POOL_PRE_PING, DATABASE_POOL_RECYCLE, \
+    DATABASE_POOL_SIZE, DATABASE_PORT
 
-from app.config import DATABASE_NAME, DATABASE_PORT
+# L'engine asincrono è opzionale: richiede il driver asyncpg
+try:
+    import asyncpg  # noqa: F401
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+except ImportError:
+    create_async_engine = None
 
 # Configura l'URL del database
 DATABASE_URL = f"postgresql://{getuser()}@localhost:{DATABASE_PORT}/{DATABASE_NAME}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{getuser()}@localhost:{DATABASE_PORT}/{DATABASE_NAME}"
+
+# Impostazioni del pool di connessioni, condivise dall'engine sincrono e da quello asincrono.
+# La sincronizzazione, il watcher e le richieste HTTP usano ciascuno la propria
+# sessione, quindi il pool deve coprire almeno questi utilizzi contemporanei.
+POOL_OPTIONS = {
+    'pool_size': DATABASE_POOL_SIZE,
+    'max_overflow': DATABASE_MAX_OVERFLOW,
+    'pool_pre_ping': DATABASE_POOL_PRE_PING,  # scarta le connessioni chiuse dal server prima di usarle
+    'pool_recycle': DATABASE_POOL_RECYCLE,
+}
 
 # Crea l'engine per la connessione al database
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **POOL_OPTIONS)
 
 # Configura la sessione
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine e sessioni asincroni: le richieste in sola lettura non occupano un thread
+# del threadpool di FastAPI per tutta la durata della query
+if create_async_engine is not None:
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **POOL_OPTIONS)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+else:
+    async_engine = None
+    AsyncSessionLocal = None
+
+# Event loop a cui appartengono le connessioni del pool asincrono
+_async_loop = None
+
 # Crea la classe base per i modelli
 Base = declarative_base()
 
@@ -25,3 +60,51 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Dependency per la connessione asincrona al database
+async def get_async_db():
+    global _async_loop
+
+    if AsyncSessionLocal is None:
+        raise RuntimeError("asyncpg non è installato. Usa `pip install asyncpg`.")
+
+    # Le connessioni asyncpg sono utilizzabili solo dall'event loop che le ha aperte:
+    # se il loop cambia (es. il TestClient, che ne usa uno per richiesta) il pool
+    # viene sostituito, abbandonando senza chiuderle le connessioni del loop precedente
+    loop = asyncio.get_running_loop()
+    if loop is not _async_loop:
+        if _async_loop is not None:
+            await async_engine.dispose(close=False)
+        _async_loop = loop
+
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Dependency per gli endpoint di sola lettura: la sessione asincrona se asyncpg è
+# installato, altrimenti quella sincrona (vedi `routers.functions.run_read`)
+get_read_db = get_async_db if AsyncSessionLocal is not None else get_db
+
+
+# Unità di lavoro per il codice eseguito fuori dalle richieste HTTP (sincronizzazione, watcher, CLI)
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """
+    Apre una sessione dedicata e ne delimita la transazione:
+    commit all'uscita dal blocco, rollback in caso di eccezione, chiusura in ogni caso
+    (la connessione torna al pool).
+
+    Esempio:
+        with session_scope() as db:
+            db.add(obj)
+    """
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -4,6 +4,7 @@
 Punto di ingresso principale per l'app FastAPI.
 
 - Configura logging colorato in modalità sviluppo.
+- Usa orjson per serializzare le risposte.
 - Imposta il middleware CORS.
 - Blocca le richieste HTTP con origin non autorizzato.
 - Espone la rotta di test '/'.
@@ -11,6 +12,7 @@ Punto di ingresso principale per l'app FastAPI.
 
 from app.logger import configure_logging, logger
 from fastapi import FastAPI, Request, HTTPException
+from app.responses import ORJSONResponse
 from app.config import DEBUG_MODE, DATABASE_NAME, FRONTEND_ADDRESS
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import api_router
@@ -24,7 +26,9 @@ app = FastAPI(
     version="1.0.0",
     description="API per gestione domestica",
     docs_url="/docs",  # puoi personalizzare anche questo
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    # orjson serializza molto più velocemente di json.dumps, soprattutto sugli elenchi lunghi
+    default_response_class=ORJSONResponse
 )
 
 logger.info("Server started.")
@@ -40,6 +44,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Header letti dal frontend: paginazione, validazione della cache e nome dei file scaricati
+    expose_headers=["X-Next-After-Id", "X-Total-Count", "ETag", "Last-Modified", "Content-Disposition"],
 )
 
 logger.info(f"CORS abilitato per gli indirizzi: {allowed_origins}")
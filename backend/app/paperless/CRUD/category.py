@@ -12,8 +12,8 @@ def get_category_by_id(category_id: int, db: Session, *, attrs: list[str] = None
     return get_one(db, Category, category_id, attrs=attrs)
 
 
-def get_all_categories(db: Session, *, attrs: list[str] = None):
-    return get_all(db, Category, attrs=attrs)
+def get_all_categories(db: Session, *, attrs: list[str] = None, after_id: int = None, limit: int = None):
+    return get_all(db, Category, attrs=attrs, after_id=after_id, limit=limit)
 
 
 # ------------------------------ UPDATE --------------------------------
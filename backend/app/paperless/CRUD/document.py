@@ -1,18 +1,89 @@
+from sqlalchemy import func, insert, select
 from sqlalchemy.orm import Session
 
-from app.paperless.models import Document
-from app.paperless.routers.functions import get_one, get_all
+from app.paperless.CRUD.loaders import loader_options
+from app.paperless.manage_database.hooks import run_sync_hooks
+from app.paperless.manage_database.identity import identity_map
+from app.paperless.manage_database.plan import SyncPlan
+from app.paperless.manage_database.utils import lock_sync
+from app.paperless.models import Document, DocumentTag, Tag
+from app.paperless.routers.functions import batch_result, get_one, get_all, try_except
+from app.paperless.schema.creation import DocumentCreationSchema
 
 # ------------------------------ CREATE --------------------------------
 
+@try_except
+def create_documents(db: Session, documents: list[DocumentCreationSchema]) -> dict:
+    """
+    Crea più documenti in un'unica transazione, con una SELECT per i nomi già presenti
+    e un'unica INSERT multi-riga per i nuovi, sotto il lock della sincronizzazione.
+
+    Come nella sincronizzazione, il nome identifica il documento: un nome già presente
+    nel database (o ripetuto nella richiesta) non viene duplicato e il suo esito è 'existing'.
+
+    :param db: Sessione del database.
+    :param documents: Documenti da creare.
+    :return: Riepilogo con l'esito di ogni elemento (vedi `BatchResultSchema`).
+    """
+    names = list(dict.fromkeys(document.name for document in documents))
+    existing = {}
+    if names:
+        # Il nome dei documenti non ha un vincolo di unicità: fino al commit nessun'altra
+        # creazione o sincronizzazione può inserire gli stessi nomi tra la SELECT e la INSERT
+        lock_sync(db)
+        statement = select(Document.name, func.min(Document.id)).where(Document.name.in_(names)).group_by(Document.name)
+        existing = dict(db.execute(statement).all())
+
+    # Il primo elemento con un nome nuovo viene inserito, gli eventuali ripetuti vi fanno riferimento
+    new = {}
+    for document in documents:
+        if document.name not in existing:
+            new.setdefault(document.name, document)
+
+    created = {}
+    if new:
+        statement = insert(Document).values([document.model_dump() for document in new.values()]) \
+            .returning(Document.name, Document.id)
+        created = dict(db.execute(statement).all())
+        for name, obj_id in created.items():
+            identity_map.add(db, Document, name, obj_id)
+    db.commit()
+
+    results = []
+    for index, document in enumerate(documents):
+        if document.name in created and new[document.name] is document:
+            results.append({'index': index, 'status': 'created', 'id': created[document.name]})
+        else:
+            results.append({'index': index, 'status': 'existing',
+                            'id': existing.get(document.name, created.get(document.name))})
+
+    run_sync_hooks(SyncPlan.from_dict({'create': {'document': sorted(created)}}))
+    return batch_result(results)
+
 # ------------------------------ READ --------------------------------
 
 def get_document_by_id(document_id: int, db: Session, *, attrs: list[str] = None):
-    return get_one(db, Document, document_id, attrs=attrs)
+    return get_one(db, Document, document_id, attrs=attrs, options=loader_options('document'))
+
+
+def tag_names():
+    """
+    Sottoquery correlata con i nomi dei tag di ogni documento, come array (vuoto se non ce ne sono).
+    Permette di restituire i tag insieme a una proiezione, senza caricare la relazione `Document.tags`.
+    """
+    return func.array(
+        select(Tag.name)
+        .join(DocumentTag, DocumentTag.tag_id == Tag.id)
+        .where(DocumentTag.document_id == Document.id)
+        .order_by(Tag.name)
+        .scalar_subquery()
+    ).label('tags')
 
 
-def get_all_documents(db: Session, *, attrs: list[str] = None):
-    return get_all(db, Document, attrs=attrs)
+def get_all_documents(db: Session, *, attrs: list[str] = None, after_id: int = None, limit: int = None,
+                      with_tags: bool = False):
+    return get_all(db, Document, attrs=attrs, after_id=after_id, limit=limit,
+                   options=loader_options('document'), extra=(tag_names(),) if with_tags else ())
 
 # ------------------------------ UPDATE --------------------------------
 
@@ -0,0 +1,78 @@
+# backend/app/paperless/CRUD/file.py
+import os
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.paperless.manage_database.core import path_labels_statement
+from app.paperless.manage_database.views import ensure_path_tree
+from app.paperless.models import DocumentFile, Path, path_tree
+from app.paperless.routers.functions import try_except
+
+# ------------------------------ READ --------------------------------
+
+@try_except
+def get_file(db: Session, file_id: int, root) -> dict:
+    """
+    Restituisce un file indicizzato con il suo percorso assoluto nell'archivio.
+
+    :param db: Sessione del database.
+    :param file_id: ID del file in `document_files`.
+    :param root: Root dell'archivio.
+    :return: Dizionario con location, filename, size, mtime_ns e content_hash.
+    :raises HTTPException: 404 se il file non è indicizzato.
+    """
+    statement = (
+        path_labels_statement()
+        .add_columns(DocumentFile.filename, DocumentFile.size, DocumentFile.mtime_ns, DocumentFile.content_hash)
+        .join(DocumentFile, DocumentFile.path_id == Path.id)
+        .where(DocumentFile.id == file_id)
+    )
+    row = db.execute(statement).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail='"DocumentFile" non trovato')
+
+    *parts, filename, size, mtime_ns, content_hash = row
+    return {
+        'location': os.path.join(root, *map(str, parts), filename),
+        'filename': filename,
+        'size': size,
+        'mtime_ns': mtime_ns,
+        'content_hash': content_hash,
+    }
+
+
+@try_except
+def get_duplicates(db: Session, *, min_size: int = 0) -> list[dict]:
+    """
+    Raggruppa per hash del contenuto i file indicizzati presenti in più copie,
+    con un'unica query: il numero di copie viene calcolato da una window function
+    sull'indice `content_hash`, il path di ogni copia viene letto dalla vista `path_tree`.
+
+    :param db: Sessione del database.
+    :param min_size: Dimensione minima (in byte) dei file da considerare.
+    :return: Gruppi di copie, dal più pesante: hash, dimensione, numero di copie e file.
+    """
+    copies = func.count().over(partition_by=DocumentFile.content_hash).label('copies')
+    files = (
+        select(DocumentFile.id, DocumentFile.path_id, DocumentFile.filename, DocumentFile.size,
+               DocumentFile.content_hash, copies)
+        .where(DocumentFile.size >= min_size)
+        .subquery()
+    )
+    statement = (
+        select(files, path_tree.c.full_path.label('path'))
+        .outerjoin(path_tree, path_tree.c.id == files.c.path_id)
+        .where(files.c.copies > 1)
+        .order_by(files.c.size.desc(), files.c.content_hash, files.c.id)
+    )
+
+    ensure_path_tree()
+    groups = {}
+    for row in db.execute(statement):
+        group = groups.setdefault(row.content_hash, {
+            'content_hash': row.content_hash, 'size': row.size, 'count': row.copies, 'files': []
+        })
+        group['files'].append({'id': row.id, 'path_id': row.path_id, 'path': row.path, 'filename': row.filename})
+    return list(groups.values())
@@ -0,0 +1,34 @@
+# backend/app/paperless/CRUD/loaders.py
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.paperless.models import Document, Path
+
+# Profili di caricamento delle relazioni, applicati dal CRUD per endpoint.
+# Senza un profilo le relazioni sono lazy: serializzarle costa una query per riga.
+#
+# - selectinload: una query aggiuntiva (WHERE id IN (...)) per l'intera pagina,
+#   adatta alle relazioni molti-a-molti come i tag;
+# - joinedload: JOIN nella query principale, adatta alle relazioni molti-a-uno
+#   come i cinque livelli di un path.
+LOADER_PROFILES = {
+    'document': (
+        selectinload(Document.tags),
+    ),
+    'path': (
+        joinedload(Path.category_rel),
+        joinedload(Path.utility_rel),
+        joinedload(Path.year_rel),
+        joinedload(Path.document_type_rel),
+        joinedload(Path.document_rel),
+    ),
+}
+
+
+def loader_options(profile: str) -> tuple:
+    """
+    Restituisce le opzioni di caricamento del profilo indicato.
+
+    :param profile: Nome del profilo (chiave di `LOADER_PROFILES`).
+    :return: Tupla di opzioni da passare a `query.options()`.
+    """
+    return LOADER_PROFILES[profile]
@@ -0,0 +1,182 @@
+# backend/app/paperless/CRUD/path.py
+from typing import Union
+
+from fastapi import HTTPException
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.paperless.CRUD.loaders import loader_options
+from app.paperless.downloads import archive_location
+from app.paperless.manage_database.bulk import bulk_insert_names
+from app.paperless.manage_database.core import path_labels_statement
+from app.paperless.manage_database.hooks import run_sync_hooks
+from app.paperless.manage_database.identity import LEVEL_MODELS, identity_map
+from app.paperless.manage_database.plan import SyncPlan
+from app.paperless.manage_database.tree import DB_Tree
+from app.paperless.models import Path
+from app.paperless.routers.functions import batch_result, get_one, try_except
+from app.paperless.schema.creation import PathCreationSchema, PathLabelsCreationSchema
+
+# ------------------------------ CREATE --------------------------------
+
+def resolve_levels(db: Session, paths: list[Union[PathCreationSchema, PathLabelsCreationSchema]]):
+    """
+    Risolve i livelli dei path richiesti: i nomi (elementi `PathLabelsCreationSchema`)
+    tramite l'identity map dei livelli, gli id (elementi `PathCreationSchema`) con una
+    query per livello. I nomi non ancora presenti vengono creati con un'unica INSERT
+    multi-riga per livello.
+
+    :param db: Sessione del database.
+    :param paths: Path richiesti.
+    :return: Tupla (id → nome, nome → id, nomi creati), ciascuno indicizzato per livello.
+    """
+    names_by_id = {level: {} for level in DB_Tree.structure}
+    ids_by_name = {level: {} for level in DB_Tree.structure}
+    created = {level: [] for level in DB_Tree.structure}
+
+    for level, model in LEVEL_MODELS.items():
+        ids = {getattr(path, f'{level}_id') for path in paths if isinstance(path, PathCreationSchema)}
+        names = {str(getattr(path, level)) for path in paths if isinstance(path, PathLabelsCreationSchema)}
+
+        if ids:
+            # Gli id indicati dal client vanno verificati, e servono i nomi per gli hook
+            for obj_id, name in db.execute(select(model.id, model.name).where(model.id.in_(ids))):
+                names_by_id[level][obj_id] = str(name)
+
+        if names:
+            resolved = identity_map.resolve(db, model, names)
+            missing = sorted(names - resolved.keys())
+            if missing:
+                inserted = bulk_insert_names(db, model, missing)
+                for name, obj_id in inserted.items():
+                    identity_map.add(db, model, name, obj_id)
+                resolved.update(inserted)
+                created[level] = missing
+            ids_by_name[level].update(resolved)
+            names_by_id[level].update({obj_id: name for name, obj_id in resolved.items()})
+
+    return names_by_id, ids_by_name, created
+
+
+@try_except
+def create_paths(db: Session, paths: list[Union[PathCreationSchema, PathLabelsCreationSchema]]) -> dict:
+    """
+    Crea più path in un'unica transazione.
+
+    I livelli vengono risolti con `resolve_levels` (identity map, più un'INSERT per
+    livello con i nomi nuovi) e i path con un'unica `INSERT ... ON CONFLICT DO NOTHING` multi-riga;
+    i path già presenti vengono recuperati con una sola SELECT. Un id di livello inesistente
+    produce un esito 'error' per quell'elemento, senza annullare gli altri; un nome non
+    valido per un livello (es. un tipo documento non ammesso) annulla invece l'intera richiesta.
+
+    :param db: Sessione del database.
+    :param paths: Path da creare, per id dei livelli o per nome.
+    :return: Riepilogo con l'esito di ogni elemento (vedi `BatchResultSchema`).
+    """
+    try:
+        names_by_id, ids_by_name, created_names = resolve_levels(db, paths)
+    except IntegrityError as e:
+        db.rollback()
+        raise HTTPException(status_code=422, detail=f"Livelli non validi: {e.orig}")
+
+    results = []
+    keys = {}
+    for index, path in enumerate(paths):
+        if isinstance(path, PathCreationSchema):
+            key = tuple(getattr(path, f'{level}_id') for level in DB_Tree.structure)
+            missing = [level for level, obj_id in zip(DB_Tree.structure, key) if obj_id not in names_by_id[level]]
+            if missing:
+                detail = ', '.join(f'{level}_id={getattr(path, f"{level}_id")}' for level in missing)
+                results.append({'index': index, 'status': 'error', 'detail': f'Livelli non trovati: {detail}'})
+                continue
+        else:
+            key = tuple(ids_by_name[level][str(getattr(path, level))] for level in DB_Tree.structure)
+        keys[index] = key
+
+    columns = [getattr(Path, level) for level in DB_Tree.structure]
+    unique_keys = list(dict.fromkeys(keys.values()))
+    inserted, existing = {}, {}
+    if unique_keys:
+        statement = insert(Path).values([dict(zip(DB_Tree.structure, key)) for key in unique_keys]) \
+            .on_conflict_do_nothing().returning(Path.id, *columns)
+        try:
+            inserted = {tuple(key): path_id for path_id, *key in db.execute(statement)}
+        except IntegrityError as e:
+            # Un id della mappa eliminato da un altro processo: la mappa è già stata azzerata
+            db.rollback()
+            raise HTTPException(status_code=409, detail=f"Livelli modificati nel frattempo, riprovare: {e.orig}")
+
+        conflicts = [key for key in unique_keys if key not in inserted]
+        if conflicts:
+            statement = select(Path.id, *columns).where(tuple_(*columns).in_(conflicts))
+            existing = {tuple(key): path_id for path_id, *key in db.execute(statement)}
+    db.commit()
+
+    # Un path ripetuto nella richiesta risulta creato solo alla prima occorrenza
+    seen = set()
+    for index, key in keys.items():
+        if key in inserted and key not in seen:
+            results.append({'index': index, 'status': 'created', 'id': inserted[key]})
+        else:
+            results.append({'index': index, 'status': 'existing', 'id': inserted.get(key, existing.get(key))})
+        seen.add(key)
+
+    labels = [
+        '/'.join(names_by_id[level][obj_id] for level, obj_id in zip(DB_Tree.structure, key))
+        for key in inserted
+    ]
+    run_sync_hooks(SyncPlan.from_dict({'create': {**created_names, 'paths': sorted(labels)}}))
+    return batch_result(results)
+
+# ------------------------------ READ --------------------------------
+
+def get_path_by_id(path_id: int, db: Session):
+    # Il profilo 'path' carica i cinque livelli con un'unica query in JOIN
+    path = get_one(db, Path, path_id, options=loader_options('path'))
+    return {
+        'id': path.id,
+        'category': path.category_rel.name,
+        'utility': path.utility_rel.name,
+        'year': str(path.year_rel.name),
+        'document_type': path.document_type_rel.name,
+        'document': path.document_rel.name,
+    }
+
+
+@try_except
+def get_all_paths(db: Session, *, after_id: int = None, limit: int = None):
+    # Stessa JOIN usata dalla sincronizzazione (`get_all_path_labels`), con l'id del path
+    statement = path_labels_statement().add_columns(Path.id).order_by(Path.id).limit(limit)
+    if after_id is not None:
+        statement = statement.where(Path.id > after_id)
+
+    return [
+        {'id': path_id, **{level: str(name) for level, name in zip(DB_Tree.structure, names)}}
+        for *names, path_id in db.execute(statement)
+    ]
+
+
+@try_except
+def get_path_folder(db: Session, path_id: int, root) -> str:
+    """
+    Restituisce la cartella documento di un path nell'archivio.
+
+    :param db: Sessione del database.
+    :param path_id: ID del path.
+    :param root: Root dell'archivio.
+    :return: Percorso assoluto (risolto) della cartella.
+    :raises HTTPException: 404 se il path non esiste o se la sua cartella non è dentro l'archivio.
+    """
+    parts = db.execute(path_labels_statement().where(Path.id == path_id)).first()
+    if parts is None:
+        raise HTTPException(status_code=404, detail='"Path" non trovato')
+    folder = archive_location(root, *parts)
+    if folder is None:
+        raise HTTPException(status_code=404, detail="Cartella non trovata nell'archivio")
+    return folder
+
+# ------------------------------ UPDATE --------------------------------
+
+# ------------------------------ DELETE --------------------------------
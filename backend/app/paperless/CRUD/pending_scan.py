@@ -0,0 +1,95 @@
+# backend/app/paperless/CRUD/pending_scan.py
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.paperless.downloads import is_safe_filename
+from app.paperless.models import PendingScan
+from app.paperless.routers.functions import get_one, try_except
+from app.paperless.schema.creation import PendingScanCreationSchema
+
+# ------------------------------ CREATE --------------------------------
+
+@try_except
+def create_pending_scan(db: Session, scan: PendingScanCreationSchema) -> PendingScan:
+    """
+    Registra una scansione in attesa del file, da archiviare con `manage_database.ingestion`.
+
+    :param db: Sessione del database.
+    :param scan: Livelli del path di destinazione ed eventuale file della cartella di acquisizione.
+    :return: La voce creata.
+    :raises HTTPException: 400 se `filename` non è un semplice nome di file.
+    """
+    if scan.filename is not None and not is_safe_filename(scan.filename):
+        raise HTTPException(status_code=400, detail="Nome del file non valido")
+
+    pending_scan = PendingScan(**scan.model_dump())
+    db.add(pending_scan)
+    db.commit()
+    db.refresh(pending_scan)
+    return pending_scan
+
+# ------------------------------ READ --------------------------------
+
+@try_except
+def get_pending_scans(db: Session, *, status: Optional[str] = None) -> list[PendingScan]:
+    """
+    Restituisce le scansioni non ancora archiviate, dalla meno recente.
+
+    :param db: Sessione del database.
+    :param status: Se indicato, solo le voci con questo stato ('pending' o 'failed').
+    :return: Lista delle voci.
+    """
+    statement = select(PendingScan).order_by(PendingScan.id)
+    if status is not None:
+        statement = statement.where(PendingScan.status == status)
+    return list(db.execute(statement).scalars())
+
+# ------------------------------ UPDATE --------------------------------
+
+@try_except
+def retry_pending_scan(db: Session, scan_id: int) -> PendingScan:
+    """
+    Rimette in coda una scansione scartata, azzerando tentativi ed errore.
+
+    :param db: Sessione del database.
+    :param scan_id: ID della voce.
+    :return: La voce aggiornata.
+    :raises HTTPException: 404 se la voce non esiste, 409 se non è stata scartata.
+    """
+    pending_scan = get_one(db, PendingScan, scan_id)
+    if pending_scan.status != 'failed':
+        raise HTTPException(status_code=409, detail="La scansione è già in coda")
+    pending_scan.status = 'pending'
+    pending_scan.attempts = 0
+    pending_scan.error = None
+    db.commit()
+    db.refresh(pending_scan)
+    return pending_scan
+
+# ------------------------------ DELETE --------------------------------
+
+@try_except
+def delete_pending_scan(db: Session, scan_id: int):
+    """
+    Elimina una scansione in attesa. I suoi file restano nella cartella di acquisizione.
+
+    :param db: Sessione del database.
+    :param scan_id: ID della voce.
+    :raises HTTPException: 404 se la voce non esiste, 409 se è in corso di archiviazione.
+    """
+    try:
+        # Una voce bloccata da un worker di archiviazione non va attesa
+        pending_scan = db.execute(
+            select(PendingScan).where(PendingScan.id == scan_id).with_for_update(nowait=True)
+        ).scalar()
+    except OperationalError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Scansione in corso di archiviazione")
+    if pending_scan is None:
+        raise HTTPException(status_code=404, detail='"PendingScan" non trovato')
+    db.delete(pending_scan)
+    db.commit()
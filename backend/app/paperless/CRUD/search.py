@@ -0,0 +1,148 @@
+# backend/app/paperless/CRUD/search.py
+import base64
+import json
+from typing import Optional
+
+from sqlalchemy import Float, and_, cast, func, literal, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from app.paperless.manage_database.utils import escape_like
+from app.paperless.manage_database.views import ensure_path_tree
+from app.paperless.models import TEXT_SEARCH_CONFIG, Category, Document, DocumentFile, DocumentText, Utility, path_tree
+
+# Tabelle ricercabili, identificate dal campo `kind` dei risultati
+SEARCHABLE = {
+    'category': Category,
+    'utility': Utility,
+    'document': Document,
+}
+
+
+# ------------------------------ READ --------------------------------
+
+def encode_cursor(score: float, kind: str, obj_id: int) -> str:
+    """
+    Codifica la posizione dell'ultimo risultato restituito in un cursore opaco.
+
+    :param score: Punteggio dell'ultimo risultato.
+    :param kind: Tipo dell'ultimo risultato.
+    :param obj_id: ID dell'ultimo risultato.
+    :return: Cursore in base64 url-safe.
+    """
+    raw = json.dumps([score, kind, obj_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[float, str, int]:
+    """
+    Decodifica un cursore prodotto da `encode_cursor`.
+
+    :param cursor: Cursore ricevuto dal client.
+    :return: Tupla (punteggio, tipo, id).
+    :raises ValueError: Se il cursore non è valido.
+    """
+    try:
+        score, kind, obj_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(score), str(kind), int(obj_id)
+    except Exception as e:
+        raise ValueError(f"Cursore non valido: {cursor}") from e
+
+
+def search_names(db: Session, q: str, *, kinds: list[str], limit: int, cursor: Optional[str] = None) -> list:
+    """
+    Ricerca fuzzy sui nomi di categorie, utenze e documenti tramite `pg_trgm`.
+
+    Una riga corrisponde se contiene il testo cercato (`ILIKE '%q%'`, con '%' e '_'
+    di `q` presi alla lettera) o se gli
+    somiglia a livello di parola (`q <% name`); entrambe le condizioni sfruttano
+    gli indici GIN trigrammi. I risultati sono ordinati per punteggio decrescente,
+    poi per tipo e id, e paginati per chiave (keyset) a partire dal cursore.
+
+    :param db: Sessione del database.
+    :param q: Testo da cercare.
+    :param kinds: Tipi su cui cercare (chiavi di `SEARCHABLE`).
+    :param limit: Numero massimo di risultati.
+    :param cursor: Cursore dell'ultimo risultato della pagina precedente.
+    :return: Lista di righe (kind, id, name, score).
+    """
+    pattern = f"%{escape_like(q)}%"
+
+    branches = []
+    for kind in kinds:
+        model = SEARCHABLE[kind]
+        score = func.greatest(func.similarity(model.name, q), func.word_similarity(q, model.name))
+        branches.append(
+            select(
+                literal(kind).label('kind'),
+                model.id.label('id'),
+                model.name.label('name'),
+                cast(score, Float).label('score')
+            ).where(or_(model.name.ilike(pattern, escape='\\'), literal(q).op('<%')(model.name)))
+        )
+
+    results = union_all(*branches).subquery()
+    statement = select(results).order_by(results.c.score.desc(), results.c.kind, results.c.id).limit(limit)
+
+    if cursor:
+        score, kind, obj_id = decode_cursor(cursor)
+        statement = statement.where(or_(
+            results.c.score < score,
+            and_(results.c.score == score, or_(
+                results.c.kind > kind,
+                and_(results.c.kind == kind, results.c.id > obj_id)
+            ))
+        ))
+
+    return db.execute(statement).all()
+
+
+# Opzioni di `ts_headline` per gli estratti: al più due frammenti, termini evidenziati con <b>
+HEADLINE_OPTIONS = "MaxFragments=2, MaxWords=25, MinWords=10, StartSel=<b>, StopSel=</b>"
+
+
+def search_text(db: Session, q: str, *, limit: int, cursor: Optional[str] = None) -> list:
+    """
+    Ricerca full-text sul testo estratto dai file (vedi `manage_database.extraction`).
+
+    La query è interpretata con `websearch_to_tsquery` (virgolette per le frasi, `-` per
+    escludere un termine, `or`) e confrontata con la colonna `search_vector`, indicizzata
+    con GIN. I risultati sono ordinati per rilevanza (`ts_rank_cd`) e id del file e paginati
+    per chiave come `search_names`; gli estratti (`ts_headline`, costoso perché rilegge il
+    testo) vengono calcolati solo per le righe della pagina.
+
+    :param db: Sessione del database.
+    :param q: Testo da cercare.
+    :param limit: Numero massimo di risultati.
+    :param cursor: Cursore dell'ultimo risultato della pagina precedente.
+    :return: Lista di righe (file_id, path_id, path, filename, rank, snippet).
+    """
+    query = func.websearch_to_tsquery(TEXT_SEARCH_CONFIG, q)
+    rank = cast(func.ts_rank_cd(DocumentText.search_vector, query), Float)
+
+    page = (
+        select(DocumentText.file_id, rank.label('rank'))
+        .where(DocumentText.search_vector.op('@@')(query))
+        .order_by(rank.desc(), DocumentText.file_id)
+        .limit(limit)
+    )
+    if cursor:
+        score, _, file_id = decode_cursor(cursor)
+        page = page.where(or_(rank < score, and_(rank == score, DocumentText.file_id > file_id)))
+    page = page.subquery()
+
+    statement = (
+        select(
+            page.c.file_id,
+            DocumentFile.path_id,
+            path_tree.c.full_path.label('path'),
+            DocumentFile.filename,
+            page.c.rank,
+            func.ts_headline(TEXT_SEARCH_CONFIG, DocumentText.content, query, HEADLINE_OPTIONS).label('snippet')
+        )
+        .join(DocumentText, DocumentText.file_id == page.c.file_id)
+        .join(DocumentFile, DocumentFile.id == page.c.file_id)
+        .outerjoin(path_tree, path_tree.c.id == DocumentFile.path_id)
+        .order_by(page.c.rank.desc(), page.c.file_id)
+    )
+    ensure_path_tree()
+    return db.execute(statement).all()
@@ -0,0 +1,61 @@
+# backend/app/paperless/CRUD/stats.py
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.paperless.cache import TTLCache
+from app.paperless.generation import data_generation
+from app.paperless.manage_database.hooks import register_sync_hook
+from app.paperless.models import Category, DocumentType, Path, Utility, Year
+from app.paperless.routers.functions import try_except
+
+# Livelli per cui è possibile raggruppare o filtrare, con la relazione da unire a `paths`
+STATS_LEVELS = {
+    'category': (Category, Path.category_rel),
+    'utility': (Utility, Path.utility_rel),
+    'year': (Year, Path.year_rel),
+    'document_type': (DocumentType, Path.document_type_rel),
+}
+
+# Le voci sono indicizzate anche per generazione dei dati: dopo una modifica, anche fatta
+# da un altro processo, non sono più raggiungibili. La sincronizzazione libera la memoria
+stats_cache = TTLCache(ttl=300, maxsize=128)
+register_sync_hook(stats_cache.clear)
+
+
+# ------------------------------ READ --------------------------------
+
+@try_except
+def get_stats(db: Session, group_by: list[str], filters: dict[str, Optional[str]]) -> list[dict]:
+    """
+    Conta i documenti (righe di `paths`) raggruppandoli per i livelli indicati,
+    con un'unica query `GROUP BY`. Il risultato viene servito dalla cache finché
+    la generazione dei dati non cambia.
+
+    :param db: Sessione del database.
+    :param group_by: Livelli per cui raggruppare (chiavi di `STATS_LEVELS`), in ordine.
+    :param filters: Nome richiesto per ciascun livello; i valori None vengono ignorati.
+    :return: Lista di dizionari {livello: nome, ..., 'count': numero di documenti}.
+    """
+    filters = {level: value for level, value in filters.items() if value is not None}
+    # La generazione è letta prima della query: un risultato calcolato mentre i dati cambiano
+    # finisce sotto la generazione precedente, invece di sopravvivere allo svuotamento della cache
+    key = (data_generation.current(), tuple(group_by), tuple(sorted(filters.items())))
+    return stats_cache.get_or_set(key, lambda: _query_stats(db, group_by, filters))
+
+
+def _query_stats(db: Session, group_by: list[str], filters: dict[str, str]) -> list[dict]:
+    columns = [STATS_LEVELS[level][0].name.label(level) for level in group_by]
+    statement = select(*columns, func.count(Path.id).label('count')).select_from(Path)
+
+    # Unisce solo le tabelle necessarie al raggruppamento e ai filtri
+    for level in dict.fromkeys(group_by + list(filters)):
+        statement = statement.join(STATS_LEVELS[level][1])
+
+    for level, value in filters.items():
+        model = STATS_LEVELS[level][0]
+        statement = statement.where(model.name == (int(value) if model is Year else value))
+
+    statement = statement.group_by(*columns).order_by(*columns)
+    return [row._asdict() for row in db.execute(statement)]
@@ -0,0 +1,63 @@
+# backend/app/paperless/CRUD/tree.py
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.paperless.manage_database.tree import DB_Tree
+from app.paperless.manage_database.utils import escape_like
+from app.paperless.manage_database.views import ensure_path_tree
+from app.paperless.models import path_tree
+from app.paperless.routers.functions import try_except
+
+# ------------------------------ READ --------------------------------
+
+
+@try_except
+def get_tree_children(db: Session, prefix: tuple[str, ...]) -> list:
+    """
+    Restituisce i figli diretti di `prefix` nella gerarchia categoria → documento,
+    ciascuno con il numero di path (documenti) che contiene.
+
+    Usa la vista materializzata `path_tree`: il filtro `full_path LIKE 'prefisso/%'`
+    sfrutta l'indice `text_pattern_ops`, il raggruppamento avviene nella stessa query.
+    Se i dati sono cambiati dall'ultima generazione della vista, la vista viene prima rigenerata.
+
+    :param db: Sessione del database.
+    :param prefix: Nomi dei livelli già scelti (al più quattro).
+    :return: Lista di righe (name, id, count) ordinate per nome.
+    """
+    level = DB_Tree.structure[len(prefix)]
+    name_column = path_tree.c[level]
+    id_column = path_tree.c[f'{level}_id']
+
+    statement = (
+        select(name_column.label('name'), id_column.label('id'), func.count().label('count'))
+        .group_by(name_column, id_column)
+        .order_by(name_column)
+    )
+    if prefix:
+        pattern = escape_like('/'.join(prefix)) + '/%'
+        statement = statement.where(path_tree.c.full_path.like(pattern, escape='\\'))
+
+    ensure_path_tree()
+    return db.execute(statement).all()
+
+
+@try_except
+def get_paths_under(db: Session, prefix: tuple[str, ...]) -> list[tuple[str, ...]]:
+    """
+    Restituisce i path che iniziano con `prefix`, come tuple dei nomi dei cinque livelli,
+    usando la vista `path_tree` e il suo indice per prefisso.
+
+    :param db: Sessione del database.
+    :param prefix: Nomi dei primi livelli (almeno uno).
+    :return: Lista di tuple (categoria, utenza, anno, tipo documento, documento) ordinate per path.
+    """
+    columns = [path_tree.c[level] for level in DB_Tree.structure]
+    pattern = escape_like('/'.join(prefix)) + '/%'
+    statement = (
+        select(*columns)
+        .where(path_tree.c.full_path.like(pattern, escape='\\'))
+        .order_by(path_tree.c.full_path)
+    )
+    ensure_path_tree()
+    return [tuple(row) for row in db.execute(statement)]
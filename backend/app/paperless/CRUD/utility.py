@@ -11,8 +11,8 @@ def get_utility_by_id(utility_id: int, db: Session, *, attrs: list[str] = None):
     return get_one(db, Utility, utility_id, attrs=attrs)
 
 
-def get_all_utilities(db: Session, *, attrs: list[str] = None):
-    return get_all(db, Utility, attrs=attrs)
+def get_all_utilities(db: Session, *, attrs: list[str] = None, after_id: int = None, limit: int = None):
+    return get_all(db, Utility, attrs=attrs, after_id=after_id, limit=limit)
 
 
 # ------------------------------ UPDATE --------------------------------
@@ -8,4 +8,11 @@ paperless_router = APIRouter(prefix="/paperless", tags=["Paperless"])
 paperless_router.include_router(category_router)
 paperless_router.include_router(utility_router)
 paperless_router.include_router(document_router)
+paperless_router.include_router(path_router)
 paperless_router.include_router(form_router)
+paperless_router.include_router(sync_router)
+paperless_router.include_router(search_router)
+paperless_router.include_router(tree_router)
+paperless_router.include_router(stats_router)
+paperless_router.include_router(file_router)
+paperless_router.include_router(pending_scan_router)
\ No newline at end of file
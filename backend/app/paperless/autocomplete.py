@@ -0,0 +1,233 @@
+# backend/app/paperless/autocomplete.py
+
+"""
+Indice in memoria per l'autocompletamento del form di struttura (`/form/structure`).
+
+Le parole suggerite per il campo documento si ottengono dai nomi dei documenti
+con la stessa pipeline di pulizia usata in origine dal router (vedi `tokenize`).
+Invece di ricalcolarle a ogni richiesta, l'indice:
+- viene costruito alla prima richiesta leggendo una sola volta il database;
+- conta quante volte ciascuna parola compare nei nomi (reference count), così da
+  poter aggiungere e togliere documenti senza ricostruire tutto;
+- viene aggiornato dopo ogni sincronizzazione tramite un hook
+  (vedi `manage_database.hooks`);
+- viene scartato e ricaricato se la generazione dei dati (vedi `paperless.generation`)
+  è andata oltre quella da cui è stato costruito, per esempio dopo una
+  sincronizzazione lanciata da un altro processo;
+- espone una versione, usata come ETag dal router.
+
+Categorie e utenze sono tabelle piccole: vengono tenute in memoria e ricaricate
+solo se una sincronizzazione le ha modificate.
+"""
+
+import re
+import threading
+import uuid
+from bisect import bisect_left
+from collections import Counter
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.paperless import models
+from app.paperless.generation import data_generation
+from app.paperless.manage_database.hooks import register_sync_hook
+from app.paperless.manage_database.plan import SyncPlan
+
+# Documenti senza lettere: non producono parole
+HAS_LETTERS = re.compile(r"[a-zA-Z]")
+# Numeri, virgole, due punti, simboli dell'euro, parentesi, trattini e punti
+NOISE = re.compile(r"[\d,:€()\-.]")
+
+
+def tokenize(name: str) -> list[str]:
+    """
+    Estrae da un nome di documento le parole da suggerire.
+
+    Esempio:
+        tokenize("Bolletta Enel 12.03.2023 (luce)") → ['Bolletta', 'Enel', 'luce']
+    """
+    if not HAS_LETTERS.search(name):
+        return []
+
+    name = NOISE.sub("", name).strip()
+    # divide per spazi e scarta le parole con meno di 3 caratteri
+    return [word for word in name.split(" ") if len(word) > 2]
+
+
+class TokenIndex:
+    """
+    Vocabolario delle parole contenute in un insieme di nomi, aggiornabile in modo incrementale.
+
+    Attributi:
+        counts (Counter): per ogni parola, il numero di nomi che la contengono.
+    """
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self._vocabulary: Optional[list[str]] = None
+        self._folded: Optional[list[tuple[str, str]]] = None
+
+    def build(self, names: Iterable[str]):
+        """Ricostruisce l'indice da zero a partire da `names`."""
+        self.counts = Counter(token for name in names for token in tokenize(name))
+        self._invalidate()
+
+    def add(self, names: Iterable[str]):
+        """Aggiunge all'indice le parole dei nomi indicati."""
+        for name in names:
+            self.counts.update(tokenize(name))
+        self._invalidate()
+
+    def remove(self, names: Iterable[str]):
+        """Toglie dall'indice le parole dei nomi indicati, eliminando quelle non più usate."""
+        for name in names:
+            for token in tokenize(name):
+                self.counts[token] -= 1
+                if self.counts[token] <= 0:
+                    del self.counts[token]
+        self._invalidate()
+
+    def _invalidate(self):
+        self._vocabulary = None
+        self._folded = None
+
+    def vocabulary(self) -> list[str]:
+        """Restituisce le parole ordinate e senza duplicati."""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.counts)
+        return self._vocabulary
+
+    def search(self, prefix: str, limit: int) -> list[str]:
+        """
+        Restituisce al più `limit` parole che iniziano con `prefix`, senza distinzione
+        tra maiuscole e minuscole, tramite ricerca binaria sul vocabolario ordinato.
+        """
+        if self._folded is None:
+            self._folded = sorted((token.casefold(), token) for token in self.counts)
+
+        prefix = prefix.casefold()
+        start = bisect_left(self._folded, (prefix, ''))
+        result = []
+        for folded, token in self._folded[start:]:
+            if not folded.startswith(prefix) or len(result) >= limit:
+                break
+            result.append(token)
+        return result
+
+
+def _all_names(db: Session, model) -> list[str]:
+    """Restituisce i nomi di tutte le righe di `model`, in ordine di id."""
+    return db.execute(select(model.name).order_by(model.id)).scalars().all()
+
+
+class StructureIndex:
+    """
+    Dati di autocompletamento del form di struttura: categorie, utenze e parole dei documenti.
+
+    Il campo `etag` cambia a ogni modifica applicata da una sincronizzazione; include
+    un identificativo del processo, così che un ETag emesso prima di un riavvio non
+    venga mai considerato valido.
+
+    Attributi:
+        generation (Optional[int]): generazione dei dati da cui è stato caricato l'indice.
+    """
+
+    def __init__(self):
+        self.categories: Optional[list[str]] = None
+        self.utilities: Optional[list[str]] = None
+        self.documents: Optional[TokenIndex] = None
+        self.version = 0
+        self.generation: Optional[int] = None
+        self._epoch = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+
+    @property
+    def etag(self) -> str:
+        """ETag corrente. Scarta prima l'indice se i dati sono cambiati in un altro processo."""
+        with self._lock:
+            self._expire()
+            return self._tag()
+
+    def _tag(self) -> str:
+        return f'"{self._epoch}-{self.version}"'
+
+    def _reset(self):
+        self.categories = self.utilities = self.documents = None
+        self.generation = None
+        self.version += 1
+
+    def _expire(self):
+        """Scarta l'indice se la generazione dei dati è andata oltre quella da cui è stato caricato."""
+        if self.generation is not None and data_generation.current() > self.generation:
+            self._reset()
+
+    def _load(self, db: Session):
+        """Carica dal database le parti dell'indice non ancora presenti in memoria."""
+        self._expire()
+        if self.generation is None:
+            # Letta prima dei dati: al più l'indice verrà ricaricato una volta di troppo
+            self.generation = data_generation.current()
+        if self.categories is None:
+            self.categories = _all_names(db, models.Category)
+        if self.utilities is None:
+            self.utilities = _all_names(db, models.Utility)
+        if self.documents is None:
+            documents = TokenIndex()
+            documents.build(_all_names(db, models.Document))
+            self.documents = documents
+
+    def structure(self, db: Session) -> tuple[list[str], list[str], list[str], str]:
+        """Restituisce categorie, utenze, parole dei documenti ed ETag correnti, tra loro coerenti."""
+        with self._lock:
+            self._load(db)
+            return self.categories, self.utilities, self.documents.vocabulary(), self._tag()
+
+    def search(self, db: Session, field: str, prefix: str, limit: int) -> list[str]:
+        """Restituisce al più `limit` suggerimenti per `field` che iniziano con `prefix`."""
+        with self._lock:
+            self._load(db)
+            if field == 'document':
+                return self.documents.search(prefix, limit)
+
+            prefix = prefix.casefold()
+            names = self.categories if field == 'category' else self.utilities
+            return [name for name in names if name.casefold().startswith(prefix)][:limit]
+
+    def on_sync(self, changes: SyncPlan):
+        """
+        Hook di sincronizzazione: applica all'indice le modifiche salvate. Se dal caricamento
+        dell'indice i dati sono stati modificati anche da altre transazioni, lo scarta.
+        """
+        generation = data_generation.current()
+        with self._lock:
+            if self.generation is not None and generation > self.generation + 1:
+                self._reset()
+                return
+            if self.generation is not None:
+                self.generation = generation
+            changed = False
+
+            if changes.create.get('category') or changes.delete.get('category'):
+                self.categories = None
+                changed = True
+            if changes.create.get('utility') or changes.delete.get('utility'):
+                self.utilities = None
+                changed = True
+
+            created = changes.create.get('document', [])
+            removed = changes.delete.get('document', [])
+            if created or removed:
+                # Se l'indice non è ancora stato costruito lo sarà alla prossima richiesta
+                if self.documents is not None:
+                    self.documents.remove(removed)
+                    self.documents.add(created)
+                changed = True
+
+            if changed:
+                self.version += 1
+
+
+structure_index = StructureIndex()
+register_sync_hook(structure_index.on_sync)
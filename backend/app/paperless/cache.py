@@ -0,0 +1,230 @@
+# backend/app/paperless/cache.py
+
+"""
+Cache per i risultati delle query di sola lettura e per le risposte dei router.
+
+I dati del modulo paperless cambiano solo quando una sincronizzazione salva
+delle modifiche: le cache vengono quindi svuotate da un hook di sincronizzazione
+(vedi `manage_database.hooks`).
+
+La cache delle risposte (`ResponseCache`) è indicizzata per generazione dei dati,
+letta dal database (vedi `paperless.generation`): ogni transazione che modifica
+la gerarchia la incrementa, anche se eseguita da un altro processo, così le voci
+precedenti smettono di essere raggiungibili senza doverle cercare ed eliminare, e
+l'ETag di una risposta (generazione + richiesta) non dipende dal processo che la serve.
+I backend disponibili, che si limitano a conservare le voci, sono un LRU nel processo
+e Redis (o un server compatibile, oppure `LocalRedis`, il suo sostituto in memoria).
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from app.config import CACHE_BACKEND, REDIS_URL
+from app.logger import logger
+from app.paperless.generation import data_generation
+
+# Il client Redis è opzionale: serve solo con CACHE_BACKEND=redis
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class TTLCache:
+    """
+    Cache chiave → valore con scadenza e numero massimo di voci (le meno recenti vengono scartate).
+
+    È thread-safe: può essere condivisa tra le richieste servite dal threadpool di FastAPI.
+
+    Attributi:
+        ttl (float): durata di una voce, in secondi.
+        maxsize (int): numero massimo di voci.
+    """
+
+    def __init__(self, ttl: float = 300.0, maxsize: int = 256):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Restituisce il valore associato a `key`, o None se assente o scaduto."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        """Memorizza `value` per `key`, scartando la voce meno recente se la cache è piena."""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Restituisce il valore in cache per `key`, calcolandolo con `compute` se manca."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self, *args):
+        """Svuota la cache. Accetta argomenti ignorati per poter essere registrata come hook."""
+        with self._lock:
+            self._data.clear()
+
+
+class CachedResponse(dict):
+    """Risposta memorizzata: corpo (stringa JSON), media type e header da ripristinare."""
+
+    def dumps(self) -> str:
+        return json.dumps(self)
+
+    @classmethod
+    def loads(cls, raw) -> 'CachedResponse':
+        return cls(json.loads(raw))
+
+
+class LRUBackend:
+    """Backend nel processo: voci in un `TTLCache`."""
+
+    def __init__(self, maxsize: int = 512, ttl: float = 86400.0):
+        self._cache = TTLCache(ttl=ttl, maxsize=maxsize)
+
+    def clear(self):
+        self._cache.clear()
+
+    def get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: str):
+        self._cache.set(key, value)
+
+
+class LocalRedis:
+    """
+    Sostituto in memoria di un client Redis, limitato ai comandi usati da `RedisBackend`
+    (get, set con ex/nx). Permette di usare il backend Redis senza un server.
+    """
+
+    def __init__(self):
+        self._data: dict[str, tuple[Optional[float], bytes]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value, ex: Optional[int] = None, nx: bool = False) -> bool:
+        if nx and self.get(key) is not None:
+            return False
+        with self._lock:
+            expires_at = time.monotonic() + ex if ex else None
+            self._data[key] = (expires_at, str(value).encode())
+        return True
+
+
+class RedisBackend:
+    """Backend condiviso tra processi: le voci stanno su Redis e le riusano tutti i worker del server."""
+
+    def __init__(self, client, prefix: str = "homeharbor:cache", ttl: int = 86400):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def clear(self):
+        # Le voci delle generazioni precedenti scadono da sole
+        pass
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(f"{self.prefix}:{key}")
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key: str, value: str):
+        # Le voci delle generazioni precedenti scadono da sole
+        self.client.set(f"{self.prefix}:{key}", value, ex=self.ttl)
+
+
+class ResponseCache:
+    """
+    Cache delle risposte dei router indicizzata per generazione.
+
+    Esempio:
+        generation = response_cache.generation()
+        etag = response_cache.etag(generation, "/api/paperless/categories/")
+        cached = response_cache.get(generation, "/api/paperless/categories/")
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @staticmethod
+    def generation() -> str:
+        return str(data_generation.current())
+
+    def invalidate(self, *args) -> str:
+        """
+        Scarta le voci ormai irraggiungibili, da chiamare dopo aver riletto la generazione
+        (`run_sync_hooks` lo fa prima degli hook). Accetta argomenti ignorati per poter
+        essere registrata come hook.
+        """
+        self.backend.clear()
+        return self.generation()
+
+    @staticmethod
+    def etag(generation: str, key: str) -> str:
+        """ETag forte: identifica la stessa richiesta nella stessa generazione dei dati."""
+        digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+        return f'"{generation}-{digest}"'
+
+    def get(self, generation: str, key: str) -> Optional[CachedResponse]:
+        raw = self.backend.get(f"{generation}:{key}")
+        return CachedResponse.loads(raw) if raw is not None else None
+
+    def set(self, generation: str, key: str, response: CachedResponse):
+        self.backend.set(f"{generation}:{key}", response.dumps())
+
+
+def create_backend(name: str = CACHE_BACKEND):
+    """
+    Crea il backend della cache delle risposte indicato dalla configurazione.
+    Se Redis non è utilizzabile ripiega sull'LRU nel processo.
+    """
+    if name == "local":
+        return RedisBackend(LocalRedis())
+
+    if name == "redis":
+        if redis is None:
+            logger.warning("redis non è installato (`pip install redis`): uso la cache LRU nel processo")
+            return LRUBackend()
+        try:
+            return RedisBackend(redis.Redis.from_url(REDIS_URL))
+        except redis.RedisError as e:
+            logger.warning(f"Redis non raggiungibile ({e}): uso la cache LRU nel processo")
+            return LRUBackend()
+
+    return LRUBackend()
+
+
+response_cache = ResponseCache(create_backend())
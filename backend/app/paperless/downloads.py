@@ -0,0 +1,190 @@
+# backend/app/paperless/downloads.py
+
+"""
+Download dei documenti archiviati.
+
+- `file_response` serve un singolo file con `FileResponse`: il contenuto viene letto
+  e inviato a blocchi (o con `sendfile`, se il server ASGI supporta l'estensione
+  `http.response.pathsend`), quindi non viene mai caricato per intero in memoria.
+  Le richieste `Range` e `If-Range` sono gestite da Starlette; qui si aggiungono le
+  richieste condizionali (`If-None-Match`, `If-Modified-Since`), a cui si risponde
+  con un 304 senza aprire il file.
+- `stream_zip` costruisce al volo un archivio zip di più file e lo restituisce a
+  pezzi, mentre lo scrive: nessun file temporaneo e al più un blocco in memoria.
+  I file sono memorizzati senza compressione (i PDF delle scansioni sono già compressi),
+  con i data descriptor dello zip al posto delle intestazioni riscritte a posteriori.
+"""
+
+import io
+import os
+import zipfile
+from email.utils import parsedate_to_datetime
+from os import PathLike
+from typing import Iterable, Iterator, Optional, Union
+from urllib.parse import quote
+
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+
+from app.logger import logger
+from app.responses import etag_matches
+
+# Blocchi letti dai file inseriti nello zip
+ZIP_CHUNK_SIZE = 1 << 20
+
+# I file scaricati possono cambiare (una nuova scansione con lo stesso nome): il client
+# li può conservare, ma deve riconvalidarli a ogni utilizzo
+DOWNLOAD_CACHE_CONTROL = "private, no-cache"
+
+
+def is_safe_filename(filename: str) -> bool:
+    """Indica se `filename` è un semplice nome di file (niente separatori, '..' o file nascosti)."""
+    return bool(filename) and os.path.basename(filename) == filename and not filename.startswith('.') \
+        and '\\' not in filename
+
+
+def archive_location(root: Union[str, PathLike], *parts) -> Optional[str]:
+    """
+    Costruisce il percorso `root/parts...` e lo restituisce risolto (`realpath`, quindi
+    senza '..' né link simbolici) solo se resta dentro `root`; altrimenti None.
+
+    Esempio:
+        archive_location("/archivio", "Banca", "..", "..", "etc") → None
+    """
+    root = os.path.realpath(root)
+    location = os.path.realpath(os.path.join(root, *map(str, parts)))
+    if os.path.commonpath((root, location)) != root:
+        return None
+    return location
+
+
+def content_disposition(disposition: str, filename: str) -> str:
+    """Header `Content-Disposition` con il nome del file codificato secondo RFC 5987 se non ASCII."""
+    quoted = quote(filename)
+    if quoted == filename:
+        return f'{disposition}; filename="{filename}"'
+    return f"{disposition}; filename*=utf-8''{quoted}"
+
+
+def not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """
+    Indica se la copia del client è ancora valida: `If-None-Match` contiene l'ETag
+    oppure, in sua assenza, `If-Modified-Since` non è precedente alla modifica del file.
+    """
+    if 'if-none-match' in request.headers:
+        return etag_matches(request, etag)
+
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def file_response(request: Request, location: Union[str, PathLike], *, download: bool = False) -> Response:
+    """
+    Restituisce il file `location` come `FileResponse`, o un 304 se il client ne ha già
+    una copia valida.
+
+    Args:
+        request (Request): richiesta HTTP, per le intestazioni condizionali.
+        location (str | PathLike): percorso del file.
+        download (bool): se True il browser lo salva (`attachment`), altrimenti lo mostra (`inline`).
+
+    Returns:
+        Response: il file, con ETag, Last-Modified e Cache-Control.
+
+    Raises:
+        FileNotFoundError: se il file non esiste.
+    """
+    stat = os.stat(location)
+    filename = os.path.basename(location)
+    response = FileResponse(location, stat_result=stat, headers={'Cache-Control': DOWNLOAD_CACHE_CONTROL},
+                            filename=filename, content_disposition_type='attachment' if download else 'inline')
+
+    if not_modified(request, response.headers['etag'], stat.st_mtime):
+        headers = {name: response.headers[name] for name in ('etag', 'last-modified', 'cache-control')}
+        return Response(status_code=304, headers=headers)
+    return response
+
+
+def folder_entries(root: Union[str, PathLike], paths: Iterable[tuple[str, ...]],
+                   start: int = 0) -> Iterator[tuple[str, str]]:
+    """
+    Elenca i file (non nascosti) delle cartelle documento indicate, nel formato di `stream_zip`.
+
+    Args:
+        root (str | PathLike): root dell'archivio.
+        paths (Iterable[tuple[str, ...]]): nomi dei cinque livelli di ogni cartella.
+        start (int): livello da cui partono i nomi nello zip (es. 2 → 'anno/tipo/documento/file').
+
+    Yields:
+        tuple[str, str]: percorso del file e nome nello zip.
+    """
+    for parts in paths:
+        folder = archive_location(root, *parts)
+        if folder is None:
+            logger.warning(f"Cartella fuori dall'archivio ignorata: {'/'.join(map(str, parts))}")
+            continue
+        try:
+            with os.scandir(folder) as children:
+                names = sorted(entry.name for entry in children
+                               if entry.is_file() and not entry.name.startswith('.'))
+        except OSError:
+            continue
+        for name in names:
+            yield os.path.join(folder, name), '/'.join(parts[start:] + (name,))
+
+
+class _ZipSink(io.RawIOBase):
+    """Destinazione non posizionabile dello zip: accumula i byte scritti fino al prossimo `drain`."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries: Iterable[tuple[Union[str, PathLike], str]]) -> Iterator[bytes]:
+    """
+    Generatore che produce, pezzo per pezzo, uno zip con i file indicati.
+    I file che non è possibile leggere vengono saltati.
+
+    Args:
+        entries (Iterable[tuple[str | PathLike, str]]): coppie (percorso del file, nome nello zip).
+
+    Yields:
+        bytes: porzioni consecutive dell'archivio.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED, strict_timestamps=False) as archive:
+        for location, arcname in entries:
+            try:
+                info = zipfile.ZipInfo.from_file(location, arcname, strict_timestamps=False)
+                source = open(location, 'rb')
+            except OSError as e:
+                logger.warning(f"File {location} non incluso nello zip: {e}")
+                continue
+
+            # All'apertura viene scritta l'intestazione locale, alla chiusura il data descriptor
+            with source, archive.open(info, 'w') as target:
+                while chunk := source.read(ZIP_CHUNK_SIZE):
+                    target.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+
+    # Directory centrale, scritta alla chiusura dell'archivio
+    yield sink.drain()
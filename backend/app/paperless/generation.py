@@ -0,0 +1,67 @@
+# backend/app/paperless/generation.py
+
+"""
+Generazione dei dati condivisa tra processi.
+
+Il contatore 'data' della tabella `paperless.generations` viene incrementato da un
+trigger, una volta per transazione, a ogni scrittura nelle tabelle della gerarchia
+e dei tag (vedi la migrazione `data_generation`): lo aggiorna quindi anche una
+sincronizzazione lanciata da un altro processo. Le cache del server memorizzano la
+generazione dei dati che contengono e li considerano superati quando il contatore
+è più avanti.
+
+Il valore letto viene riusato per `DATA_GENERATION_TTL` secondi, così una richiesta
+non costa una query in più; il processo che ha scritto forza la rilettura con
+`refresh` (gli hook di sincronizzazione girano dopo il commit).
+"""
+
+import threading
+import time
+
+from sqlalchemy import select
+
+from app.config import DATA_GENERATION_TTL
+from app.database import engine
+from app.paperless.models import Generation
+
+
+class GenerationCounter:
+    """
+    Lettura, con una breve cache nel processo, di un contatore di `paperless.generations`.
+
+    Attributi:
+        name (str): nome del contatore.
+        ttl (float): secondi per cui il valore letto viene riusato.
+    """
+
+    def __init__(self, name: str, ttl: float = DATA_GENERATION_TTL):
+        self.name = name
+        self.ttl = ttl
+        self._value = 0
+        self._read_at = None
+        self._lock = threading.Lock()
+
+    def current(self) -> int:
+        """Restituisce la generazione corrente, rileggendola se quella nota è più vecchia del TTL."""
+        read_at = self._read_at
+        if read_at is not None and time.monotonic() - read_at < self.ttl:
+            return self._value
+        return self.refresh()
+
+    def refresh(self, *args) -> int:
+        """
+        Rilegge la generazione dal database. Accetta argomenti ignorati per poter essere
+        registrata come hook. Usa una connessione propria: vede solo valori già committati.
+        """
+        with engine.connect() as connection:
+            value = connection.execute(
+                select(Generation.value).where(Generation.name == self.name)
+            ).scalar() or 0
+        with self._lock:
+            # Due letture concorrenti non fanno tornare indietro il valore noto
+            self._value = max(self._value, value)
+            self._read_at = time.monotonic()
+            return self._value
+
+
+data_generation = GenerationCounter('data')
@@ -3,8 +3,94 @@
 # Script di sincronizzazione sicuro da rieseguire.
 # Inserisce nuove voci trovate nel filesystem e rimuove quelle assenti.
 # Viene richiamato automaticamente all'avvio di HomeHarbor (via startup task async).
-from app.paperless.manage_database.core import db_init, sync_db
+#
+# Con --watch, dopo la sincronizzazione iniziale resta in ascolto delle modifiche
+# al file system e le applica al database man mano (vedi `watcher.py`).
+#
+# Con --plan FILE calcola le modifiche senza applicarle e le salva in FILE (JSON);
+# con --apply FILE applica un piano salvato in precedenza in un'unica transazione.
+#
+# Con --files, dopo la sincronizzazione aggiorna anche l'indice dei file delle
+# cartelle documento (hash e pagine, vedi `files.py`); con --extract estrae il testo
+# dei file nuovi o modificati per la ricerca full-text (vedi `extraction.py`).
+#
+# Con --ingest archivia le scansioni in attesa i cui file sono nella cartella di
+# acquisizione (vedi `ingestion.py`); con --ingest-poll SECONDI resta poi in attesa
+# di nuove scansioni. Più processi con --ingest possono essere eseguiti insieme.
+import argparse
+import json
+
+from app.paperless.manage_database.constants import MOCK_ADMINISTRATION_PATH, SCAN_DROP_PATH
+from app.paperless.manage_database.core import apply_plan, db_init, plan_sync, sync_db
+from app.paperless.manage_database.extraction import run_extraction
+from app.paperless.manage_database.files import index_files
+from app.paperless.manage_database.ingestion import run_ingestion
+from app.paperless.manage_database.plan import SyncPlan
+from app.paperless.manage_database.watcher import Watcher
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Sincronizza il file system con il database.")
+    parser.add_argument('--path', default=MOCK_ADMINISTRATION_PATH,
+                        help="root dell'archivio da sincronizzare")
+    parser.add_argument('--bulk', action='store_true',
+                        help="usa il motore set-based (poche query multi-riga invece di una per voce)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="rilegge solo le cartelle modificate rispetto all'ultimo snapshot")
+    parser.add_argument('--rescan', action='store_true',
+                        help="con --incremental, ignora lo snapshot e rilegge tutto l'archivio")
+    parser.add_argument('--workers', type=int,
+                        help="scansiona il file system in parallelo con il numero di thread indicato")
+    parser.add_argument('--plan', metavar='FILE',
+                        help="calcola il piano di sincronizzazione senza applicarlo e lo salva in FILE")
+    parser.add_argument('--apply', metavar='FILE',
+                        help="applica il piano salvato in FILE invece di riscansionare l'archivio")
+    parser.add_argument('--files', action='store_true',
+                        help="aggiorna l'indice dei file delle cartelle documento (hash e pagine)")
+    parser.add_argument('--hash-workers', type=int,
+                        help="con --files ed --extract, processi del pool (di default uno per core)")
+    parser.add_argument('--extract', action='store_true',
+                        help="estrae il testo dei file indicizzati nuovi o modificati (PDF e OCR)")
+    parser.add_argument('--ingest', action='store_true',
+                        help="archivia le scansioni in attesa presenti nella cartella di acquisizione")
+    parser.add_argument('--drop', default=SCAN_DROP_PATH,
+                        help="con --ingest, cartella di acquisizione delle scansioni")
+    parser.add_argument('--ingest-poll', type=float, metavar='SECONDS',
+                        help="con --ingest, resta in attesa di nuove scansioni controllando ogni SECONDS secondi")
+    parser.add_argument('--watch', action='store_true',
+                        help="dopo la sincronizzazione resta in ascolto delle modifiche al file system")
+    parser.add_argument('--polling', action='store_true',
+                        help="con --watch, usa il polling anche se inotify è disponibile")
+    return parser.parse_args()
+
 
 if __name__ == '__main__':
+    args = parse_args()
     db_init()
-    sync_db()
+
+    if args.plan:
+        plan = plan_sync(args.path, incremental=args.incremental, rescan=args.rescan, workers=args.workers)
+        with open(args.plan, 'w', encoding='utf-8') as file:
+            json.dump(plan.to_dict(), file, ensure_ascii=False, indent=2)
+        print(plan.counts)
+        raise SystemExit
+
+    if args.apply:
+        with open(args.apply, encoding='utf-8') as file:
+            report = apply_plan(SyncPlan.from_dict(json.load(file)))
+    else:
+        report = sync_db(args.path, bulk=args.bulk, incremental=args.incremental, rescan=args.rescan,
+                         workers=args.workers)
+    print(report)
+
+    if args.files:
+        print(index_files(args.path, workers=args.hash_workers))
+
+    if args.extract:
+        print(run_extraction(args.path, workers=args.hash_workers))
+
+    if args.ingest:
+        print(run_ingestion(args.path, args.drop, poll=args.ingest_poll))
+
+    if args.watch:
+        Watcher(args.path, force_polling=args.polling).run()
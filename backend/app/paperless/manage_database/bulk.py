@@ -0,0 +1,350 @@
+# backend/app/paperless/manage_database/bulk.py
+
+"""
+Motore di sincronizzazione "set-based" tra file system e database.
+
+A differenza della modalità classica (una `get_or_create`/`remove` per ogni voce,
+ciascuna con la propria SELECT e il proprio flush), qui le modifiche vengono
+applicate per insiemi:
+
+- le mappe nome → id dei cinque livelli vengono caricate con un'unica query;
+- i path esistenti vengono caricati con un'unica query sugli id;
+- le nuove entità vengono inserite con `INSERT ... ON CONFLICT DO NOTHING RETURNING id`
+  su più righe alla volta;
+- le entità obsolete vengono eliminate con `DELETE ... WHERE id = ANY(...)`.
+
+Il numero di round trip verso Postgres diventa quindi proporzionale al numero
+di livelli (e di blocchi da `BATCH_SIZE` righe), non al numero di cartelle.
+"""
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, Optional
+
+from sqlalchemy import Integer, String, any_, bindparam, cast, delete, event, literal, literal_column, select, \
+    union_all
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.orm import Session
+
+from app.paperless import models
+from app.paperless.manage_database.constants import MODELS_USING_INTEGER_NAME
+from app.paperless.manage_database.identity import identity_map
+from app.paperless.manage_database.tree import DB_Tree, NameInterner
+
+# Numero massimo di righe per singola INSERT multi-riga o DELETE ... ANY(...).
+# Evita statement SQL enormi su archivi con decine di migliaia di cartelle.
+BATCH_SIZE = 5000
+
+# Callback di avanzamento: (fase, voci elaborate, voci totali della fase)
+ProgressCallback = Callable[[str, int, int], None]
+
+
+def no_progress(phase: str, processed: int = 0, total: int = 0):
+    """Callback di avanzamento predefinita: non fa nulla."""
+
+
+class RoundTripCounter:
+    """
+    Conta le istruzioni inviate al database (statement e commit)
+    su una singola connessione.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+@contextmanager
+def count_round_trips(db: Session) -> Iterator[RoundTripCounter]:
+    """
+    Context manager che conta i round trip eseguiti dalla sessione `db`
+    finché il blocco `with` è attivo.
+
+    Esempio:
+        with count_round_trips(db) as counter:
+            ...
+        print(counter.count)
+    """
+    connection = db.connection()
+    counter = RoundTripCounter()
+
+    event.listen(connection, 'before_cursor_execute', counter)
+    event.listen(connection, 'commit', counter)
+    try:
+        yield counter
+    finally:
+        event.remove(connection, 'before_cursor_execute', counter)
+        event.remove(connection, 'commit', counter)
+
+
+@dataclass
+class SyncReport:
+    """
+    Riepilogo di una sincronizzazione.
+
+    Attributi:
+        created (dict[str, int]): numero di voci create per livello (e per `paths`).
+        removed (dict[str, int]): numero di voci eliminate per livello (e per `paths`).
+        round_trips (int): numero di round trip effettuati verso il database.
+        skipped (int): cartelle escluse scartate durante la scansione del file system.
+    """
+
+    created: dict[str, int] = field(default_factory=dict)
+    removed: dict[str, int] = field(default_factory=dict)
+    round_trips: int = 0
+    skipped: int = 0
+
+    def __str__(self):
+        return (
+            f'creati: {self.created}\n'
+            f'eliminati: {self.removed}\n'
+            f'round trip: {self.round_trips}\n'
+            f'cartelle escluse: {self.skipped}'
+        )
+
+
+@dataclass
+class DBState:
+    """
+    Fotografia del database necessaria alla sincronizzazione bulk.
+
+    Attributi:
+        names (dict[str, dict[str, int]]): per ogni livello, mappa nome → id.
+        paths (dict[str, int]): mappa path posix → id della riga in `paths`.
+    """
+
+    names: dict[str, dict[str, int]]
+    paths: dict[str, int]
+
+    def tree(self, interner: Optional[NameInterner] = None) -> DB_Tree:
+        """
+        Costruisce il `DB_Tree` corrispondente allo stato del database, con il
+        dizionario dei nomi `interner` dell'albero con cui verrà confrontato.
+        """
+        db_tree = DB_Tree(interner)
+
+        for level, names in self.names.items():
+            for name in names:
+                db_tree.add(level, name)
+
+        for path in self.paths:
+            db_tree.add('paths', path)
+
+        return db_tree
+
+
+def _chunks(values: list, size: int = BATCH_SIZE) -> Iterator[list]:
+    """Divide una lista in blocchi di al più `size` elementi."""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _name_value(model, name: str):
+    """Converte il nome proveniente dal file system nel tipo della colonna `name`."""
+    return int(name) if model in MODELS_USING_INTEGER_NAME else name
+
+
+def load_state(db: Session, needed_models: dict[str, ...]) -> DBState:
+    """
+    Carica in due sole query le mappe nome → id di tutti i livelli
+    e l'elenco dei path esistenti.
+
+    Args:
+        db (Session): sessione del database.
+        needed_models (dict): mapping tra nomi dei livelli e modelli SQLAlchemy.
+
+    Returns:
+        DBState: stato corrente del database.
+    """
+
+    # SELECT 'category' AS level, CAST(name AS VARCHAR), id FROM categories
+    # UNION ALL SELECT 'utility', ... (un ramo per ciascun livello) ORDER BY id DESC
+    statement = union_all(*(
+        select(
+            literal(level).label('level'),
+            cast(model.name, String).label('name'),
+            model.id
+        )
+        for level, model in needed_models.items()
+    )).order_by(literal_column('id').desc())
+
+    # Come in `IdentityMap._load`, a parità di nome (i documenti non sono univoci)
+    # vince l'id più basso, letto per ultimo. La mappa id → nome, che serve a
+    # ricostruire i path senza ulteriori join, contiene invece tutte le righe.
+    names = {level: {} for level in DB_Tree.structure}
+    by_id = {level: {} for level in DB_Tree.structure}
+    for level, name, obj_id in db.execute(statement):
+        names[level][name] = obj_id
+        by_id[level][obj_id] = name
+
+    # Le stesse mappe alimentano l'identity map, senza ulteriori query
+    for level, model in needed_models.items():
+        identity_map.seed(model, names[level])
+
+    statement = select(
+        models.Path.id,
+        models.Path.category,
+        models.Path.utility,
+        models.Path.year,
+        models.Path.document_type,
+        models.Path.document
+    ).order_by(models.Path.id.desc())
+
+    # Path omonimi (documenti con lo stesso nome): anche qui vince l'id più basso
+    paths = {}
+    for path_id, *level_ids in db.execute(statement):
+        parts = [by_id[level][obj_id] for level, obj_id in zip(DB_Tree.structure, level_ids)]
+        paths['/'.join(parts)] = path_id
+
+    return DBState(names=names, paths=paths)
+
+
+def bulk_delete(db: Session, model, ids: list[int], advance: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Elimina le righe di `model` con id in `ids` tramite `DELETE ... WHERE id = ANY(...)`.
+
+    Args:
+        advance (Callable | None): chiamata dopo ogni blocco con il numero di id elaborati.
+
+    Returns:
+        int: numero di righe eliminate.
+    """
+    deleted = 0
+
+    for chunk in _chunks(ids):
+        statement = delete(model).where(model.id == any_(bindparam('ids', chunk, type_=ARRAY(Integer))))
+        deleted += db.execute(statement, execution_options={'synchronize_session': False}).rowcount
+        if advance:
+            advance(len(chunk))
+
+    return deleted
+
+
+def bulk_insert_names(db: Session, model, names: list[str],
+                      advance: Optional[Callable[[int], None]] = None) -> dict[str, int]:
+    """
+    Inserisce le entità `names` con `INSERT ... ON CONFLICT DO NOTHING RETURNING id, name`.
+
+    Le righe già presenti (conflitto) non vengono restituite da `RETURNING`,
+    quindi i loro id vengono recuperati con una SELECT aggiuntiva solo se necessario.
+
+    Args:
+        advance (Callable | None): chiamata dopo ogni blocco con il numero di nomi elaborati.
+
+    Returns:
+        dict[str, int]: mappa nome → id per tutti i nomi richiesti.
+    """
+    inserted = {}
+
+    for chunk in _chunks(names):
+        statement = (
+            insert(model)
+            .values([{'name': _name_value(model, name)} for name in chunk])
+            .on_conflict_do_nothing()
+            .returning(model.id, model.name)
+        )
+        for obj_id, name in db.execute(statement):
+            inserted[str(name)] = obj_id
+        if advance:
+            advance(len(chunk))
+
+    missing = [name for name in names if name not in inserted]
+    if missing:
+        values = [_name_value(model, name) for name in missing]
+        statement = select(model.id, model.name).where(model.name.in_(values))
+        for obj_id, name in db.execute(statement):
+            inserted[str(name)] = obj_id
+
+    return inserted
+
+
+def bulk_insert_paths(db: Session, rows: list[dict[str, int]],
+                      advance: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Inserisce i path (già risolti in id) con un'unica `INSERT` multi-riga per blocco.
+
+    Args:
+        advance (Callable | None): chiamata dopo ogni blocco con il numero di path elaborati.
+
+    Returns:
+        int: numero di path effettivamente inseriti.
+    """
+    inserted = 0
+
+    for chunk in _chunks(rows):
+        statement = (
+            insert(models.Path)
+            .values(chunk)
+            .on_conflict_do_nothing()
+            .returning(models.Path.id)
+        )
+        inserted += len(db.execute(statement).all())
+        if advance:
+            advance(len(chunk))
+
+    return inserted
+
+
+def apply_bulk(db: Session, state: DBState, needed_models: dict[str, ...],
+               to_add: dict[str, Iterable[str]], to_remove: dict[str, Iterable[str]],
+               progress: ProgressCallback = no_progress) -> SyncReport:
+    """
+    Applica in modalità bulk le differenze calcolate tra albero reale e albero del database.
+
+    L'ordine delle operazioni rispetta i vincoli di foreign key:
+    prima si eliminano i path, poi le entità (dal documento alla categoria);
+    poi si creano le entità e infine i nuovi path.
+
+    Non esegue il commit: è compito del chiamante.
+
+    Args:
+        progress (ProgressCallback): notificata con la fase 'apply' dopo ogni blocco.
+
+    Returns:
+        SyncReport: numero di voci create ed eliminate per livello.
+    """
+    report = SyncReport()
+    total = sum(len(values) for values in to_add.values()) + sum(len(values) for values in to_remove.values())
+    processed = 0
+
+    def advance(count: int):
+        nonlocal processed
+        processed += count
+        progress('apply', processed, total)
+
+    progress('apply', 0, total)
+
+    # 1. Eliminazione dei path obsoleti
+    path_ids = [state.paths[path] for path in to_remove.get('paths', ()) if path in state.paths]
+    report.removed['paths'] = bulk_delete(db, models.Path, path_ids, advance)
+
+    # 2. Eliminazione delle entità obsolete, dal livello più profondo al più alto
+    for level in reversed(DB_Tree.structure):
+        names = [name for name in to_remove.get(level, ()) if name in state.names[level]]
+        ids = [state.names[level].pop(name) for name in names]
+        report.removed[level] = bulk_delete(db, needed_models[level], ids, advance)
+        for name in names:
+            identity_map.discard(db, needed_models[level], name)
+
+    # 3. Creazione delle nuove entità
+    for level in DB_Tree.structure:
+        names = sorted(to_add.get(level, ()))
+        created = bulk_insert_names(db, needed_models[level], names, advance) if names else {}
+        state.names[level].update(created)
+        for name, obj_id in created.items():
+            identity_map.add(db, needed_models[level], name, obj_id)
+        report.created[level] = len(created)
+
+    # 4. Creazione dei nuovi path, risolvendo i nomi con le mappe in memoria
+    rows = []
+    for path in sorted(to_add.get('paths', ())):
+        parts = path.split('/')
+        rows.append({
+            level: state.names[level][name]
+            for level, name in zip(DB_Tree.structure, parts)
+        })
+    report.created['paths'] = bulk_insert_paths(db, rows, advance)
+
+    return report
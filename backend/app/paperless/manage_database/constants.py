@@ -13,6 +13,7 @@ Contenuto principale:
   per confronto coerente col file system.
 """
 
+import os
 from os import PathLike
 from typing import Union
 from pathlib import Path
@@ -61,6 +62,28 @@ MOCK_ADMINISTRATION_PATH: Union[str, PathLike] = ROOT / '_amministrazione'
 ADMINISTRATION_PATH: Union[str, PathLike] = '/Volumes/working space/amministrazione'
 
 
+# Archivio usato dalle API (anteprima e applicazione della sincronizzazione).
+# Si può sovrascrivere con la variabile d'ambiente ARCHIVE_PATH, ad esempio
+# impostandola ad ADMINISTRATION_PATH in produzione.
+ARCHIVE_PATH: Union[str, PathLike] = os.getenv('ARCHIVE_PATH', MOCK_ADMINISTRATION_PATH)
+
+
+# File in cui viene salvato lo snapshot delle cartelle (mtime e inode) usato
+# dalla scansione incrementale. Se assente, la prima scansione è completa.
+SNAPSHOT_PATH: Union[str, PathLike] = ROOT / '.scan_snapshot.json'
+
+
+# Cartella della cache su disco delle anteprime dei documenti (vedi `paperless.previews`).
+# Si può sovrascrivere con la variabile d'ambiente PREVIEW_CACHE_PATH.
+PREVIEW_CACHE_PATH: Union[str, PathLike] = os.getenv('PREVIEW_CACHE_PATH', ROOT / '.preview_cache')
+
+
+# Cartella di acquisizione in cui lo scanner deposita i file prodotti, da archiviare
+# nelle cartelle documento (vedi `manage_database.ingestion`).
+# Si può sovrascrivere con la variabile d'ambiente SCAN_DROP_PATH.
+SCAN_DROP_PATH: Union[str, PathLike] = os.getenv('SCAN_DROP_PATH', ROOT / '.scan_drop')
+
+
 # Alcuni modelli (come Year) usano un campo `name` di tipo intero.
 # Dato che i nomi delle cartelle nel filesystem sono stringhe,
 # questo serve per effettuare confronti e casting coerenti.
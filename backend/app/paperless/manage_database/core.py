@@ -9,19 +9,44 @@ Le principali responsabilità includono:
 - Ottenere la struttura attualmente salvata nel database.
 - Calcolare le differenze tra le due strutture.
 - Applicare le modifiche necessarie al database.
+
+Le funzioni di livello più basso ricevono la sessione `db` del chiamante; i punti
+di ingresso (`db_init`, `sync_db`, `plan_sync`, `apply_plan`) aprono una propria
+unità di lavoro con `session_scope`, così da non occupare una connessione durante
+la scansione del file system. Le scritture avvengono sotto il lock advisory
+delle sincronizzazioni (`lock_sync`), che impedisce a due sincronizzazioni
+concorrenti di sovrapporsi.
 """
 
 import pathlib
 from os import PathLike, walk
-from typing import Union, Literal, Callable
+from typing import Union, Literal, Callable, Iterable, Optional
 
-from sqlalchemy import select
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
 
+from app.database import session_scope
+from app.logger import logger
 from app.paperless import models
+from app.paperless.cache import response_cache
+from app.paperless.manage_database.bulk import ProgressCallback, SyncReport, apply_bulk, count_round_trips, \
+    load_state, no_progress
 from app.paperless.manage_database.constants import EXCLUDED, MOCK_ADMINISTRATION_PATH, \
-    MODELS_USING_INTEGER_NAME
-from app.paperless.manage_database.tree import DB_Tree
-from app.paperless.manage_database.utils import camel_to_snake, get_or_create, remove, sliced_admin, db
+    MODELS_USING_INTEGER_NAME, SNAPSHOT_PATH
+from app.paperless.manage_database.exclusion import ExclusionFilter
+from app.paperless.manage_database.hooks import register_sync_hook, run_sync_hooks
+from app.paperless.manage_database.identity import LEVEL_MODELS, identity_map
+from app.paperless.manage_database.plan import SyncPlan
+from app.paperless.manage_database.snapshot import ScanSnapshot, scan_incremental
+from app.paperless.manage_database.tree import DB_Tree, NameInterner
+from app.paperless.manage_database.utils import camel_to_snake, get_or_create, lock_sync, remove, sliced_admin
+from app.paperless.manage_database.views import refresh_path_tree
+from app.paperless.manage_database.walker import walk_parallel
+
+# La vista `path_tree` segue ogni sincronizzazione, anche quelle lanciate da riga di comando;
+# la nuova generazione della cache delle risposte invalida gli ETag già emessi
+register_sync_hook(refresh_path_tree)
+register_sync_hook(response_cache.invalidate)
 
 
 def db_init():
@@ -29,16 +54,18 @@ def db_init():
     Inserisce nel database i percorsi da escludere definiti in `EXCLUDED`,
     se non già presenti. Questa operazione è idempotente.
     """
-    for excluded in EXCLUDED:
-        get_or_create(model=models.ExcludedPath, filter_key='path', path=excluded)
-
-    db.commit()
+    with session_scope() as db:
+        for excluded in EXCLUDED:
+            get_or_create(db, model=models.ExcludedPath, filter_key='path', path=excluded)
 
 
-def get_excluded_paths() -> list[str]:
+def get_excluded_paths(db: Session) -> list[str]:
     """
     Recupera tutti i path da escludere dal database, contenuti nella tabella `excluded_paths`.
 
+    Args:
+        db (Session): sessione del database.
+
     Returns:
         list[str]: elenco di percorsi da ignorare durante la scansione.
     """
@@ -74,38 +101,71 @@ def get_excluded_paths() -> list[str]:
     return db.execute(statement).scalars().all()
 
 
-def get_real_tree(path: Union[str, PathLike]) -> DB_Tree:
+def get_real_tree(path: Union[str, PathLike], *, excluded: Optional[ExclusionFilter] = None,
+                  incremental: bool = False, rescan: bool = False,
+                  snapshot_path: Union[str, PathLike] = SNAPSHOT_PATH, workers: Optional[int] = None) -> DB_Tree:
     """
     Costruisce un oggetto `DB_Tree` rappresentante la struttura reale del file system,
     a partire dal percorso `path`. Esclude i path specificati in `EXCLUDED`.
 
+    Le cartelle escluse (nomi esatti o pattern glob, vedi `manage_database.exclusion`)
+    vengono scartate durante la visita a qualsiasi profondità, senza leggerne il contenuto.
+    Il numero di cartelle scartate è disponibile in `excluded.skipped`.
+
+    In modalità `incremental` usa lo snapshot salvato in `snapshot_path` e rilegge
+    solo le cartelle il cui mtime è cambiato (vedi `manage_database.snapshot`),
+    aggiornando poi lo snapshot.
+
+    Se `workers` è indicato usa la visita parallela con `os.scandir`
+    (vedi `manage_database.walker`), utile su volumi lenti o di rete.
+
     Args:
         path (str | PathLike): percorso della root di amministrazione.
+        excluded (ExclusionFilter | None): filtro delle esclusioni; se None viene
+            costruito dalla tabella `excluded_paths`, con una sessione dedicata.
+        incremental (bool): se True usa la scansione incrementale.
+        rescan (bool): con `incremental`, ignora lo snapshot esistente e rilegge tutto,
+            salvando uno snapshot nuovo.
+        snapshot_path (str | PathLike): file dello snapshot.
+        workers (int | None): numero di thread della visita parallela; None per `os.walk`.
 
     Returns:
         DB_Tree: struttura rilevata dal file system.
     """
-    excluded = get_excluded_paths()
-    real_tree = DB_Tree()
+    if excluded is None:
+        with session_scope() as db:
+            excluded = ExclusionFilter(get_excluded_paths(db))
 
-    for dirpath, _, _ in walk(path):
-        # Ignora le directory il cui nome corrisponde a una voce esclusa
-        if pathlib.Path(dirpath).name in excluded:
-            continue
+    if incremental:
+        previous = None if rescan else ScanSnapshot.load(snapshot_path)
+        real_tree, snapshot, stats = scan_incremental(path, excluded, previous)
+        snapshot.save(snapshot_path)
+        logger.info(f"Scansione incrementale: {stats.listed} cartelle lette, {stats.reused} dallo snapshot")
+        return real_tree
 
+    if workers:
+        return walk_parallel(path, excluded, workers)
+
+    real_tree = DB_Tree()
+
+    for dirpath, dirnames, _ in walk(path):
         # Estrae solo la parte del path dopo la cartella root di amministrazione
         # (es. '_amministrazione' in mock, 'amministrazione' in produzione)
         parts = sliced_admin(pathlib.Path(dirpath).parts)
         level = len(parts)
         name = pathlib.Path(dirpath).name
 
+        # Pruning: modificando `dirnames` sul posto, os.walk non entra nelle cartelle
+        # escluse né sotto il livello documento, il cui contenuto non serve al DB_Tree
+        dirnames[:] = excluded.prune(parts, dirnames) if level < 5 else []
+
         if 1 <= level <= 5:
             # Aggiunge il nome alla struttura appropriata (category, utility, etc.)
             real_tree.add(DB_Tree.structure[level - 1], name)
 
             # Se siamo al quinto livello (documento), aggiungiamo il path completo
             if level == 5:
-                real_tree.add('paths', str(pathlib.Path(*parts)))
+                real_tree.add_path(parts)
 
     return real_tree
 
@@ -127,20 +187,17 @@ def get_needed_models() -> dict[str, ...]:
     }
 
 
-def get_all_path_labels(return_type: Literal['query', 'PathLike', 'posix']) -> Union[
-    list[tuple[str, str, str, str, str]],
-    list[PathLike],
-    list[str]
-]:
+def path_labels_statement(prefix: tuple[str, ...] = ()) -> Select:
     """
-    Recupera tutti i path presenti nella tabella `paths`, unendo le foreign key
-    per ottenere i nomi leggibili delle entità (category, utility, year, ecc.).
+    Costruisce la query che risolve ogni riga di `paths` nei nomi dei cinque livelli,
+    con un'unica serie di join.
 
     Args:
-        return_type (str): può essere 'query', 'PathLike', o 'posix'
+        prefix (tuple[str, ...]): se indicato, seleziona solo i path che iniziano
+            con questi nomi (es. ('Banca', 'Enel') → tutti i path di Banca/Enel)
 
     Returns:
-        list: elenco dei path nel formato specificato
+        Select: query con le colonne category, utility, year, document_type, document.
     """
 
     # SQL equivalente alla seguente query ORM:
@@ -170,7 +227,33 @@ def get_all_path_labels(return_type: Literal['query', 'PathLike', 'posix']) -> U
         .join(models.Path.document_rel)
     )
 
-    result = db.execute(stmt).all()
+    # Filtra sui livelli indicati dal prefisso, nell'ordine category → document
+    for column, name in zip(stmt.selected_columns, prefix):
+        stmt = stmt.where(column == name)
+
+    return stmt
+
+
+def get_all_path_labels(db: Session, return_type: Literal['query', 'PathLike', 'posix'],
+                        prefix: tuple[str, ...] = ()) -> Union[
+    list[tuple[str, str, str, str, str]],
+    list[PathLike],
+    list[str]
+]:
+    """
+    Recupera tutti i path presenti nella tabella `paths`, unendo le foreign key
+    per ottenere i nomi leggibili delle entità (category, utility, year, ecc.).
+
+    Args:
+        db (Session): sessione del database.
+        return_type (str): può essere 'query', 'PathLike', o 'posix'
+        prefix (tuple[str, ...]): se indicato, restituisce solo i path che iniziano
+            con questi nomi (es. ('Banca', 'Enel') → tutti i path di Banca/Enel)
+
+    Returns:
+        list: elenco dei path nel formato specificato
+    """
+    result = db.execute(path_labels_statement(prefix)).all()
 
     match return_type:
         case 'query':
@@ -185,19 +268,22 @@ def get_all_path_labels(return_type: Literal['query', 'PathLike', 'posix']) -> U
             raise ValueError("Tipo di ritorno non valido. Usa 'query', 'PathLike' o 'posix'.")
 
 
-def get_db_tree(needed_models: dict[str, ...]) -> DB_Tree:
+def get_db_tree(db: Session, needed_models: dict[str, ...], interner: Optional[NameInterner] = None) -> DB_Tree:
     """
     Crea un `DB_Tree` basato sui dati attualmente presenti nel database,
     inclusi i path derivati da `get_all_path_labels`.
 
     Args:
+        db (Session): sessione del database.
         needed_models (dict): mapping tra nomi logici e modelli SQLAlchemy.
+        interner (NameInterner | None): dizionario dei nomi dell'albero con cui
+            verrà confrontato (di solito quello reale).
 
     Returns:
         DB_Tree: struttura corrente del database.
     """
 
-    db_tree = DB_Tree()
+    db_tree = DB_Tree(interner)
 
     for model_name, model in needed_models.items():
         statement = select(model.name)
@@ -212,8 +298,9 @@ def get_db_tree(needed_models: dict[str, ...]) -> DB_Tree:
             db_tree.add(model_name, name)
 
     # I path completi (es. categoria/utenza/anno/...) vengono
-    # aggiunti separatamente come stringhe posix
-    db_tree.paths = set(get_all_path_labels('posix'))
+    # aggiunti separatamente a partire dai nomi dei cinque livelli
+    for parts in get_all_path_labels(db, 'query'):
+        db_tree.add_path([str(part) for part in parts])
 
     return db_tree
 
@@ -241,37 +328,51 @@ def process_posix_path(path: str) -> dict[str, str]:
     }
 
 
-def get_id_from_name(model: str, name: str) -> int:
+def get_id_from_name(db: Session, model: str, name: str) -> int:
     """
     Data un'entità e il suo nome, restituisce l'ID corrispondente nel database.
 
+    La risoluzione passa dall'identity map dei livelli (vedi `identity`): la prima
+    chiamata per un livello ne carica tutti i nomi con una query, le successive
+    non interrogano il database.
+
     Args:
+        db (Session): sessione del database.
         model (str): nome dell'entità (es. 'category', 'utility', ...)
         name (str): nome dell'istanza da cercare
 
     Returns:
         int: ID del record corrispondente
     """
+    return identity_map.get(db, LEVEL_MODELS[model], name)
 
-    model_name = {
-        'category': 'Category',
-        'utility': 'Utility',
-        'year': 'Year',
-        'document_type': 'DocumentType',
-        'document': 'Document'
-    }[model]
 
-    model = getattr(models, model_name)
+def get_existing_names(db: Session, model, names: Iterable[str]) -> list:
+    """
+    Restituisce, tra i nomi indicati, quelli già presenti nella tabella di `model`.
 
-    statement = select(model.id).where(model.name == name)
-    return db.execute(statement).scalar()
+    Args:
+        db (Session): sessione del database.
+        model: modello SQLAlchemy di uno dei cinque livelli.
+        names (Iterable[str]): nomi da cercare, come stringhe.
 
+    Returns:
+        list: nomi trovati, nel tipo della colonna `name`.
+    """
+    values = [int(name) if model in MODELS_USING_INTEGER_NAME else name for name in names]
+    if not values:
+        return []
 
-def crud_path(path: str, function: Callable):
+    statement = select(model.name).where(model.name.in_(values))
+    return db.execute(statement).scalars().all()
+
+
+def crud_path(db: Session, path: str, function: Callable):
     """
     Wrapper per le operazioni `get_or_create` e `remove` relative ai path completi.
 
     Args:
+        db (Session): sessione del database.
         path (str): path POSIX da processare
         function (Callable): funzione da eseguire sul path (es. get_or_create o remove)
 
@@ -281,54 +382,165 @@ def crud_path(path: str, function: Callable):
 
     kwargs = process_posix_path(path)
     filter_key = ', '.join(kwargs.keys())
-    ids = {key: get_id_from_name(key, value) for key, value in kwargs.items()}
+    ids = {key: get_id_from_name(db, key, value) for key, value in kwargs.items()}
 
-    return function(model=models.Path, filter_key=filter_key, **ids)
+    return function(db, model=models.Path, filter_key=filter_key, **ids)
 
 
-def sync_db(path: Union[str, PathLike] = MOCK_ADMINISTRATION_PATH):
+def sync_db(path: Union[str, PathLike] = MOCK_ADMINISTRATION_PATH, *, bulk: bool = False,
+            incremental: bool = False, rescan: bool = False, workers: Optional[int] = None,
+            progress: ProgressCallback = no_progress) -> SyncReport:
     """
     Esegue la sincronizzazione tra file system e database.
 
     - Identifica tutte le nuove entità da creare.
     - Identifica tutte le entità obsolete da eliminare.
-    - Applica le modifiche tramite `get_or_create` e `remove`.
+    - Applica le modifiche tramite `get_or_create` e `remove` oppure, in modalità
+      `bulk`, con istruzioni set-based (vedi `manage_database.bulk`).
+    - Dopo il commit notifica le modifiche agli hook registrati (vedi `manage_database.hooks`).
 
     Args:
         path (str | PathLike): percorso della root da scansionare. Di default `MOCK_ADMINISTRATION_PATH`.
+        bulk (bool): se True usa il motore set-based, con un numero di round trip
+            indipendente dal numero di cartelle.
+        incremental (bool): se True scansiona il file system in modo incrementale.
+        rescan (bool): con `incremental`, forza una scansione completa che rigenera lo snapshot.
+        workers (int | None): se indicato, scansiona il file system con la visita parallela.
+        progress (ProgressCallback): notificata a ogni cambio di fase ('scan', 'diff',
+            'apply', 'commit') e durante l'applicazione con le voci elaborate.
+
+    Returns:
+        SyncReport: voci create ed eliminate per livello, round trip effettuati
+            e cartelle escluse scartate durante la scansione.
+    """
+
+    # Costruisce l'albero reale analizzando il file system (directory presenti fisicamente),
+    # scartando le cartelle escluse durante la visita. La scansione avviene fuori
+    # da qualsiasi transazione, senza trattenere connessioni del pool.
+    progress('scan')
+    with session_scope() as db:
+        excluded = ExclusionFilter(get_excluded_paths(db))
+    real_tree = get_real_tree(path, excluded=excluded, incremental=incremental, rescan=rescan,
+                              workers=workers)
+
+    with session_scope() as db, count_round_trips(db) as counter:
+        # Attende eventuali altre sincronizzazioni: lo stato del database letto
+        # da qui in poi non può cambiare fino al commit
+        progress('diff')
+        lock_sync(db)
+
+        # Recupera i modelli SQLAlchemy rilevanti (category, utility, ecc.)
+        needed_models = get_needed_models()
+
+        if bulk:
+            # Carica in due query le mappe nome → id e i path già presenti
+            state = load_state(db, needed_models)
+            db_tree = state.tree(real_tree.interner)
+        else:
+            # Costruisce l'albero virtuale a partire dal contenuto effettivo del database
+            db_tree = get_db_tree(db, needed_models, real_tree.interner)
+
+        # Determina quali entità sono presenti solo nel file system (da creare)
+        # e quali solo nel database (da eliminare)
+        plan = SyncPlan.from_trees(real_tree, db_tree)
+        to_add, to_remove = plan.create, plan.delete
+
+        if bulk:
+            report = apply_bulk(db, state, needed_models, to_add, to_remove, progress)
+        else:
+            report = SyncReport(
+                created={key: len(values) for key, values in to_add.items()},
+                removed={key: len(values) for key, values in to_remove.items()}
+            )
+            total = sum(report.created.values()) + sum(report.removed.values())
+            processed = 0
+            progress('apply', processed, total)
+
+            # Aggiunge entità mancanti
+            for key, values in to_add.items():
+                for value in values:
+                    if key == 'paths':
+                        # I path richiedono una gestione speciale con ID, quindi usiamo `crud_path`
+                        crud_path(db, value, get_or_create)
+                    else:
+                        get_or_create(db, model=needed_models[key], filter_key='name', name=value)
+                    processed += 1
+                    progress('apply', processed, total)
+
+            # Rimuove entità non più esistenti nel file system: prima i path, poi i livelli
+            # dal più profondo, così che nessuna riga di `paths` resti senza il suo livello
+            for key in ['paths', *reversed(DB_Tree.structure)]:
+                for value in to_remove.get(key, ()):
+                    if key == 'paths':
+                        crud_path(db, value, remove)
+                    else:
+                        remove(db, model=needed_models[key], filter_key='name', name=value)
+                    processed += 1
+                    progress('apply', processed, total)
+
+        # Salva tutte le modifiche nel database e rilascia il lock
+        progress('commit')
+        db.commit()
+
+    # Aggiorna le cache in memoria con le sole modifiche applicate
+    run_sync_hooks(plan)
+
+    report.round_trips = counter.count
+    report.skipped = excluded.skipped
+    return report
+
+
+def plan_sync(path: Union[str, PathLike] = MOCK_ADMINISTRATION_PATH, *, incremental: bool = False,
+              rescan: bool = False, workers: Optional[int] = None) -> SyncPlan:
     """
+    Calcola, senza scrivere nel database, le modifiche che `sync_db` applicherebbe.
+
+    Usa le stesse scansioni di `sync_db` e legge lo stato del database con le due
+    query del motore bulk (vedi `load_state`).
 
-    # Costruisce l'albero reale analizzando il file system (directory presenti fisicamente)
-    real_tree = get_real_tree(path)
+    Args:
+        path (str | PathLike): percorso della root da scansionare.
+        incremental (bool): se True scansiona il file system in modo incrementale.
+        rescan (bool): con `incremental`, forza una scansione completa che rigenera lo snapshot.
+        workers (int | None): se indicato, scansiona il file system con la visita parallela.
+
+    Returns:
+        SyncPlan: entità e path da creare ed eliminare.
+    """
+    real_tree = get_real_tree(path, incremental=incremental, rescan=rescan, workers=workers)
 
-    # Recupera i modelli SQLAlchemy rilevanti (category, utility, ecc.)
-    needed_models = get_needed_models()
+    with session_scope() as db:
+        state = load_state(db, get_needed_models())
 
-    # Costruisce l'albero virtuale a partire dal contenuto effettivo del database
-    db_tree = get_db_tree(needed_models)
+    return SyncPlan.from_trees(real_tree, state.tree(real_tree.interner))
 
-    # Determina quali entità sono presenti nel file system ma non nel database
-    to_add = real_tree - db_tree
 
-    # Determina quali entità sono nel database ma non più presenti nel file system
-    to_remove = db_tree - real_tree
+def apply_plan(plan: SyncPlan, progress: ProgressCallback = no_progress) -> SyncReport:
+    """
+    Applica un piano calcolato con `plan_sync` in un'unica transazione,
+    con le istruzioni set-based del motore bulk. In caso di errore la transazione
+    viene annullata per intero.
+
+    Le voci già applicate nel frattempo vengono ignorate (`ON CONFLICT DO NOTHING`
+    per gli inserimenti, id non trovati per le eliminazioni).
+
+    Args:
+        plan (SyncPlan): piano da applicare.
+        progress (ProgressCallback): notificata durante l'applicazione e al commit.
+
+    Returns:
+        SyncReport: voci create ed eliminate per livello e round trip effettuati.
+    """
+    with session_scope() as db, count_round_trips(db) as counter:
+        lock_sync(db)
+        needed_models = get_needed_models()
+        state = load_state(db, needed_models)
 
-    # Aggiunge entità mancanti
-    for key, values in to_add.items():
-        for value in values:
-            if key == 'paths':
-                # I path richiedono una gestione speciale con ID, quindi usiamo `crud_path`
-                crud_path(value, get_or_create)
-            else:
-                get_or_create(model=needed_models[key], filter_key='name', name=value)
+        report = apply_bulk(db, state, needed_models, plan.create, plan.delete, progress)
+        progress('commit')
+        db.commit()
 
-    # Rimuove entità non più esistenti nel file system
-    for key, values in to_remove.items():
-        for value in values:
-            if key == 'paths':
-                crud_path(value, remove)
-            else:
-                remove(model=needed_models[key], filter_key='name', name=value)
+    run_sync_hooks(plan)
 
-    # Salva tutte le modifiche nel database
-    db.commit()
+    report.round_trips = counter.count
+    return report
@@ -0,0 +1,72 @@
+# backend/app/paperless/manage_database/exclusion.py
+
+"""
+Filtro delle cartelle escluse dalla scansione (tabella `excluded_paths`).
+
+Le voci possono essere:
+- nomi esatti (es. 'Nuove Acquisizioni'), confrontati con il nome della cartella
+  a qualsiasi profondità;
+- pattern glob senza '/' (es. '*_backup', '.*'), confrontati con il nome della cartella;
+- pattern glob con '/' (es. 'Banca/*/Altro'), confrontati con il path relativo
+  alla root dell'archivio.
+
+Una cartella esclusa viene scartata durante la visita (pruning), quindi il suo
+contenuto non viene mai letto. Il filtro conta le cartelle scartate, così da poter
+misurare quanto I/O evitano le esclusioni.
+"""
+
+import threading
+from fnmatch import fnmatchcase
+from typing import Iterable
+
+# Caratteri che rendono una voce un pattern glob anziché un nome esatto
+GLOB_CHARS = set('*?[')
+
+
+class ExclusionFilter:
+    """
+    Decide se una cartella va esclusa dalla scansione e conta quelle scartate.
+
+    È thread-safe: può essere condiviso tra i thread della visita parallela.
+
+    Attributi:
+        patterns (list[str]): voci di esclusione originali, ordinate.
+        skipped (int): numero di cartelle scartate finora.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = sorted(patterns)
+        self.names = {p for p in self.patterns if not GLOB_CHARS & set(p) and '/' not in p}
+        self.name_globs = [p for p in self.patterns if GLOB_CHARS & set(p) and '/' not in p]
+        self.path_globs = [p for p in self.patterns if '/' in p]
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def matches(self, parts: tuple[str, ...]) -> bool:
+        """
+        Indica se la cartella con path relativo `parts` è esclusa.
+
+        Esempio:
+            ExclusionFilter(['*_backup']).matches(('Banca', 'Enel_backup')) → True
+        """
+        name = parts[-1]
+        if name in self.names:
+            return True
+        if any(fnmatchcase(name, pattern) for pattern in self.name_globs):
+            return True
+        if self.path_globs:
+            path = '/'.join(parts)
+            return any(fnmatchcase(path, pattern) for pattern in self.path_globs)
+        return False
+
+    def prune(self, parent: tuple[str, ...], names: list[str]) -> list[str]:
+        """
+        Restituisce i nomi delle sottocartelle di `parent` che non sono escluse,
+        aggiornando il conteggio di quelle scartate.
+        """
+        kept = [name for name in names if not self.matches(parent + (name,))]
+
+        if len(kept) != len(names):
+            with self._lock:
+                self.skipped += len(names) - len(kept)
+        return kept
@@ -0,0 +1,327 @@
+# backend/app/paperless/manage_database/extraction.py
+
+"""
+Estrazione del testo dei file indicizzati (tabella `document_texts`), per la ricerca full-text.
+
+Per ogni file dell'indice (vedi `manage_database.files`):
+
+- i PDF vengono letti dal livello di testo incorporato (`pypdf`);
+- se il livello di testo manca o è quasi vuoto (una scansione), e per le immagini,
+  si ricorre all'OCR locale di Tesseract; le pagine dei PDF vengono prima
+  convertite in immagini con `pdftoppm` (poppler);
+- se i programmi necessari non sono installati il file viene registrato senza testo.
+
+L'estrazione è incrementale: vengono elaborati solo i file senza testo o il cui hash
+è cambiato dall'ultima estrazione. Un file la cui estrazione fallisce viene registrato
+con l'errore e ritentato dalle estrazioni successive, al più `MAX_ATTEMPTS` volte
+con lo stesso contenuto. Il lavoro è distribuito su un pool di processi con
+una coda limitata (`queue_size` file in elaborazione al più), così che la memoria
+non cresca con il numero di file, e i risultati vengono salvati a blocchi man mano.
+
+`start_extraction` esegue l'estrazione in un thread in background; è ammessa una
+sola estrazione alla volta per processo.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from os import PathLike
+from typing import Optional, Union
+
+from sqlalchemy import and_, case, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.database import session_scope
+from app.logger import logger
+from app.paperless import models
+from app.paperless.manage_database.constants import ARCHIVE_PATH
+from app.paperless.manage_database.core import path_labels_statement
+
+# Il livello di testo dei PDF si legge con pypdf, opzionale come per il conteggio delle pagine
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+# Lingue passate a Tesseract
+OCR_LANGUAGES = os.getenv('OCR_LANGUAGES', 'ita+eng')
+
+# Risoluzione con cui le pagine dei PDF vengono convertite in immagini per l'OCR
+OCR_DPI = 300
+
+# Sotto questo numero di caratteri il livello di testo viene considerato assente
+MIN_TEXT_LENGTH = 20
+
+# Tempo massimo concesso a un singolo comando esterno (pdftoppm, tesseract), in secondi
+COMMAND_TIMEOUT = 300
+
+IMAGE_SUFFIXES = ('.png', '.jpg', '.jpeg', '.tif', '.tiff')
+
+# Risultati salvati per ogni transazione
+FLUSH_SIZE = 100
+
+# Tentativi di estrazione di uno stesso contenuto prima di rinunciare
+MAX_ATTEMPTS = 3
+
+
+@dataclass
+class ExtractionReport:
+    """
+    Riepilogo di un'estrazione.
+
+    Attributi:
+        processed (int): file elaborati.
+        text (int): file con testo dal livello di testo del PDF.
+        ocr (int): file con testo ottenuto dall'OCR.
+        empty (int): file senza testo (formato non supportato o OCR non disponibile).
+        failed (int): file la cui elaborazione ha sollevato un errore, da ritentare.
+    """
+
+    processed: int = 0
+    text: int = 0
+    ocr: int = 0
+    empty: int = 0
+    failed: int = 0
+
+    def __str__(self):
+        return (
+            f'file elaborati: {self.processed}\n'
+            f'livello di testo: {self.text}\n'
+            f'ocr: {self.ocr}\n'
+            f'senza testo: {self.empty}\n'
+            f'falliti: {self.failed}'
+        )
+
+
+def pdf_text(location: Union[str, PathLike]) -> str:
+    """Restituisce il livello di testo di un PDF (vuoto se assente o se pypdf non è installato)."""
+    if PdfReader is None:
+        return ''
+    reader = PdfReader(location)
+    return '\n'.join(page.extract_text() or '' for page in reader.pages)
+
+
+def ocr_image(location: Union[str, PathLike]) -> str:
+    """Esegue l'OCR di un'immagine con Tesseract (vuoto se Tesseract non è installato)."""
+    if shutil.which('tesseract') is None:
+        return ''
+    result = subprocess.run(['tesseract', str(location), 'stdout', '-l', OCR_LANGUAGES],
+                            capture_output=True, text=True, timeout=COMMAND_TIMEOUT, check=True)
+    return result.stdout
+
+
+def ocr_pdf(location: Union[str, PathLike]) -> str:
+    """
+    Esegue l'OCR di un PDF: le pagine vengono convertite in PNG con `pdftoppm` in una
+    cartella temporanea e lette una alla volta da Tesseract.
+    """
+    if shutil.which('pdftoppm') is None or shutil.which('tesseract') is None:
+        return ''
+    with tempfile.TemporaryDirectory(prefix='homeharbor-ocr-') as folder:
+        subprocess.run(['pdftoppm', '-r', str(OCR_DPI), '-png', str(location), os.path.join(folder, 'page')],
+                       capture_output=True, timeout=COMMAND_TIMEOUT, check=True)
+        pages = sorted(os.listdir(folder))
+        return '\n'.join(ocr_image(os.path.join(folder, page)) for page in pages)
+
+
+def extract_text(location: Union[str, PathLike]) -> tuple[str, str]:
+    """
+    Estrae il testo di un file. Eseguita nei processi del pool, quindi deve restare
+    una funzione di modulo.
+
+    Args:
+        location (str | PathLike): percorso del file.
+
+    Returns:
+        tuple[str, str]: metodo ('text', 'ocr' o 'none') e testo estratto.
+    """
+    suffix = os.path.splitext(str(location))[1].lower()
+
+    if suffix == '.pdf':
+        text = pdf_text(location)
+        if len(text.strip()) >= MIN_TEXT_LENGTH:
+            return 'text', text
+        ocr = ocr_pdf(location)
+        if ocr.strip():
+            return 'ocr', ocr
+        return ('text', text) if text.strip() else ('none', '')
+
+    if suffix in IMAGE_SUFFIXES:
+        ocr = ocr_image(location)
+        if ocr.strip():
+            return 'ocr', ocr
+
+    return 'none', ''
+
+
+def pending_files(db: Session, root: Union[str, PathLike]) -> list[tuple[int, str, str]]:
+    """
+    Restituisce i file dell'indice da (ri)elaborare: senza testo estratto, con un hash
+    diverso da quello dell'ultima estrazione o la cui estrazione è fallita meno di
+    `MAX_ATTEMPTS` volte.
+
+    Returns:
+        list[tuple[int, str, str]]: terne (id del file, percorso assoluto, hash del contenuto).
+    """
+    DocumentFile, DocumentText = models.DocumentFile, models.DocumentText
+    statement = (
+        path_labels_statement()
+        .add_columns(DocumentFile.id, DocumentFile.filename, DocumentFile.content_hash)
+        .join(DocumentFile, DocumentFile.path_id == models.Path.id)
+        .outerjoin(DocumentText, DocumentText.file_id == DocumentFile.id)
+        .where(or_(
+            DocumentText.file_id.is_(None),
+            DocumentText.content_hash != DocumentFile.content_hash,
+            and_(DocumentText.error.is_not(None), DocumentText.attempts < MAX_ATTEMPTS),
+        ))
+        .order_by(DocumentFile.id)
+    )
+    return [
+        (file_id, os.path.join(root, *map(str, parts), filename), content_hash)
+        for *parts, file_id, filename, content_hash in db.execute(statement)
+    ]
+
+
+def save_texts(rows: list[dict]):
+    """
+    Salva un blocco di risultati con un'unica `INSERT ... ON CONFLICT DO UPDATE`.
+
+    Le righe di `document_files` vengono prima bloccate con `FOR KEY SHARE`: un'indicizzazione
+    concorrente non può eliminarle fino al commit, e i file eliminati nel frattempo
+    vengono scartati invece di violare la foreign key.
+
+    Un fallimento incrementa `attempts` se il contenuto è lo stesso del tentativo
+    precedente, altrimenti lo riporta a 1; un'estrazione riuscita lo azzera.
+    """
+    DocumentFile, DocumentText = models.DocumentFile, models.DocumentText
+    with session_scope() as db:
+        existing = set(db.execute(
+            select(DocumentFile.id)
+            .where(DocumentFile.id.in_([row['file_id'] for row in rows]))
+            .with_for_update(read=True, key_share=True)
+        ).scalars())
+        rows = [row for row in rows if row['file_id'] in existing]
+        if rows:
+            statement = insert(DocumentText).values(rows)
+            excluded = statement.excluded
+            attempts = case(
+                (excluded.error.is_(None), 0),
+                (DocumentText.content_hash == excluded.content_hash, DocumentText.attempts + 1),
+                else_=1
+            )
+            statement = statement.on_conflict_do_update(
+                index_elements=[DocumentText.file_id],
+                set_={**{column: excluded[column] for column in ('content_hash', 'method', 'content', 'error')},
+                      'attempts': attempts}
+            )
+            db.execute(statement)
+        db.commit()
+
+
+def run_extraction(root: Union[str, PathLike] = ARCHIVE_PATH, *, workers: Optional[int] = None,
+                   queue_size: Optional[int] = None) -> ExtractionReport:
+    """
+    Estrae il testo dei file nuovi o modificati dell'indice.
+
+    Args:
+        root (str | PathLike): root dell'archivio.
+        workers (int | None): processi del pool; None per uno per core.
+        queue_size (int | None): file in elaborazione al più contemporaneamente;
+            di default il doppio dei processi.
+
+    Returns:
+        ExtractionReport: numero di file elaborati, per esito.
+    """
+    with session_scope() as db:
+        jobs = pending_files(db, root)
+
+    report = ExtractionReport()
+    if not jobs:
+        return report
+
+    workers = workers or os.cpu_count() or 1
+    queue_size = queue_size or 2 * workers
+    buffer: list[dict] = []
+
+    def collect(future: Future, file_id: int, content_hash: str, location: str):
+        try:
+            method, content = future.result()
+        except Exception as e:
+            logger.warning(f"Estrazione del testo di {location} fallita: {e}")
+            report.failed += 1
+            method, content, error = 'none', '', str(e) or type(e).__name__
+        else:
+            outcome = 'empty' if method == 'none' else method
+            setattr(report, outcome, getattr(report, outcome) + 1)
+            error = None
+        report.processed += 1
+        # I caratteri NUL non sono ammessi nelle stringhe di Postgres
+        buffer.append({'file_id': file_id, 'content_hash': content_hash, 'method': method,
+                       'content': content.replace('\x00', ''), 'error': error,
+                       'attempts': 0 if error is None else 1})
+        if len(buffer) >= FLUSH_SIZE:
+            save_texts(buffer)
+            buffer.clear()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight: dict[Future, tuple[int, str, str]] = {}
+        for file_id, location, content_hash in jobs:
+            # Coda limitata: si attende che almeno un file sia concluso prima di inviarne altri
+            if len(in_flight) >= queue_size:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future, *in_flight.pop(future))
+            in_flight[pool.submit(extract_text, location)] = (file_id, content_hash, location)
+
+        for future in list(in_flight):
+            collect(future, *in_flight.pop(future))
+
+    if buffer:
+        save_texts(buffer)
+
+    logger.info(f"Estrazione del testo conclusa: {asdict(report)}")
+    return report
+
+
+_running = threading.Lock()
+_last_report: Optional[ExtractionReport] = None
+
+
+def start_extraction(root: Union[str, PathLike] = ARCHIVE_PATH, **options) -> bool:
+    """
+    Avvia `run_extraction` in un thread in background.
+
+    Args:
+        root (str | PathLike): root dell'archivio.
+        **options: argomenti aggiuntivi per `run_extraction` (workers, queue_size).
+
+    Returns:
+        bool: False se un'estrazione è già in corso (e non ne viene avviata un'altra).
+    """
+    if not _running.acquire(blocking=False):
+        return False
+
+    def run():
+        global _last_report
+        try:
+            _last_report = run_extraction(root, **options)
+        except Exception as e:
+            logger.error(f"Estrazione del testo fallita: {e}")
+        finally:
+            _running.release()
+
+    threading.Thread(target=run, name='text-extraction', daemon=True).start()
+    return True
+
+
+def extraction_state() -> dict:
+    """Restituisce se un'estrazione è in corso e il riepilogo dell'ultima conclusa."""
+    return {
+        'running': _running.locked(),
+        'report': asdict(_last_report) if _last_report is not None else None,
+    }
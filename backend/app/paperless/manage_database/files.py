@@ -0,0 +1,327 @@
+# backend/app/paperless/manage_database/files.py
+
+"""
+Indice dei file contenuti nelle cartelle documento (tabella `document_files`).
+
+La sincronizzazione mappa solo le cartelle: i file al loro interno (i PDF delle
+scansioni) vengono indicizzati da `index_files`, che per ogni `Path` elenca la
+cartella documento corrispondente e registra dimensione, mtime e hash del contenuto.
+
+- Un file la cui dimensione e il cui mtime coincidono con quelli già indicizzati
+  non viene riletto: l'hash salvato resta valido.
+- Gli hash dei file nuovi o modificati vengono calcolati in un pool di processi
+  (`ProcessPoolExecutor`): il calcolo è CPU bound e non sarebbe parallelizzabile
+  con i thread a causa del GIL.
+- Nello stesso passaggio viene letto il numero di pagine dei PDF (se `pypdf` è
+  installato), con cui si aggiorna `Document.pages`.
+
+Le righe dell'indice vengono eliminate insieme al loro `Path` (ON DELETE CASCADE).
+
+L'indice non viene aggiornato da `sync_db`: lo aggiornano i job di sincronizzazione
+(`manage_database.jobs`, opzione `files`, attiva di default), lo script con `--files`
+e `start_indexing`, che esegue `index_files` in un thread in background; è ammessa
+una sola indicizzazione in background alla volta per processo.
+"""
+
+import hashlib
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from os import PathLike
+from typing import Iterable, Iterator, Optional, Union
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.database import session_scope
+from app.logger import logger
+from app.paperless import models
+from app.paperless.cache import response_cache
+from app.paperless.generation import data_generation
+from app.paperless.manage_database.bulk import BATCH_SIZE
+from app.paperless.manage_database.constants import ARCHIVE_PATH
+from app.paperless.manage_database.core import path_labels_statement
+from app.paperless.manage_database.utils import lock_sync
+
+# La lettura delle pagine è opzionale: senza pypdf `pages` resta vuoto
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+# Dimensione dei blocchi letti per calcolare l'hash
+HASH_CHUNK_SIZE = 1 << 20
+
+# File per processo inviati in un colpo solo al pool: riduce il costo della comunicazione
+POOL_CHUNKSIZE = 16
+
+
+@dataclass
+class FileEntry:
+    """
+    File trovato in una cartella documento.
+
+    Attributi:
+        path_id (int): id del `Path` a cui appartiene.
+        filename (str): nome del file.
+        size (int): dimensione in byte.
+        mtime_ns (int): data di modifica, in nanosecondi.
+        location (str): percorso assoluto del file.
+    """
+
+    path_id: int
+    filename: str
+    size: int
+    mtime_ns: int
+    location: str
+
+
+@dataclass
+class IndexReport:
+    """
+    Riepilogo di un'indicizzazione dei file.
+
+    Attributi:
+        files (int): file trovati nelle cartelle documento.
+        hashed (int): file nuovi o modificati, di cui è stato calcolato l'hash.
+        removed (int): righe eliminate perché il file non esiste più.
+        documents (int): documenti di cui è stato aggiornato il numero di pagine.
+    """
+
+    files: int = 0
+    hashed: int = 0
+    removed: int = 0
+    documents: int = 0
+
+    def __str__(self):
+        return (
+            f'file: {self.files}\n'
+            f'ricalcolati: {self.hashed}\n'
+            f'eliminati: {self.removed}\n'
+            f'documenti aggiornati: {self.documents}'
+        )
+
+
+def count_pages(location: Union[str, PathLike]) -> Optional[int]:
+    """
+    Restituisce il numero di pagine di un PDF, o None se il file non è un PDF
+    leggibile o se `pypdf` non è installato.
+    """
+    if PdfReader is None or not str(location).lower().endswith('.pdf'):
+        return None
+    try:
+        return len(PdfReader(location).pages)
+    except Exception as e:
+        logger.warning(f"Impossibile leggere le pagine di {location}: {e}")
+        return None
+
+
+def file_digest(location: Union[str, PathLike]) -> str:
+    """Restituisce lo SHA-256 (esadecimale) del contenuto di un file, letto a blocchi."""
+    digest = hashlib.sha256()
+    with open(location, 'rb') as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_file(location: Union[str, PathLike]) -> tuple[str, Optional[int]]:
+    """
+    Calcola lo SHA-256 del contenuto di un file e, per i PDF, il numero di pagine.
+    Eseguita nei processi del pool, quindi deve restare una funzione di modulo.
+
+    Args:
+        location (str | PathLike): percorso del file.
+
+    Returns:
+        tuple[str, int | None]: hash esadecimale e numero di pagine.
+    """
+    return file_digest(location), count_pages(location)
+
+
+def list_files(root: Union[str, PathLike], paths: Iterable[tuple[int, tuple]]) -> Iterator[FileEntry]:
+    """
+    Elenca i file (non nascosti) delle cartelle documento, con dimensione e mtime.
+    Le cartelle che non esistono più vengono ignorate.
+
+    Args:
+        root (str | PathLike): root dell'archivio.
+        paths (Iterable[tuple[int, tuple]]): coppie (id del `Path`, nomi dei cinque livelli).
+    """
+    for path_id, parts in paths:
+        folder = os.path.join(root, *map(str, parts))
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.') or not entry.is_file(follow_symlinks=False):
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                    yield FileEntry(path_id, entry.name, stat.st_size, stat.st_mtime_ns, entry.path)
+        except OSError:
+            continue
+
+
+def hash_files(entries: list[FileEntry], workers: Optional[int] = None) -> list[tuple[str, Optional[int]]]:
+    """
+    Calcola hash e pagine dei file indicati, in un pool di `workers` processi
+    (di default uno per core). Con un solo file o un solo worker non avvia il pool.
+    """
+    locations = [entry.location for entry in entries]
+    if workers == 1 or len(locations) < 2:
+        return [hash_file(location) for location in locations]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(hash_file, locations, chunksize=POOL_CHUNKSIZE))
+
+
+def update_document_pages(db: Session, path_ids: Iterable[int]) -> int:
+    """
+    Aggiorna `Document.pages` dei documenti dei path indicati, con un'unica UPDATE:
+    le pagine di un documento sono la somma delle pagine dei suoi PDF; se il documento
+    compare in più path vale il path con più pagine. I documenti senza PDF leggibili
+    mantengono il valore attuale (ad esempio quello indicato alla creazione).
+
+    Returns:
+        int: numero di documenti aggiornati.
+    """
+    Path, DocumentFile = models.Path, models.DocumentFile
+    documents = select(Path.document).where(Path.id.in_(list(path_ids)))
+
+    per_path = (
+        select(Path.document.label('document'), func.sum(DocumentFile.pages).label('pages'))
+        .join(DocumentFile, DocumentFile.path_id == Path.id)
+        .where(DocumentFile.pages.is_not(None), Path.document.in_(documents))
+        .group_by(Path.id, Path.document)
+        .subquery()
+    )
+    per_document = (
+        select(per_path.c.document, func.max(per_path.c.pages).label('pages'))
+        .group_by(per_path.c.document)
+        .subquery()
+    )
+
+    statement = (
+        update(models.Document)
+        .where(models.Document.id == per_document.c.document)
+        .where(models.Document.pages.is_distinct_from(per_document.c.pages))
+        .values(pages=per_document.c.pages)
+    )
+    return db.execute(statement).rowcount
+
+
+def index_files(root: Union[str, PathLike] = ARCHIVE_PATH, *, workers: Optional[int] = None) -> IndexReport:
+    """
+    Aggiorna l'indice dei file delle cartelle documento e il numero di pagine dei documenti.
+
+    La lettura delle cartelle e il calcolo degli hash avvengono fuori da qualsiasi
+    transazione; le scritture sotto il lock delle sincronizzazioni (`lock_sync`), così
+    che nessun `Path` venga eliminato nel frattempo. Dopo il commit, se il numero di pagine
+    di qualche documento è cambiato, la cache delle risposte passa a una nuova generazione.
+
+    Args:
+        root (str | PathLike): root dell'archivio.
+        workers (int | None): processi del pool di hashing; None per uno per core.
+
+    Returns:
+        IndexReport: file trovati, ricalcolati, eliminati e documenti aggiornati.
+    """
+    DocumentFile = models.DocumentFile
+    with session_scope() as db:
+        paths = [(path_id, parts) for *parts, path_id in
+                 db.execute(path_labels_statement().add_columns(models.Path.id))]
+        indexed = {
+            (path_id, filename): (file_id, size, mtime_ns)
+            for file_id, path_id, filename, size, mtime_ns in db.execute(select(
+                DocumentFile.id, DocumentFile.path_id, DocumentFile.filename,
+                DocumentFile.size, DocumentFile.mtime_ns
+            ))
+        }
+
+    entries = list(list_files(root, paths))
+    found = {(entry.path_id, entry.filename) for entry in entries}
+
+    # Solo i file nuovi o con dimensione/mtime diversi vanno riletti
+    changed = [
+        entry for entry in entries
+        if indexed.get((entry.path_id, entry.filename), (None,))[1:] != (entry.size, entry.mtime_ns)
+    ]
+    removed = [file_id for key, (file_id, *_) in indexed.items() if key not in found]
+    report = IndexReport(files=len(entries), hashed=len(changed), removed=len(removed))
+    if not changed and not removed:
+        return report
+
+    results = hash_files(changed, workers)
+
+    with session_scope() as db:
+        lock_sync(db)
+        # I path eliminati da una sincronizzazione dopo la lettura non vanno più indicizzati
+        existing = set(db.execute(select(models.Path.id).where(
+            models.Path.id.in_({entry.path_id for entry in changed})
+        )).scalars())
+
+        rows = [
+            {'path_id': entry.path_id, 'filename': entry.filename, 'size': entry.size,
+             'mtime_ns': entry.mtime_ns, 'content_hash': content_hash, 'pages': pages}
+            for entry, (content_hash, pages) in zip(changed, results) if entry.path_id in existing
+        ]
+        for start in range(0, len(rows), BATCH_SIZE):
+            statement = insert(DocumentFile).values(rows[start:start + BATCH_SIZE])
+            statement = statement.on_conflict_do_update(
+                constraint='unique_document_file',
+                set_={column: statement.excluded[column] for column in ('size', 'mtime_ns', 'content_hash', 'pages')}
+            )
+            db.execute(statement)
+
+        for start in range(0, len(removed), BATCH_SIZE):
+            db.execute(delete(DocumentFile).where(DocumentFile.id.in_(removed[start:start + BATCH_SIZE])))
+
+        touched = {row['path_id'] for row in rows} | {key[0] for key in indexed if key not in found}
+        report.documents = update_document_pages(db, touched)
+        db.commit()
+
+    if report.documents:
+        data_generation.refresh()
+        response_cache.invalidate()
+    logger.info(f"Indice dei file aggiornato: {report.hashed} ricalcolati, {report.removed} eliminati")
+    return report
+
+
+_running = threading.Lock()
+_last_report: Optional[IndexReport] = None
+
+
+def start_indexing(root: Union[str, PathLike] = ARCHIVE_PATH, **options) -> bool:
+    """
+    Avvia `index_files` in un thread in background.
+
+    Args:
+        root (str | PathLike): root dell'archivio.
+        **options: argomenti aggiuntivi per `index_files` (workers).
+
+    Returns:
+        bool: False se un'indicizzazione è già in corso (e non ne viene avviata un'altra).
+    """
+    if not _running.acquire(blocking=False):
+        return False
+
+    def run():
+        global _last_report
+        try:
+            _last_report = index_files(root, **options)
+        except Exception as e:
+            logger.error(f"Indicizzazione dei file fallita: {e}")
+        finally:
+            _running.release()
+
+    threading.Thread(target=run, name='file-index', daemon=True).start()
+    return True
+
+
+def indexing_state() -> dict:
+    """Restituisce se un'indicizzazione è in corso e il riepilogo dell'ultima conclusa."""
+    return {
+        'running': _running.locked(),
+        'report': asdict(_last_report) if _last_report is not None else None,
+    }
@@ -0,0 +1,62 @@
+# backend/app/paperless/manage_database/hooks.py
+
+"""
+Registro delle funzioni da richiamare dopo il commit di una sincronizzazione.
+
+Le cache in memoria dell'applicazione (es. l'indice di autocompletamento dei
+documenti) si registrano qui per essere aggiornate in modo incrementale con le
+sole modifiche applicate, invece di essere ricostruite rileggendo il database.
+
+Ogni hook riceve un `SyncPlan` con le voci effettivamente create ed eliminate
+per livello (e per `paths`). Gli errori di un hook vengono registrati nel log
+ma non annullano la sincronizzazione, che a quel punto è già stata salvata.
+Prima degli hook viene riletta la generazione dei dati (vedi `paperless.generation`),
+così che tutti vedano, senza altre query, quella prodotta dal commit appena eseguito.
+"""
+
+from typing import Callable
+
+from app.logger import logger
+from app.paperless.generation import data_generation
+from app.paperless.manage_database.plan import SyncPlan
+
+SyncHook = Callable[[SyncPlan], None]
+
+_hooks: list[SyncHook] = []
+
+
+def register_sync_hook(hook: SyncHook) -> SyncHook:
+    """
+    Registra `hook` tra le funzioni da richiamare dopo ogni sincronizzazione.
+    Può essere usata anche come decoratore.
+
+    Esempio:
+        @register_sync_hook
+        def on_sync(changes: SyncPlan):
+            ...
+    """
+    if hook not in _hooks:
+        _hooks.append(hook)
+    return hook
+
+
+def unregister_sync_hook(hook: SyncHook):
+    """Rimuove `hook` dal registro, se presente."""
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def run_sync_hooks(changes: SyncPlan):
+    """
+    Richiama tutti gli hook registrati con le modifiche appena salvate.
+    Non fa nulla se la sincronizzazione non ha modificato il database.
+    """
+    if changes.is_empty():
+        return
+
+    data_generation.refresh()
+    for hook in list(_hooks):
+        try:
+            hook(changes)
+        except Exception as e:
+            logger.error(f"Hook di sincronizzazione {hook.__name__} fallito: {e}")
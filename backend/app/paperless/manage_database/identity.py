@@ -0,0 +1,251 @@
+# backend/app/paperless/manage_database/identity.py
+
+"""
+Identity map nome → id dei cinque livelli della gerarchia (categoria, utenza,
+anno, tipo documento, documento).
+
+Risolvere un path significa tradurre cinque nomi nei rispettivi id: senza cache
+ogni path costava cinque SELECT. Le tabelle dei livelli sono piccole, quindi la
+mappa di un livello viene caricata per intero con una sola query al primo utilizzo
+e poi mantenuta aggiornata:
+
+- `get_or_create` e il motore bulk registrano gli id delle entità inserite;
+- `remove` e il motore bulk rimuovono quelli delle entità eliminate.
+
+Le modifiche fatte da una sessione restano private alla sessione fino al commit
+(vedi `_apply_pending`): un rollback le scarta senza lasciare nella mappa id
+di righe mai salvate. Le sincronizzazioni azzerano la mappa dopo aver acquisito
+il lock (vedi `lock_sync`), così da non usare id eliminati da un altro processo.
+
+Fuori dalle sincronizzazioni la mappa viene azzerata:
+- se la generazione dei dati (vedi `paperless.generation`) è andata oltre quella
+  della mappa, cioè se un'altra transazione ha modificato la gerarchia. Al commit
+  di una sessione che ha modificato la mappa, la generazione della sua transazione
+  viene letta prima del commit: se è la successiva di quella della mappa le modifiche
+  vengono applicate, altrimenti la mappa viene azzerata;
+- a ogni `IntegrityError`, tipicamente un id della mappa eliminato nel frattempo.
+"""
+
+import threading
+from typing import Iterable, Optional
+
+from sqlalchemy import event, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.paperless import models
+from app.paperless.generation import data_generation
+from app.paperless.manage_database.constants import MODELS_USING_INTEGER_NAME
+
+# Modelli dei livelli della gerarchia, indicizzati con i nomi di `DB_Tree.structure`
+LEVEL_MODELS = {
+    'category': models.Category,
+    'utility': models.Utility,
+    'year': models.Year,
+    'document_type': models.DocumentType,
+    'document': models.Document,
+}
+
+# Chiave di `Session.info` con le modifiche non ancora salvate della sessione
+_PENDING_KEY = 'identity_map_pending'
+# Chiave di `Session.info` con la generazione dei dati prodotta dalla transazione che sta per essere salvata
+_GENERATION_KEY = 'identity_map_generation'
+
+# Generazione assegnata dal trigger alla transazione corrente, se ha modificato la gerarchia
+TRANSACTION_GENERATION = text(
+    "SELECT value FROM paperless.generations WHERE name = 'data' AND xact = txid_current_if_assigned()"
+)
+
+
+class IdentityMap:
+    """
+    Cache condivisa tra i thread, indicizzata per modello e per nome (come stringa).
+    Un id `None` nelle modifiche in sospeso indica un'entità eliminata.
+
+    Attributi:
+        generation (Optional[int]): generazione dei dati a cui corrisponde la mappa.
+
+    Esempio:
+        identity_map.get(db, models.Category, 'Banca')
+        identity_map.resolve(db, models.Utility, ['Enel', 'Hera'])
+    """
+
+    def __init__(self):
+        self._ids: dict[type, dict[str, int]] = {}
+        self.generation: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _pending(db: Session, model) -> dict[str, Optional[int]]:
+        return db.info.setdefault(_PENDING_KEY, {}).setdefault(model, {})
+
+    def _expire(self):
+        """Azzera la mappa se la generazione dei dati è andata oltre quella della mappa."""
+        generation = data_generation.current()
+        with self._lock:
+            if self.generation is not None and generation > self.generation:
+                self._ids.clear()
+                self.generation = None
+
+    def _load(self, db: Session, model) -> dict[str, int]:
+        """Carica la mappa di un livello con una sola query, se non è già presente."""
+        with self._lock:
+            ids = self._ids.get(model)
+        if ids is not None:
+            return ids
+
+        # Letta prima dei nomi: al più la mappa verrà ricaricata una volta di troppo
+        generation = data_generation.current()
+
+        # Ordinati per id decrescente: a parità di nome (i documenti non sono univoci) vince il più basso
+        statement = select(model.name, model.id).order_by(model.id.desc())
+        ids = {str(name): obj_id for name, obj_id in db.execute(statement)}
+        # Le righe inserite o eliminate dalla transazione in corso non vanno condivise prima del commit
+        pending = self._pending(db, model)
+        if pending:
+            ids = {name: obj_id for name, obj_id in ids.items() if name not in pending}
+        with self._lock:
+            if self.generation is None:
+                self.generation = generation
+            return self._ids.setdefault(model, ids)
+
+    def warm(self, db: Session, levels: Iterable[str] = LEVEL_MODELS):
+        """Carica le mappe dei livelli indicati (di default tutti), una query per livello."""
+        self._expire()
+        for level in levels:
+            self._load(db, LEVEL_MODELS[level])
+
+    def get(self, db: Session, model, name) -> Optional[int]:
+        """
+        Restituisce l'id dell'entità `name` di `model`, o None se non esiste.
+
+        Un nome assente dalla mappa viene cercato nel database (potrebbe essere
+        stato creato da un altro processo) e, se trovato, aggiunto alla mappa.
+        """
+        name = str(name)
+        pending = self._pending(db, model)
+        if name in pending:
+            return pending[name]
+
+        self._expire()
+        # Se la mappa è appena stata caricata un nome assente non esiste davvero
+        loaded_now = model not in self._ids
+        obj_id = self._load(db, model).get(name)
+        if obj_id is None and not loaded_now:
+            value = int(name) if model in MODELS_USING_INTEGER_NAME else name
+            obj_id = db.execute(select(model.id).where(model.name == value).order_by(model.id)).scalar()
+            if obj_id is not None:
+                self._remember(model, {name: obj_id})
+        return obj_id
+
+    def resolve(self, db: Session, model, names: Iterable) -> dict[str, int]:
+        """
+        Come `get` per più nomi, con al più una query per i nomi assenti dalla mappa.
+
+        Returns:
+            dict[str, int]: mappa nome → id dei soli nomi esistenti.
+        """
+        pending = self._pending(db, model)
+        self._expire()
+        loaded_now = model not in self._ids
+        ids = self._load(db, model)
+
+        resolved, missing = {}, []
+        for name in map(str, names):
+            obj_id = pending[name] if name in pending else ids.get(name)
+            if obj_id is not None:
+                resolved[name] = obj_id
+            elif name not in pending:
+                missing.append(name)
+
+        if missing and not loaded_now:
+            values = [int(name) if model in MODELS_USING_INTEGER_NAME else name for name in missing]
+            statement = select(model.name, model.id).where(model.name.in_(values)).order_by(model.id.desc())
+            found = {str(name): obj_id for name, obj_id in db.execute(statement)}
+            self._remember(model, found)
+            resolved.update(found)
+        return resolved
+
+    def seed(self, model, ids: dict[str, int]):
+        """Sostituisce la mappa di un livello con una appena letta dal database (es. da `load_state`)."""
+        generation = data_generation.current()
+        with self._lock:
+            if self.generation is None:
+                self.generation = generation
+            self._ids[model] = dict(ids)
+
+    def _remember(self, model, found: dict[str, int]):
+        # Se nel frattempo la mappa è stata svuotata verrà ricaricata per intero
+        with self._lock:
+            ids = self._ids.get(model)
+            if ids is not None:
+                ids.update(found)
+
+    def add(self, db: Session, model, name, obj_id: int):
+        """Registra un'entità inserita da `db`; diventa visibile agli altri al commit."""
+        self._pending(db, model)[str(name)] = obj_id
+
+    def discard(self, db: Session, model, name):
+        """Registra un'entità eliminata da `db`; viene rimossa dalla mappa al commit."""
+        self._pending(db, model)[str(name)] = None
+
+    def clear(self, *args):
+        """Svuota la mappa. Accetta argomenti ignorati per poter essere registrata come hook."""
+        with self._lock:
+            self._ids.clear()
+            self.generation = None
+
+    def _read_generation(self, db: Session):
+        """Prima del commit: legge la generazione prodotta dalla transazione, se ha modifiche per la mappa."""
+        if any(db.info.get(_PENDING_KEY, {}).values()):
+            db.info[_GENERATION_KEY] = db.execute(TRANSACTION_GENERATION).scalar()
+
+    def _apply_pending(self, db: Session):
+        generation = db.info.pop(_GENERATION_KEY, None)
+        pending = db.info.pop(_PENDING_KEY, {})
+        with self._lock:
+            if generation is not None and self.generation is not None:
+                if generation != self.generation + 1:
+                    # Altre transazioni hanno modificato la gerarchia dal caricamento della mappa
+                    self._ids.clear()
+                    self.generation = None
+                    return
+                self.generation = generation
+
+        for model, changes in pending.items():
+            with self._lock:
+                ids = self._ids.get(model)
+                if ids is None:
+                    continue
+                for name, obj_id in changes.items():
+                    if obj_id is None:
+                        ids.pop(name, None)
+                    else:
+                        ids[name] = obj_id
+
+
+identity_map = IdentityMap()
+
+
+@event.listens_for(Session, 'before_commit')
+def _read_generation(db: Session):
+    identity_map._read_generation(db)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_pending(db: Session):
+    identity_map._apply_pending(db)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_pending(db: Session, previous_transaction):
+    db.info.pop(_PENDING_KEY, None)
+    db.info.pop(_GENERATION_KEY, None)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _clear_on_integrity_error(context):
+    # Un vincolo violato può dipendere da id della mappa non più validi
+    if isinstance(context.sqlalchemy_exception, IntegrityError):
+        identity_map.clear()
@@ -0,0 +1,509 @@
+# backend/app/paperless/manage_database/ingestion.py
+
+"""
+Archiviazione delle scansioni: dalla voce `PendingScan` al file nella cartella documento.
+
+Lo scanner deposita i file prodotti (PDF o immagini) nella cartella di acquisizione
+(`SCAN_DROP_PATH`). Un file appartiene alla voce `PendingScan` indicata dalla colonna
+`filename` oppure, se questa è vuota, a quella con l'id con cui inizia il suo nome
+('12.pdf', oppure '12-1.jpg', '12-2.jpg' per più pagine). Per ogni voce con i file pronti:
+
+1. la voce viene presa con `SELECT ... FOR UPDATE SKIP LOCKED`: più worker (thread o
+   processi) possono lavorare insieme, ognuno su voci diverse, senza attese;
+2. i file passano per le fasi di elaborazione registrate (`register_scan_stage`), che
+   possono verificarli, trasformarli o rinominarli, o scartare la scansione (`ScanRejected`);
+3. sotto il lock delle sincronizzazioni (`lock_sync`) i file vengono spostati nella
+   cartella `categoria/utenza/anno/tipo/documento` e, nella stessa transazione, vengono
+   registrati il `Path` (con gli eventuali livelli nuovi) e i file nell'indice
+   (`document_files`), e la voce viene eliminata.
+
+Se la transazione fallisce i file tornano nella cartella di acquisizione. Una scansione
+scartata da una fase, o che fallisce `MAX_ATTEMPTS` volte, resta con stato 'failed' e
+l'errore, finché non viene rimessa in coda.
+
+Le fasi e l'hash dei file vengono eseguiti prima del lock delle sincronizzazioni, che
+serializza solo lo spostamento dei file e le scritture.
+"""
+
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from os import PathLike
+from typing import Callable, Optional, Union
+
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database import session_scope
+from app.logger import logger
+from app.paperless import models
+from app.paperless.cache import response_cache
+from app.paperless.downloads import archive_location
+from app.paperless.generation import data_generation
+from app.paperless.manage_database.bulk import bulk_insert_names
+from app.paperless.manage_database.constants import ARCHIVE_PATH, SCAN_DROP_PATH
+from app.paperless.manage_database.files import hash_file, update_document_pages
+from app.paperless.manage_database.hooks import run_sync_hooks
+from app.paperless.manage_database.identity import LEVEL_MODELS, identity_map
+from app.paperless.manage_database.plan import SyncPlan
+from app.paperless.manage_database.tree import DB_Tree
+from app.paperless.manage_database.utils import lock_sync
+from app.paperless.schema.creation import check_path_label
+
+# La verifica dei PDF è opzionale, come il conteggio delle pagine
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+# Estensioni dei file prodotti dallo scanner
+SCAN_SUFFIXES = ('.pdf', '.png', '.jpg', '.jpeg', '.tif', '.tiff')
+
+# Un file non modificato da questi secondi è considerato completo: lo scanner ha finito di scriverlo
+SETTLE_SECONDS = 2.0
+
+# Tentativi dopo i quali una scansione che continua a fallire viene scartata
+MAX_ATTEMPTS = 3
+
+# Nome dei file archiviati, come le scansioni già presenti ('scan.pdf', 'scan-2.pdf', ...)
+SCAN_NAME = 'scan'
+
+
+class ScanRejected(Exception):
+    """Sollevata da una fase di elaborazione per scartare una scansione (non viene ritentata)."""
+
+
+@dataclass
+class ScanJob:
+    """
+    Scansione in elaborazione, passata alle fasi registrate.
+
+    Attributi:
+        scan_id (int): id della voce `PendingScan`.
+        labels (tuple[str, ...]): nomi dei cinque livelli del path di destinazione.
+        folder (str): cartella documento di destinazione, già risolta e dentro l'archivio.
+        sources (list[str]): file da archiviare, in ordine di pagina; una fase può sostituirli
+            (es. unire le pagine in un unico PDF).
+        names (list[str]): nomi dei file nella cartella documento, uno per file; se una fase
+            non li assegna restano quelli dei file. In caso di conflitto con un file già
+            presente viene aggiunto un numero.
+    """
+
+    scan_id: int
+    labels: tuple[str, ...]
+    folder: str
+    sources: list[str]
+    names: list[str] = field(default_factory=list)
+
+
+@dataclass
+class IngestionReport:
+    """
+    Riepilogo di un'archiviazione.
+
+    Attributi:
+        filed (int): scansioni archiviate.
+        failed (int): scansioni scartate (stato 'failed').
+        retried (int): tentativi falliti di scansioni rimaste in coda.
+    """
+
+    filed: int = 0
+    failed: int = 0
+    retried: int = 0
+
+    def __str__(self):
+        return (
+            f'archiviate: {self.filed}\n'
+            f'scartate: {self.failed}\n'
+            f'da ritentare: {self.retried}'
+        )
+
+
+ScanStage = Callable[[ScanJob], None]
+
+_stages: list[ScanStage] = []
+
+
+def register_scan_stage(stage: ScanStage) -> ScanStage:
+    """
+    Aggiunge `stage` in coda alle fasi di elaborazione delle scansioni.
+    Può essere usata anche come decoratore.
+
+    Esempio:
+        @register_scan_stage
+        def deskew(job: ScanJob):
+            ...
+    """
+    if stage not in _stages:
+        _stages.append(stage)
+    return stage
+
+
+def unregister_scan_stage(stage: ScanStage):
+    """Rimuove `stage` dalle fasi di elaborazione, se presente."""
+    if stage in _stages:
+        _stages.remove(stage)
+
+
+def check_files(job: ScanJob):
+    """Fase: scarta le scansioni con file vuoti, di formato non supportato o PDF illeggibili."""
+    for source in job.sources:
+        suffix = os.path.splitext(source)[1].lower()
+        if suffix not in SCAN_SUFFIXES:
+            raise ScanRejected(f"Formato non supportato: {os.path.basename(source)}")
+        if os.path.getsize(source) == 0:
+            raise ScanRejected(f"File vuoto: {os.path.basename(source)}")
+        if suffix == '.pdf' and PdfReader is not None:
+            try:
+                PdfReader(source).pages[0]
+            except Exception as e:
+                raise ScanRejected(f"PDF non leggibile: {os.path.basename(source)} ({e})") from e
+
+
+def name_files(job: ScanJob):
+    """Fase: assegna ai file i nomi delle scansioni dell'archivio ('scan.pdf', 'scan-2.jpg', ...)."""
+    job.names = [
+        f'{SCAN_NAME}{"" if index == 1 else f"-{index}"}{os.path.splitext(source)[1].lower()}'
+        for index, source in enumerate(job.sources, start=1)
+    ]
+
+
+register_scan_stage(check_files)
+register_scan_stage(name_files)
+
+
+def _scan_id(filename: str) -> Optional[int]:
+    """Id della voce a cui appartiene un file nominato per id ('12.pdf', '12-2.jpg'), o None."""
+    prefix = os.path.splitext(filename)[0].split('-', 1)[0]
+    return int(prefix) if prefix.isdigit() else None
+
+
+def _page_key(filename: str) -> tuple[int, str]:
+    """Ordina i file di una scansione per numero di pagina ('12.pdf' prima di '12-2.pdf' e '12-10.pdf')."""
+    _, _, page = os.path.splitext(filename)[0].partition('-')
+    return (int(page) if page.isdigit() else 0), filename
+
+
+def ready_files(drop: Union[str, PathLike], settle: float = SETTLE_SECONDS) -> dict[str, str]:
+    """
+    Elenca i file (non nascosti) della cartella di acquisizione che non vengono
+    modificati da almeno `settle` secondi.
+
+    Returns:
+        dict[str, str]: mappa nome → percorso assoluto.
+    """
+    limit = time.time() - settle
+    ready = {}
+    try:
+        with os.scandir(drop) as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or not entry.is_file(follow_symlinks=False):
+                    continue
+                if entry.stat(follow_symlinks=False).st_mtime <= limit:
+                    ready[entry.name] = entry.path
+    except FileNotFoundError:
+        pass
+    return ready
+
+
+def claim_scan(db: Session, ready: dict[str, str]) -> Optional[models.PendingScan]:
+    """
+    Blocca la prima voce in attesa di cui ci sono file pronti, saltando quelle già
+    bloccate da altri worker (`FOR UPDATE SKIP LOCKED`). Il lock dura fino alla fine
+    della transazione di `db`.
+    """
+    PendingScan = models.PendingScan
+    ids = {scan_id for scan_id in map(_scan_id, ready) if scan_id is not None}
+    statement = (
+        select(PendingScan)
+        .where(PendingScan.status == 'pending')
+        .where(or_(PendingScan.filename.in_(list(ready)),
+                   PendingScan.filename.is_(None) & PendingScan.id.in_(ids)))
+        .order_by(PendingScan.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    return db.execute(statement).scalar()
+
+
+def scan_files(scan: models.PendingScan, ready: dict[str, str]) -> list[str]:
+    """Restituisce i file pronti della voce `scan`, in ordine di pagina."""
+    if scan.filename:
+        return [ready[scan.filename]] if scan.filename in ready else []
+    names = sorted((name for name in ready if _scan_id(name) == scan.id), key=_page_key)
+    return [ready[name] for name in names]
+
+
+def register_path(db: Session, labels: tuple[str, ...]) -> tuple[int, dict[str, list[str]], bool]:
+    """
+    Restituisce l'id del `Path` con i livelli `labels`, creandolo (con i livelli mancanti)
+    se non esiste. Non esegue il commit.
+
+    Returns:
+        tuple[int, dict, bool]: id del path, nomi dei livelli creati e se il path è stato creato.
+    """
+    key, created = {}, {}
+    for level, name in zip(DB_Tree.structure, labels):
+        model = LEVEL_MODELS[level]
+        obj_id = identity_map.get(db, model, name)
+        if obj_id is None:
+            obj_id = bulk_insert_names(db, model, [name])[name]
+            identity_map.add(db, model, name, obj_id)
+            created[level] = [name]
+        key[level] = obj_id
+
+    Path = models.Path
+    statement = insert(Path).values(key).on_conflict_do_nothing().returning(Path.id)
+    path_id = db.execute(statement).scalar()
+    if path_id is not None:
+        return path_id, created, True
+
+    columns = [getattr(Path, level) == obj_id for level, obj_id in key.items()]
+    return db.execute(select(Path.id).where(*columns)).scalar_one(), created, False
+
+
+def _free_name(folder: str, name: str, taken: set[str]) -> str:
+    """Primo nome libero nella cartella: `name`, poi 'nome-2.ext', 'nome-3.ext', ..."""
+    stem, suffix = os.path.splitext(name)
+    candidate, index = name, 1
+    while candidate in taken or os.path.lexists(os.path.join(folder, candidate)):
+        index += 1
+        candidate = f'{stem}-{index}{suffix}'
+    return candidate
+
+
+def scan_folder(root: Union[str, PathLike], labels: tuple[str, ...]) -> str:
+    """
+    Restituisce la cartella documento di una scansione, risolta con `realpath`.
+
+    I nomi sono già verificati alla creazione della voce (vedi `PathLabelsCreationSchema`),
+    ma una voce può essere stata inserita direttamente nel database.
+
+    Raises:
+        ScanRejected: se un nome non è un nome di cartella valido o se la cartella
+            (per esempio tramite un link simbolico) è fuori dall'archivio.
+    """
+    try:
+        for level, label in zip(DB_Tree.structure, labels):
+            if level != 'year':
+                check_path_label(label)
+    except ValueError as e:
+        raise ScanRejected(f"Nome non valido: {e}")
+
+    folder = archive_location(root, *labels)
+    if folder is None:
+        raise ScanRejected("La cartella di destinazione è fuori dall'archivio")
+    return folder
+
+
+def file_scan(db: Session, job: ScanJob, hashes: list[tuple[str, Optional[int]]],
+              moved: list[tuple[str, str]]) -> SyncPlan:
+    """
+    Sposta i file di `job` nella cartella documento e registra path e file nella
+    transazione di `db` (senza commit), sotto il lock delle sincronizzazioni.
+
+    Args:
+        db (Session): sessione con la voce `PendingScan` bloccata.
+        job (ScanJob): scansione elaborata dalle fasi.
+        hashes (list[tuple[str, int | None]]): hash e pagine di ogni file (vedi `hash_file`).
+        moved (list[tuple[str, str]]): riempita con le coppie (origine, destinazione) dei
+            file spostati, per riportarli indietro se la transazione fallisce.
+
+    Returns:
+        SyncPlan: livelli e path creati, per gli hook di sincronizzazione.
+    """
+    lock_sync(db)
+    path_id, created, path_created = register_path(db, job.labels)
+
+    os.makedirs(job.folder, exist_ok=True)
+    rows, taken = [], set()
+    for source, name, (content_hash, pages) in zip(job.sources, job.names or map(os.path.basename, job.sources),
+                                                   hashes):
+        name = _free_name(job.folder, name, taken)
+        taken.add(name)
+        # Anche il nome assegnato da una fase deve restare nella cartella documento
+        target = archive_location(job.folder, name)
+        if target is None or os.path.dirname(target) != job.folder:
+            raise ScanRejected(f"Nome del file non valido: {name}")
+        shutil.move(source, target)
+        moved.append((source, target))
+        stat = os.stat(target)
+        rows.append({'path_id': path_id, 'filename': name, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                     'content_hash': content_hash, 'pages': pages})
+
+    DocumentFile = models.DocumentFile
+    statement = insert(DocumentFile).values(rows)
+    statement = statement.on_conflict_do_update(
+        constraint='unique_document_file',
+        set_={column: statement.excluded[column] for column in ('size', 'mtime_ns', 'content_hash', 'pages')}
+    )
+    db.execute(statement)
+    update_document_pages(db, [path_id])
+
+    paths = ['/'.join(job.labels)] if path_created else []
+    return SyncPlan.from_dict({'create': {**created, 'paths': paths}})
+
+
+def restore_files(moved: list[tuple[str, str]]):
+    """Riporta nella cartella di acquisizione i file spostati da una transazione fallita."""
+    for source, target in reversed(moved):
+        try:
+            shutil.move(target, source)
+        except OSError as e:
+            logger.error(f"Impossibile riportare {target} in {source}: {e}")
+    moved.clear()
+
+
+def record_failure(scan: models.PendingScan, error: Exception) -> str:
+    """
+    Registra un tentativo fallito: la voce viene scartata se una fase l'ha rifiutata,
+    se i livelli non sono validi o dopo `MAX_ATTEMPTS` tentativi.
+
+    Returns:
+        str: 'failed' se la voce è stata scartata, altrimenti 'retried'.
+    """
+    scan.attempts += 1
+    scan.error = str(error)
+    if isinstance(error, (ScanRejected, IntegrityError)) or scan.attempts >= MAX_ATTEMPTS:
+        scan.status = 'failed'
+        return 'failed'
+    return 'retried'
+
+
+def ingest_next(root: Union[str, PathLike] = ARCHIVE_PATH,
+                drop: Union[str, PathLike] = SCAN_DROP_PATH) -> Optional[str]:
+    """
+    Archivia la prima scansione in attesa con i file pronti.
+
+    Args:
+        root (str | PathLike): root dell'archivio.
+        drop (str | PathLike): cartella di acquisizione.
+
+    Returns:
+        str | None: 'filed', 'failed' o 'retried'; None se nessuna scansione è pronta
+            (o sono tutte in elaborazione da altri worker).
+    """
+    ready = ready_files(drop)
+    if not ready:
+        return None
+
+    with session_scope() as db:
+        scan = claim_scan(db, ready)
+        sources = scan_files(scan, ready) if scan is not None else []
+        if not sources:
+            return None
+
+        labels = tuple(str(getattr(scan, level)) for level in DB_Tree.structure)
+        job = ScanJob(scan.id, labels, os.path.join(root, *labels), sources)
+        moved: list[tuple[str, str]] = []
+        try:
+            job.folder = scan_folder(root, labels)
+            for stage in list(_stages):
+                stage(job)
+            hashes = [hash_file(source) for source in job.sources]
+            # Il savepoint mantiene il lock sulla voce anche se l'archiviazione fallisce
+            with db.begin_nested():
+                changes = file_scan(db, job, hashes, moved)
+                db.delete(scan)
+        except Exception as e:
+            restore_files(moved)
+            # L'identity map potrebbe contenere livelli annullati dal rollback
+            identity_map.clear()
+            outcome = record_failure(scan, e)
+            db.commit()
+            logger.warning(f"Archiviazione della scansione {job.scan_id} fallita ({outcome}): {e}")
+            return outcome
+
+        try:
+            db.commit()
+        except Exception:
+            restore_files(moved)
+            identity_map.clear()
+            raise
+
+    logger.info(f"Scansione {job.scan_id} archiviata in {'/'.join(job.labels)}")
+    if changes.is_empty():
+        data_generation.refresh()
+        response_cache.invalidate()
+    else:
+        run_sync_hooks(changes)
+    return 'filed'
+
+
+def run_ingestion(root: Union[str, PathLike] = ARCHIVE_PATH, drop: Union[str, PathLike] = SCAN_DROP_PATH, *,
+                  poll: Optional[float] = None, stop: Optional[threading.Event] = None) -> IngestionReport:
+    """
+    Worker di archiviazione: elabora le scansioni pronte una dopo l'altra.
+    Più worker possono essere eseguiti insieme, in thread o processi diversi.
+
+    Args:
+        root (str | PathLike): root dell'archivio.
+        drop (str | PathLike): cartella di acquisizione.
+        poll (float | None): se indicato, quando non ci sono scansioni pronte attende
+            `poll` secondi e ricontrolla, fino a `stop`; altrimenti termina.
+        stop (threading.Event | None): evento che interrompe l'attesa.
+
+    Returns:
+        IngestionReport: scansioni archiviate, scartate e da ritentare.
+    """
+    report = IngestionReport()
+    while True:
+        outcome = ingest_next(root, drop)
+        if outcome is not None:
+            setattr(report, outcome, getattr(report, outcome) + 1)
+            continue
+        if poll is None:
+            break
+        if stop is not None:
+            if stop.wait(poll):
+                break
+        else:
+            time.sleep(poll)
+    return report
+
+
+_running = threading.Lock()
+_last_report: Optional[IngestionReport] = None
+
+
+def start_ingestion(root: Union[str, PathLike] = ARCHIVE_PATH, drop: Union[str, PathLike] = SCAN_DROP_PATH,
+                    workers: int = 1) -> bool:
+    """
+    Avvia in background `workers` worker di archiviazione, che terminano quando non
+    ci sono più scansioni pronte.
+
+    Returns:
+        bool: False se un'archiviazione avviata da questo processo è già in corso.
+    """
+    if not _running.acquire(blocking=False):
+        return False
+
+    def run():
+        global _last_report
+        try:
+            total = IngestionReport()
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scan-ingestion') as pool:
+                for report in pool.map(lambda _: run_ingestion(root, drop), range(workers)):
+                    for key, value in asdict(report).items():
+                        setattr(total, key, getattr(total, key) + value)
+            _last_report = total
+        except Exception as e:
+            logger.error(f"Archiviazione delle scansioni fallita: {e}")
+        finally:
+            _running.release()
+
+    threading.Thread(target=run, name='scan-ingestion', daemon=True).start()
+    return True
+
+
+def ingestion_state() -> dict:
+    """Restituisce se un'archiviazione è in corso e il riepilogo dell'ultima conclusa."""
+    return {
+        'running': _running.locked(),
+        'report': asdict(_last_report) if _last_report is not None else None,
+    }
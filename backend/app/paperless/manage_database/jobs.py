@@ -0,0 +1,185 @@
+# backend/app/paperless/manage_database/jobs.py
+
+"""
+Esecuzione delle sincronizzazioni come job in background.
+
+Ogni job ha un id e pubblica il proprio avanzamento (fase, voci elaborate,
+throughput e tempo stimato) tramite la callback `progress` di `sync_db`/`apply_plan`.
+Con l'opzione `files`, a sincronizzazione conclusa il job aggiorna anche l'indice dei
+file delle cartelle documento (`index_files`, fase 'files'), il cui riepilogo viene
+aggiunto a quello della sincronizzazione.
+Lo stato può essere letto puntualmente (`SyncJob.state`) o seguito in streaming
+(`SyncJob.stream`), che restituisce un evento a ogni cambiamento, al più uno ogni
+`min_interval` secondi, così che gli aggiornamenti riga per riga non intasino il client.
+
+È ammesso un solo job in esecuzione alla volta.
+"""
+
+import threading
+import time
+import uuid
+from dataclasses import asdict
+from os import PathLike
+from typing import Iterator, Optional, Union
+
+from app.logger import logger
+from app.paperless.manage_database.core import apply_plan, sync_db
+from app.paperless.manage_database.files import index_files
+from app.paperless.manage_database.plan import SyncPlan
+
+# Numero di job conclusi mantenuti in memoria per la consultazione
+MAX_FINISHED_JOBS = 20
+
+
+class SyncInProgress(Exception):
+    """Sollevata quando si tenta di avviare un job mentre un altro è in esecuzione."""
+
+
+class SyncJob:
+    """
+    Stato di una sincronizzazione eseguita in background.
+
+    Attributi:
+        id (str): identificativo del job.
+        status (str): 'running', 'done' o 'failed'.
+        phase (str): fase corrente ('pending', 'scan', 'diff', 'apply', 'commit', 'files').
+        processed (int): voci elaborate nella fase corrente.
+        total (int): voci totali della fase corrente (0 se non note).
+        report (dict | None): esito della sincronizzazione, a job concluso.
+        error (str | None): messaggio d'errore, se il job è fallito.
+    """
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = 'running'
+        self.phase = 'pending'
+        self.processed = 0
+        self.total = 0
+        self.report: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self._phase_started = time.monotonic()
+        self._version = 0
+        self._condition = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status != 'running'
+
+    def update(self, phase: str, processed: int = 0, total: int = 0):
+        """Callback di avanzamento da passare a `sync_db`."""
+        with self._condition:
+            if phase != self.phase:
+                self.phase = phase
+                self._phase_started = time.monotonic()
+            self.processed = processed
+            self.total = total
+            self._version += 1
+            self._condition.notify_all()
+
+    def finish(self, report: Optional[dict] = None, error: Optional[str] = None):
+        """Segna il job come concluso, con successo o con errore."""
+        with self._condition:
+            self.status = 'failed' if error else 'done'
+            self.phase = self.status
+            self.report = report
+            self.error = error
+            self._version += 1
+            self._condition.notify_all()
+
+    def state(self) -> dict:
+        """Restituisce lo stato corrente del job, con throughput (voci/s) ed ETA (s) della fase."""
+        elapsed = time.monotonic() - self._phase_started
+        throughput = self.processed / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.processed
+        eta = remaining / throughput if throughput and self.total else None
+
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'phase': self.phase,
+            'processed': self.processed,
+            'total': self.total,
+            'throughput': round(throughput, 1),
+            'eta': round(eta, 1) if eta is not None else None,
+            'elapsed': round(time.time() - self.started_at, 1),
+            'report': self.report,
+            'error': self.error,
+        }
+
+    def stream(self, heartbeat: float = 5.0, min_interval: float = 0.25) -> Iterator[dict]:
+        """
+        Generatore di stati: produce un evento a ogni cambiamento (al più uno ogni
+        `min_interval` secondi) o dopo `heartbeat` secondi senza novità, e termina
+        con lo stato finale del job.
+        """
+        seen = -1
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._version != seen, timeout=heartbeat)
+                seen = self._version
+                state = self.state()
+                finished = self.finished
+
+            yield state
+            if finished:
+                return
+            time.sleep(min_interval)
+
+
+_jobs: dict[str, SyncJob] = {}
+_lock = threading.Lock()
+
+
+def get_job(job_id: str) -> Optional[SyncJob]:
+    """Restituisce il job con l'id indicato, o None se non esiste (più)."""
+    return _jobs.get(job_id)
+
+
+def _run(job: SyncJob, path: Union[str, PathLike], plan: Optional[SyncPlan], files: bool, options: dict):
+    try:
+        if plan is not None:
+            report = asdict(apply_plan(plan, progress=job.update))
+        else:
+            report = asdict(sync_db(path, progress=job.update, **options))
+        if files:
+            job.update('files')
+            report['files'] = asdict(index_files(path))
+    except Exception as e:
+        logger.error(f"Job di sincronizzazione {job.id} fallito: {e}")
+        job.finish(error=str(e))
+    else:
+        job.finish(report=report)
+
+
+def start_sync_job(path: Union[str, PathLike], *, plan: Optional[SyncPlan] = None, files: bool = False,
+                   **options) -> SyncJob:
+    """
+    Avvia una sincronizzazione in un thread in background.
+
+    Args:
+        path (str | PathLike): root dell'archivio da sincronizzare.
+        plan (SyncPlan | None): se indicato, applica questo piano invece di riscansionare.
+        files (bool): se True, dopo la sincronizzazione aggiorna l'indice dei file.
+        **options: argomenti aggiuntivi per `sync_db` (bulk, incremental, workers, ...).
+
+    Returns:
+        SyncJob: il job avviato.
+
+    Raises:
+        SyncInProgress: se un'altra sincronizzazione è già in corso.
+    """
+    with _lock:
+        if any(not job.finished for job in _jobs.values()):
+            raise SyncInProgress("Una sincronizzazione è già in corso")
+
+        # Mantiene in memoria solo gli ultimi job conclusi
+        finished = [job_id for job_id, job in _jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS + 1)]:
+            del _jobs[job_id]
+
+        job = SyncJob()
+        _jobs[job.id] = job
+
+    threading.Thread(target=_run, args=(job, path, plan, files, options), name=f'sync-{job.id}', daemon=True).start()
+    return job
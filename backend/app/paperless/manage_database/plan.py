@@ -0,0 +1,72 @@
+# backend/app/paperless/manage_database/plan.py
+
+"""
+Piano di sincronizzazione: l'elenco delle modifiche che `sync_db` applicherebbe
+al database, calcolato senza scrivere nulla.
+
+Il piano è serializzabile in JSON, quindi può essere mostrato in anteprima
+dalla UI, salvato su file e applicato in un secondo momento con `apply_plan`.
+"""
+
+from dataclasses import dataclass, field
+
+from app.paperless.manage_database.tree import DB_Tree
+
+# Chiavi del piano: i cinque livelli più i path completi
+PLAN_KEYS = DB_Tree.structure + ['paths']
+
+
+@dataclass
+class SyncPlan:
+    """
+    Modifiche da applicare al database per allinearlo al file system.
+
+    Attributi:
+        create (dict[str, list[str]]): per ogni livello (e per `paths`), i nomi da creare.
+        delete (dict[str, list[str]]): per ogni livello (e per `paths`), i nomi da eliminare.
+    """
+
+    create: dict[str, list[str]] = field(default_factory=dict)
+    delete: dict[str, list[str]] = field(default_factory=dict)
+
+    @classmethod
+    def from_trees(cls, real_tree: DB_Tree, db_tree: DB_Tree) -> 'SyncPlan':
+        """
+        Calcola il piano dalla differenza tra albero reale e albero del database.
+
+        Args:
+            real_tree (DB_Tree): struttura del file system.
+            db_tree (DB_Tree): struttura attualmente salvata nel database.
+        """
+        # Entità presenti nel file system ma non nel database, e viceversa
+        to_add = real_tree - db_tree
+        to_remove = db_tree - real_tree
+
+        return cls(
+            create={key: sorted(to_add[key]) for key in PLAN_KEYS},
+            delete={key: sorted(to_remove[key]) for key in PLAN_KEYS}
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'SyncPlan':
+        """Ricostruisce un piano serializzato con `to_dict` (il campo `counts` è ignorato)."""
+        return cls(
+            create={key: list(data.get('create', {}).get(key, [])) for key in PLAN_KEYS},
+            delete={key: list(data.get('delete', {}).get(key, [])) for key in PLAN_KEYS}
+        )
+
+    @property
+    def counts(self) -> dict[str, dict[str, int]]:
+        """Numero di voci da creare ed eliminare per livello."""
+        return {
+            'create': {key: len(values) for key, values in self.create.items()},
+            'delete': {key: len(values) for key, values in self.delete.items()},
+        }
+
+    def is_empty(self) -> bool:
+        """Indica se il database è già allineato al file system."""
+        return not any(self.create.values()) and not any(self.delete.values())
+
+    def to_dict(self) -> dict:
+        """Restituisce il piano come dizionario serializzabile in JSON."""
+        return {'create': self.create, 'delete': self.delete, 'counts': self.counts}
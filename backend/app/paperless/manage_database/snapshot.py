@@ -0,0 +1,198 @@
+# backend/app/paperless/manage_database/snapshot.py
+
+"""
+Scansione incrementale del file system basata su uno snapshot persistente.
+
+Per ogni cartella dei livelli 0-4 (root, categoria, utenza, anno, tipo documento)
+lo snapshot memorizza `mtime`, inode e l'elenco delle sottocartelle.
+Alla scansione successiva:
+
+- ogni cartella nota viene solo sottoposta a `stat()`;
+- se `mtime` e inode non sono cambiati, l'elenco dei figli viene preso dallo snapshot
+  senza rileggere la directory;
+- solo le cartelle modificate vengono rilette con `os.scandir`.
+
+Le cartelle documento (livello 5) non vengono mai aperte: il loro contenuto (i PDF)
+non fa parte del `DB_Tree`, e la loro comparsa o scomparsa modifica già
+l'`mtime` della cartella padre.
+
+Nota: l'`mtime` di una cartella cambia solo quando cambiano i suoi figli diretti,
+per questo i figli di una cartella invariata vengono comunque controllati con `stat()`.
+"""
+
+import json
+import os
+import time
+from dataclasses import dataclass
+from os import PathLike
+from typing import Optional, Union
+
+from app.logger import logger
+from app.paperless.manage_database.exclusion import ExclusionFilter
+from app.paperless.manage_database.tree import DB_Tree
+
+SNAPSHOT_VERSION = 1
+
+# Margine di sicurezza sull'mtime: una cartella modificata a ridosso della scansione
+# potrebbe cambiare ancora nello stesso "tick" del file system (2 s su exFAT)
+# senza che l'mtime si aggiorni, quindi in quel caso lo snapshot non viene considerato affidabile.
+MTIME_GRANULARITY_NS = 2_000_000_000
+
+
+@dataclass
+class ScanStats:
+    """
+    Statistiche di una scansione incrementale.
+
+    Attributi:
+        listed (int): cartelle rilette dal disco con `os.scandir`.
+        reused (int): cartelle il cui contenuto è stato preso dallo snapshot.
+    """
+
+    listed: int = 0
+    reused: int = 0
+
+
+class ScanSnapshot:
+    """
+    Snapshot delle cartelle dei livelli 0-4 dell'archivio.
+
+    Attributi:
+        root (str): percorso della root scansionata.
+        excluded (list[str]): cartelle escluse al momento della scansione.
+        scanned_at_ns (int): istante della scansione, in nanosecondi.
+        dirs (dict[str, list]): path relativo posix → [mtime_ns, inode, figli].
+    """
+
+    def __init__(self, root: str, excluded: list[str], scanned_at_ns: int = 0, dirs: dict = None):
+        self.root = root
+        self.excluded = sorted(excluded)
+        self.scanned_at_ns = scanned_at_ns
+        self.dirs = dirs or {}
+
+    @classmethod
+    def load(cls, path: Union[str, PathLike]) -> Optional['ScanSnapshot']:
+        """
+        Carica uno snapshot da file. Restituisce None se il file non esiste,
+        è illeggibile o appartiene a una versione diversa del formato.
+        """
+        try:
+            with open(path, encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if data.get('version') != SNAPSHOT_VERSION:
+            return None
+
+        return cls(data['root'], data['excluded'], data['scanned_at_ns'], data['dirs'])
+
+    def save(self, path: Union[str, PathLike]):
+        """Salva lo snapshot su file in modo atomico (scrittura su file temporaneo + rename)."""
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({
+                'version': SNAPSHOT_VERSION,
+                'root': self.root,
+                'excluded': self.excluded,
+                'scanned_at_ns': self.scanned_at_ns,
+                'dirs': self.dirs,
+            }, file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def is_compatible(self, root: str, excluded: list[str]) -> bool:
+        """Uno snapshot è riutilizzabile solo per la stessa root e le stesse esclusioni."""
+        return self.root == root and self.excluded == sorted(excluded)
+
+    def cached_children(self, rel: str, stat: os.stat_result) -> Optional[list[str]]:
+        """
+        Restituisce i figli memorizzati per la cartella `rel` se `mtime` e inode
+        coincidono con quelli di `stat`, altrimenti None.
+        """
+        entry = self.dirs.get(rel)
+        if entry is None:
+            return None
+
+        mtime_ns, inode, children = entry
+        if mtime_ns != stat.st_mtime_ns or inode != stat.st_ino:
+            return None
+
+        # Modifica troppo vicina alla scansione precedente: lo snapshot potrebbe non vederla
+        if mtime_ns >= self.scanned_at_ns - MTIME_GRANULARITY_NS:
+            return None
+
+        return children
+
+
+def list_subdirs(path: str, excluded: ExclusionFilter, parts: tuple[str, ...] = ()) -> list[str]:
+    """
+    Elenca le sottocartelle (non link simbolici) di `path`, il cui path relativo è `parts`,
+    scartando quelle escluse da `excluded`.
+    """
+    with os.scandir(path) as entries:
+        names = [entry.name for entry in entries if entry.is_dir(follow_symlinks=False)]
+    return sorted(excluded.prune(parts, names))
+
+
+def scan_incremental(root: Union[str, PathLike], excluded: ExclusionFilter,
+                     previous: Optional[ScanSnapshot] = None) -> tuple[DB_Tree, ScanSnapshot, ScanStats]:
+    """
+    Costruisce il `DB_Tree` dell'archivio riusando lo snapshot `previous`
+    per le cartelle che non sono cambiate.
+
+    Args:
+        root (str | PathLike): percorso della root di amministrazione.
+        excluded (ExclusionFilter): filtro delle cartelle da escludere.
+        previous (ScanSnapshot | None): snapshot precedente; se None o non compatibile
+            la scansione è completa.
+
+    Returns:
+        tuple: (albero reale, nuovo snapshot, statistiche della scansione)
+    """
+    root = os.fspath(root)
+    if previous is not None and not previous.is_compatible(root, excluded.patterns):
+        previous = None
+
+    tree = DB_Tree()
+    snapshot = ScanSnapshot(root, excluded.patterns, time.time_ns())
+    stats = ScanStats()
+
+    # Visita iterativa: (path relativo come tupla di parti, path assoluto)
+    stack = [((), root)]
+    while stack:
+        parts, abs_path = stack.pop()
+        rel = '/'.join(parts)
+        try:
+            stat = os.stat(abs_path)
+            children = previous.cached_children(rel, stat) if previous else None
+            if children is None:
+                children = list_subdirs(abs_path, excluded, parts)
+                stats.listed += 1
+            else:
+                stats.reused += 1
+        except FileNotFoundError:
+            # Cartella rimossa durante la scansione: verrà rilevata alla prossima
+            continue
+        except OSError as e:
+            # Cartella illeggibile (permessi, volume di rete non raggiungibile, ...):
+            # ignorata insieme al suo contenuto, come farebbe os.walk
+            logger.warning(f"Cartella {abs_path} ignorata dalla scansione: {e}")
+            continue
+
+        if parts:
+            tree.add(DB_Tree.structure[len(parts) - 1], parts[-1])
+
+        snapshot.dirs[rel] = [stat.st_mtime_ns, stat.st_ino, children]
+
+        level = len(parts) + 1
+        for name in children:
+            child_parts = parts + (name,)
+
+            if level == 5:
+                # Le cartelle documento non vengono aperte né controllate con stat()
+                tree.add(DB_Tree.structure[level - 1], name)
+                tree.add_path(child_parts)
+            else:
+                stack.append((child_parts, os.path.join(abs_path, name)))
+
+    return tree, snapshot, stats
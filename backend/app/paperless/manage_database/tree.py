@@ -6,10 +6,77 @@ basata su categorie, utenze, anni, tipi di documenti e documenti specifici.
 Questa classe viene utilizzata per mantenere una rappresentazione in memoria
 dei dati esistenti nel file system o nel database.
 
+La rappresentazione è compatta: i nomi vengono internati in un dizionario
+(`NameInterner`) che assegna a ciascuno un intero, i livelli sono insiemi di interi
+e ogni path è un unico intero che impacchetta i cinque id (vedi `NameInterner.pack`).
+Un archivio con centinaia di migliaia di documenti non ripete così in memoria i
+prefissi categoria/utenza/anno di ogni path, e le differenze tra alberi confrontano
+interi invece di stringhe. Le stringhe vengono ricostruite solo quando richieste,
+e riusate finché l'albero non cambia.
+
+Il dizionario vive quanto gli alberi che lo usano: ogni `DB_Tree` ne crea uno proprio,
+a meno di non ricevere quello di un altro albero. Gli alberi di una stessa
+sincronizzazione (reale e del database) condividono lo stesso dizionario, e a
+sincronizzazione conclusa i nomi vengono liberati insieme agli alberi.
+
 Autore: Valerio
 Data: 2025-03-11
 """
 
+import threading
+from typing import Iterable, Optional, Sequence
+
+# Bit riservati all'id di ciascun livello all'interno di un path impacchettato
+PATH_BITS = 32
+PATH_MASK = (1 << PATH_BITS) - 1
+
+
+class NameInterner:
+    """
+    Assegna a ogni nome un intero progressivo e permette di ricostruire il nome dall'intero.
+    Gli id di due alberi sono direttamente confrontabili solo se condividono lo stesso `NameInterner`.
+    """
+
+    __slots__ = ('_ids', '_names', '_lock')
+
+    def __init__(self):
+        self._ids: dict[str, int] = {}
+        self._names: list[str] = []
+        self._lock = threading.Lock()
+
+    def intern(self, name: str) -> int:
+        name_id = self._ids.get(name)
+        if name_id is None:
+            # Gli alberi parziali della visita parallela vengono costruiti in più thread
+            with self._lock:
+                name_id = self._ids.get(name)
+                if name_id is None:
+                    name_id = len(self._names)
+                    self._names.append(name)
+                    self._ids[name] = name_id
+        return name_id
+
+    def name(self, name_id: int) -> str:
+        return self._names[name_id]
+
+    def pack(self, parts: Sequence[str]) -> int:
+        """Impacchetta i cinque nomi di un path in un unico intero (un id ogni `PATH_BITS` bit)."""
+        packed = 0
+        for part in reversed(parts):
+            packed = (packed << PATH_BITS) | self.intern(part)
+        return packed
+
+    def unpack(self, packed: int) -> tuple[str, ...]:
+        """Operazione inversa di `pack`: restituisce i cinque nomi del path."""
+        parts = []
+        for _ in DB_Tree.structure:
+            parts.append(self._names[packed & PATH_MASK])
+            packed >>= PATH_BITS
+        return tuple(parts)
+
+    def __len__(self):
+        return len(self._names)
+
 
 class DB_Tree:
     """
@@ -24,41 +91,80 @@ class DB_Tree:
 
     Oltre ai livelli di struttura, tiene traccia anche dei percorsi completi (`paths`).
 
+    Internamente livelli e path sono insiemi di interi (vedi il docstring del modulo);
+    gli attributi elencati sotto restituiscono una vista immutabile decodificata in
+    stringhe, calcolata al primo accesso e di nuovo solo dopo una modifica dell'albero.
+
     Attributes:
-        category (set): Insieme di tutte le categorie presenti.
-        utility (set): Insieme delle utenze registrate.
-        year (set): Insieme degli anni trovati nei documenti.
-        document_type (set): Insieme dei tipi di documento.
-        document (set): Insieme dei documenti registrati.
-        paths (set): Insieme dei percorsi completi generati a partire dai livelli.
+        interner (NameInterner): Dizionario dei nomi usato dall'albero.
+        category (frozenset): Insieme di tutte le categorie presenti.
+        utility (frozenset): Insieme delle utenze registrate.
+        year (frozenset): Insieme degli anni trovati nei documenti.
+        document_type (frozenset): Insieme dei tipi di documento.
+        document (frozenset): Insieme dei documenti registrati.
+        paths (frozenset): Insieme dei percorsi completi generati a partire dai livelli.
     """
 
     structure = ['category', 'utility', 'year', 'document_type', 'document']
 
-    def __init__(self):
-        """Inizializza un oggetto DB_Tree vuoto con insiemi per ogni livello gerarchico."""
-        self.category = set()
-        self.utility = set()
-        self.year = set()
-        self.document_type = set()
-        self.document = set()
-        self.paths = set()
+    __slots__ = ('interner', '_levels', '_paths', '_views')
+
+    def __init__(self, interner: Optional[NameInterner] = None):
+        """
+        Inizializza un oggetto DB_Tree vuoto con insiemi per ogni livello gerarchico.
+
+        Args:
+            interner (NameInterner | None): dizionario dei nomi da condividere con un
+                altro albero; se None l'albero ne usa uno proprio.
+        """
+        self.interner = interner if interner is not None else NameInterner()
+        self._levels: dict[str, set[int]] = {level: set() for level in self.structure}
+        self._paths: set[int] = set()
+        self._views: dict[str, frozenset[str]] = {}
 
     def __str__(self):
         """Restituisce una rappresentazione in stringa della struttura dati."""
         return (
-            f'categories: {self.category}\n'
-            f'utilities: {self.utility}\n'
-            f'years: {self.year}\n'
-            f'document_types: {self.document_type}\n'
-            f'documents: {self.document}\n'
-            f'paths: {self.paths}'
+            f'categories: {set(self.category)}\n'
+            f'utilities: {set(self.utility)}\n'
+            f'years: {set(self.year)}\n'
+            f'document_types: {set(self.document_type)}\n'
+            f'documents: {set(self.document)}\n'
+            f'paths: {set(self.paths)}'
         )
 
     def __repr__(self):
         """Restituisce la rappresentazione testuale dell'oggetto."""
         return self.__str__()
 
+    def _ids(self, key: str) -> set[int]:
+        """Restituisce l'insieme interno (di interi) del livello `key` o dei path."""
+        if key == 'paths':
+            return self._paths
+        try:
+            return self._levels[key]
+        except KeyError:
+            raise AttributeError(f"Il livello '{key}' non esiste in DB_Tree.") from None
+
+    def _ids_of(self, other: 'DB_Tree', key: str) -> set[int]:
+        """
+        Restituisce gli id di `other` per il livello `key` (o dei path),
+        espressi nel dizionario dei nomi di questo albero.
+        """
+        ids = other._ids(key)
+        if other.interner is self.interner:
+            return ids
+        # Dizionari diversi: gli id vanno ricodificati a partire dai nomi
+        if key == 'paths':
+            return {self.interner.pack(other.interner.unpack(packed)) for packed in ids}
+        return {self.interner.intern(other.interner.name(name_id)) for name_id in ids}
+
+    def _decode(self, key: str, ids: Iterable[int]) -> frozenset[str]:
+        """Converte in stringhe un insieme di id del livello `key` o dei path."""
+        if key == 'paths':
+            return frozenset('/'.join(self.interner.unpack(packed)) for packed in ids)
+        return frozenset(self.interner.name(name_id) for name_id in ids)
+
     def __getitem__(self, key):
         """
         Permette di accedere direttamente agli insiemi interni tramite chiavi.
@@ -67,9 +173,19 @@ class DB_Tree:
             key (str): Nome dell'attributo richiesto.
 
         Returns:
-            set: L'insieme corrispondente alla chiave.
+            frozenset: L'insieme corrispondente alla chiave, decodificato in stringhe.
         """
-        return getattr(self, key)
+        view = self._views.get(key)
+        if view is None:
+            view = self._views[key] = self._decode(key, self._ids(key))
+        return view
+
+    category = property(lambda self: self['category'])
+    utility = property(lambda self: self['utility'])
+    year = property(lambda self: self['year'])
+    document_type = property(lambda self: self['document_type'])
+    document = property(lambda self: self['document'])
+    paths = property(lambda self: self['paths'])
 
     def dict(self):
         """
@@ -78,7 +194,7 @@ class DB_Tree:
         Returns:
             dict: Dizionario contenente gli insiemi organizzati per livello gerarchico.
         """
-        return {k: getattr(self, k) for k in self.structure}
+        return {k: set(self[k]) for k in self.structure}
 
     def __sub__(self, other):
         """
@@ -86,6 +202,7 @@ class DB_Tree:
 
         La differenza è calcolata su tutti gli insiemi interni (categorie, utenze, anni, ecc.),
         permettendo di individuare elementi presenti in un albero e assenti nell'altro.
+        Il confronto avviene sugli interi; vengono decodificati solo gli elementi della differenza.
 
         Args:
             other (DB_Tree): L'oggetto DB_Tree con cui confrontare.
@@ -93,11 +210,10 @@ class DB_Tree:
         Returns:
             dict: Dizionario con la differenza tra gli insiemi di `self` e `other`.
         """
-        keys = [
-            k for k, v in vars(self).items()
-            if isinstance(v, set)
-        ]  # Considera solo gli insiemi dell'oggetto
-        return {k: getattr(self, k) - getattr(other, k) for k in keys}
+        return {
+            k: set(self._decode(k, self._ids(k) - self._ids_of(other, k)))
+            for k in self.structure + ['paths']
+        }
 
     def add(self, key: str, value: str):
         """
@@ -105,15 +221,42 @@ class DB_Tree:
 
         Args:
             key (str): Il nome del livello in cui aggiungere l'elemento.
-            value (str): Il valore da inserire nel livello specificato.
+            value (str): Il valore da inserire nel livello specificato
+                (per `paths`, il path POSIX completo).
 
         Raises:
             AttributeError: Se il livello specificato non esiste.
         """
-        if key in vars(self):
-            self[key].add(value)
-        else:
+        if key == 'paths':
+            self.add_path(value.split('/'))
+            return
+
+        level = self._levels.get(key)
+        if level is None:
             raise AttributeError(f"Il livello '{key}' non esiste in DB_Tree.")
+        level.add(self.interner.intern(value))
+        self._views.pop(key, None)
+
+    def add_path(self, parts: Sequence[str]):
+        """
+        Aggiunge un path completo a partire dai suoi cinque nomi, senza passare dalla stringa POSIX.
+
+        Args:
+            parts (Sequence[str]): nomi dei cinque livelli, in ordine.
+        """
+        self._paths.add(self.interner.pack(parts))
+        self._views.pop('paths', None)
+
+    def update(self, other: 'DB_Tree'):
+        """
+        Unisce in questo albero tutti gli elementi di `other`.
+
+        Args:
+            other (DB_Tree): L'albero i cui insiemi vengono aggiunti a quelli correnti.
+        """
+        for key in self.structure + ['paths']:
+            self._ids(key).update(self._ids_of(other, key))
+        self._views.clear()
 
     @property
     def sorted_paths(self):
@@ -4,28 +4,58 @@ utils.py
 Modulo di utilità per la gestione delle operazioni CRUD semplificate con logging dettagliato
 e per la manipolazione dei path e dei nomi dei modelli.
 
+Il logging riga per riga avviene a livello DEBUG e viene costruito solo se quel livello
+è attivo: durante le sincronizzazioni di grandi archivi la scrittura su terminale
+sarebbe altrimenti il costo principale.
+
 Contiene:
 - Un decoratore `crud` per centralizzare la logica di ricerca e logging.
 - Funzioni `get_or_create` e `remove` per interagire col database evitando duplicazioni.
+- `lock_sync`, il lock advisory di Postgres che serializza le sincronizzazioni.
+- L'aggiornamento dell'identity map dei livelli (vedi `identity`) a ogni inserimento ed eliminazione.
 - Funzioni di supporto per conversioni tra nomi e manipolazione dei path dell'applicazione.
+- `escape_like`, per cercare un testo alla lettera con LIKE/ILIKE (albero e ricerca).
 
 Questo modulo è usato principalmente durante la sincronizzazione tra filesystem e database.
+Le funzioni non possiedono una sessione: ricevono quella del chiamante (vedi
+`app.database.session_scope`), che decide quando fare commit o rollback.
 """
 
+import logging
 import re
 from functools import wraps
 
-from app.database import SessionLocal
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.logger import logger
+from app.paperless.manage_database.identity import LEVEL_MODELS, identity_map
+
+# Chiave del lock advisory che serializza le sincronizzazioni (sync completa,
+# applicazione di un piano, watcher), anche tra processi diversi
+SYNC_LOCK_KEY = 0x48484D53  # 'HHMS'
+
+
+def lock_sync(db: Session):
+    """
+    Acquisisce il lock advisory delle sincronizzazioni per la transazione corrente
+    di `db`, attendendo che le altre sincronizzazioni in corso terminino.
+
+    Il lock viene rilasciato automaticamente al commit o al rollback.
+    Svuota inoltre l'identity map dei livelli, che potrebbe contenere id eliminati
+    da una sincronizzazione eseguita da un altro processo.
+    """
+    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': SYNC_LOCK_KEY})
+    identity_map.clear()
 
-db = SessionLocal()
 
 def crud(function):
     """
     Decoratore per operazioni CRUD che intercetta e gestisce la ricerca
     di una riga nel database prima di eseguire la funzione.
 
-    Richiede che la funzione decorata accetti `model`, `filter_key`
-    e gli argomenti necessari al filtro come keyword arguments.
+    Richiede come primo argomento la sessione `db` e, come keyword arguments,
+    `model`, `filter_key` e gli argomenti necessari al filtro.
 
     Aggiunge un logging dettagliato dell'operazione e passa l'istanza trovata
     (o None) alla funzione decorata, insieme ad `attrs`, un dizionario con gli
@@ -33,12 +63,14 @@ def crud(function):
 
     Esempio:
         @crud
-        def get_or_create(instance, **kwargs):
+        def get_or_create(db, instance, **kwargs):
             ...
+
+        get_or_create(db, model=models.Category, filter_key='name', name='Banca')
     """
 
     @wraps(function)
-    def wrapper(*args, **kwargs):
+    def wrapper(db: Session, *args, **kwargs):
         # Recupera il modello e la chiave di filtro dagli argomenti passati
         model = kwargs['model']
         filter_key = kwargs['filter_key']
@@ -56,8 +88,12 @@ def crud(function):
             keys = [key.strip() for key in filter_key.split(',')]
             filter_condition = {key: kwargs[key] for key in keys if key in kwargs}
 
+        # Il logging riga per riga si costruisce solo se il livello DEBUG è attivo
+        verbose = logger.isEnabledFor(logging.DEBUG)
+
         # Esegui la query per cercare se esiste già un'istanza corrispondente
-        print(f"🔍 {model.__name__}: ricerca per {filter_condition}")
+        if verbose:
+            logger.debug(f"🔍 {model.__name__}: ricerca per {filter_condition}")
         instance = db.query(model).filter_by(**filter_condition).first()
 
         attrs = None
@@ -66,19 +102,20 @@ def crud(function):
             # (escludendo quelli che iniziano con '_') e li ordina per leggibilità
             attrs = {k: v for k, v in vars(instance).items() if not k.startswith('_')}
             attrs = dict(sorted(attrs.items()))
-            print(f"\t✅ Trovato: {attrs}")
-        else:
-            print("\t➕ Nessuna corrispondenza trovata.")
+            if verbose:
+                logger.debug(f"\t✅ Trovato: {attrs}")
+        elif verbose:
+            logger.debug("\t➕ Nessuna corrispondenza trovata.")
 
         # Chiama la funzione decorata, passandole l'istanza trovata (o None),
         # insieme agli argomenti originali, arricchiti con `attrs`
-        return function(instance, *args, attrs=attrs, **kwargs)
+        return function(db, instance, *args, attrs=attrs, **kwargs)
 
     return wrapper
 
 
 @crud
-def get_or_create(instance, **kwargs):
+def get_or_create(db: Session, instance, **kwargs):
     """
     Restituisce l'istanza se esiste già, altrimenti la crea nel database.
 
@@ -93,21 +130,22 @@ def get_or_create(instance, **kwargs):
     kwargs.pop('attrs')
     kwargs.pop('filter_key')  # evita conflitti con model(**kwargs)
 
-    attrs = ', '.join(f"{k}={repr(v)}" for k, v in kwargs.items())
-
     if instance:
-        print()
         return instance
     else:
         instance = model(**kwargs)
         db.add(instance)
         db.flush()
-        print(f"\t\t✅ Creato: {model.__name__}({attrs})\n")
+        if model in LEVEL_MODELS.values():
+            identity_map.add(db, model, instance.name, instance.id)
+        if logger.isEnabledFor(logging.DEBUG):
+            attrs = ', '.join(f"{k}={repr(v)}" for k, v in kwargs.items())
+            logger.debug(f"\t\t✅ Creato: {model.__name__}({attrs})")
         return instance
 
 
 @crud
-def remove(instance, **kwargs):
+def remove(db: Session, instance, **kwargs):
     """
     Elimina un'istanza esistente dal database, se trovata.
 
@@ -120,15 +158,30 @@ def remove(instance, **kwargs):
     attrs = kwargs.pop('attrs')
     model = kwargs.pop('model')
 
-    attrs = ', '.join(f"{k}={repr(v)}" for k, v in attrs.items())
-
     if instance:
         db.delete(instance)
         db.flush()
-        print(f"\t\t✅ Eliminato: {model.__name__}({attrs})\n")
+        if model in LEVEL_MODELS.values():
+            identity_map.discard(db, model, instance.name)
+        if logger.isEnabledFor(logging.DEBUG):
+            attrs = ', '.join(f"{k}={repr(v)}" for k, v in attrs.items())
+            logger.debug(f"\t\t✅ Eliminato: {model.__name__}({attrs})")
         return instance
 
 
+def escape_like(value: str) -> str:
+    """
+    Protegge i caratteri speciali di LIKE ('%', '_' e il carattere di escape).
+
+    Args:
+        value (str): testo da cercare letteralmente.
+
+    Returns:
+        str: testo utilizzabile in un pattern LIKE con escape '\\'.
+    """
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
 def sliced_admin(t: tuple[str, ...]) -> tuple[str, ...]:
     """
     Ritorna la parte del path *dopo* '_amministrazione'.
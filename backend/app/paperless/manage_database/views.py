@@ -0,0 +1,87 @@
+# backend/app/paperless/manage_database/views.py
+
+"""
+Aggiornamento delle viste materializzate derivate dalla tabella `paths`.
+
+`paperless.path_tree` (creata dalla migrazione Alembic `path_tree_view`) contiene,
+per ogni path, i nomi e gli id dei cinque livelli e il path completo come stringa,
+indicizzato per la ricerca per prefisso. Viene rigenerata con `REFRESH ... CONCURRENTLY`,
+così che le letture in corso non vengano bloccate:
+
+- dall'hook di sincronizzazione, subito dopo le modifiche di questo processo;
+- prima di ogni lettura (`ensure_path_tree`), se la generazione dei dati
+  (vedi `paperless.generation`) è più avanti di quella da cui la vista è stata
+  generata, per esempio dopo una scrittura fatta da un altro processo.
+
+La generazione da cui la vista è stata generata è salvata nella riga 'path_tree'
+di `paperless.generations`, così che un solo processo la rigeneri.
+"""
+
+import threading
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database import session_scope
+from app.logger import logger
+from app.paperless.generation import data_generation
+from app.paperless.manage_database.plan import SyncPlan
+from app.paperless.models import Generation
+
+REFRESH_PATH_TREE = text("REFRESH MATERIALIZED VIEW CONCURRENTLY paperless.path_tree")
+PATH_TREE_LOCK_KEY = 0x48485054  # 'HHPT'
+
+
+class PathTreeView:
+    """
+    Tiene aggiornata la vista `path_tree` rispetto alla generazione dei dati.
+
+    Attributi:
+        generation (int): ultima generazione dei dati da cui questo processo sa
+            che la vista è stata generata.
+    """
+
+    def __init__(self):
+        self.generation = -1
+        self._lock = threading.Lock()
+
+    def ensure(self):
+        """Rigenera la vista se i dati sono cambiati. Senza modifiche non esegue query (entro il TTL della generazione)."""
+        if data_generation.current() > self.generation:
+            self.refresh()
+
+    def refresh(self, *args):
+        """
+        Rigenera la vista se è indietro rispetto alla generazione salvata nel database.
+        Accetta argomenti ignorati per poter essere registrata come hook.
+        """
+        with self._lock, session_scope() as db:
+            # Un solo processo alla volta: gli altri trovano la vista già aggiornata
+            db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': PATH_TREE_LOCK_KEY})
+            values = dict(db.execute(
+                select(Generation.name, Generation.value).where(Generation.name.in_(('data', 'path_tree')))
+            ).all())
+            # La generazione è letta prima del refresh: la vista contiene almeno quei dati
+            generation = values.get('data', 0)
+            if values.get('path_tree', -1) < generation:
+                db.execute(REFRESH_PATH_TREE)
+                statement = insert(Generation).values(name='path_tree', value=generation)
+                db.execute(statement.on_conflict_do_update(
+                    index_elements=['name'], set_={'value': statement.excluded.value}
+                ))
+                logger.info("Vista path_tree aggiornata")
+            db.commit()
+            self.generation = max(self.generation, generation)
+
+
+path_tree_view = PathTreeView()
+
+
+def refresh_path_tree(changes: SyncPlan):
+    """Hook di sincronizzazione: rigenera la vista `path_tree`."""
+    path_tree_view.refresh()
+
+
+def ensure_path_tree():
+    """Da chiamare prima di leggere `path_tree`: la rigenera se i dati sono cambiati."""
+    path_tree_view.ensure()
@@ -0,0 +1,113 @@
+# backend/app/paperless/manage_database/walker.py
+
+"""
+Visita parallela dell'archivio per `get_real_tree`.
+
+Su dischi di rete o USB meccanici la visita con `os.walk` è limitata dalla latenza
+di ogni singola lettura di directory, non dalla banda. Qui le letture vengono
+distribuite su un pool di thread:
+
+1. la root viene letta nel thread principale (elenco delle categorie);
+2. ogni categoria viene letta in parallelo (elenco delle utenze);
+3. ogni utenza viene visitata in parallelo fino al livello documento.
+
+Le cartelle escluse vengono scartate già durante la lettura, quindi il loro
+contenuto non viene mai aperto. Le cartelle documento (livello 5) non vengono lette:
+il loro contenuto non fa parte del `DB_Tree`.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from os import PathLike
+from typing import Optional, Union
+
+from app.paperless.manage_database.exclusion import ExclusionFilter
+from app.paperless.manage_database.snapshot import list_subdirs
+from app.paperless.manage_database.tree import DB_Tree, NameInterner
+
+# Numero di thread predefinito: la visita è I/O bound, quindi conviene
+# superare il numero di core per mascherare la latenza del disco.
+DEFAULT_WORKERS = 8
+
+
+def walk_subtree(root: str, parts: tuple[str, ...], excluded: ExclusionFilter,
+                 interner: Optional[NameInterner] = None) -> DB_Tree:
+    """
+    Visita sequenzialmente la cartella `root/parts` fino al livello documento.
+
+    Come `os.walk`, una cartella che non è possibile leggere viene ignorata
+    insieme al suo contenuto.
+
+    Args:
+        root (str): root dell'archivio.
+        parts (tuple[str, ...]): path relativo della cartella da cui partire.
+        excluded (ExclusionFilter): filtro delle cartelle da non visitare.
+        interner (NameInterner | None): dizionario dei nomi dell'albero in cui
+            verrà unito il risultato.
+
+    Returns:
+        DB_Tree: albero parziale con la cartella di partenza e i suoi discendenti.
+    """
+    tree = DB_Tree(interner)
+    stack = [parts]
+
+    while stack:
+        current = stack.pop()
+        level = len(current)
+
+        if level < len(DB_Tree.structure):
+            try:
+                children = list_subdirs(os.path.join(root, *current), excluded, current)
+            except OSError:
+                continue
+            stack.extend(current + (name,) for name in children)
+        else:
+            tree.add_path(current)
+
+        if level:
+            tree.add(DB_Tree.structure[level - 1], current[-1])
+
+    return tree
+
+
+def walk_parallel(root: Union[str, PathLike], excluded: ExclusionFilter, workers: int = DEFAULT_WORKERS) -> DB_Tree:
+    """
+    Costruisce il `DB_Tree` dell'archivio distribuendo le letture su `workers` thread,
+    con un task per ogni categoria e poi uno per ogni utenza.
+
+    Args:
+        root (str | PathLike): root dell'archivio.
+        excluded (ExclusionFilter): filtro delle cartelle da non visitare.
+        workers (int): numero massimo di thread.
+
+    Returns:
+        DB_Tree: struttura rilevata dal file system.
+    """
+    root = os.fspath(root)
+    tree = DB_Tree()
+    categories = list_subdirs(root, excluded)
+
+    def list_category(category: str) -> Optional[list[str]]:
+        try:
+            return list_subdirs(os.path.join(root, category), excluded, (category,))
+        except OSError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='walker') as pool:
+        utilities = pool.map(list_category, categories)
+
+        futures = []
+        for category, category_utilities in zip(categories, utilities):
+            if category_utilities is None:
+                continue  # categoria illeggibile: ignorata come farebbe os.walk
+            tree.add('category', category)
+            futures.extend(
+                pool.submit(walk_subtree, root, (category, utility), excluded, tree.interner)
+                for utility in category_utilities
+            )
+
+        # Le unioni avvengono nel thread principale: DB_Tree non è thread-safe
+        for future in futures:
+            tree.update(future.result())
+
+    return tree
@@ -0,0 +1,313 @@
+# backend/app/paperless/manage_database/watcher.py
+
+"""
+Servizio di sorveglianza del file system che mantiene il database sincronizzato
+mentre HomeHarbor è in esecuzione, senza attendere la sincronizzazione completa
+all'avvio successivo.
+
+Le modifiche vengono rilevate da una "sorgente":
+- `InotifySource`: usa inotify (Linux) tramite il pacchetto opzionale `inotify_simple`;
+- `PollingSource`: fallback portabile (es. macOS) che confronta periodicamente
+  gli snapshot della scansione incrementale.
+
+Ogni evento di creazione, rinomina o eliminazione di una cartella viene tradotto
+in una "chiave sporca", cioè il path relativo della cartella coinvolta.
+Le chiavi vengono accumulate (debounce) finché il file system resta in quiete per
+`debounce` secondi, o al più per `max_delay` secondi, poi vengono unite
+(una cartella sporca assorbe le sue sottocartelle) e applicate in un'unica transazione
+tramite `get_or_create` e `remove`, sotto il lock advisory delle sincronizzazioni.
+Una copia di migliaia di cartelle produce così una sola transazione.
+
+L'eliminazione delle entità rimaste senza path (categorie, utenze, ...) è lasciata
+alla sincronizzazione completa (`sync_db`), che ha la visione dell'intero archivio.
+"""
+
+import os
+import threading
+import time
+from os import PathLike
+from typing import Optional, Union
+
+from app.database import session_scope
+from app.logger import logger
+from app.paperless.manage_database.core import crud_path, get_all_path_labels, get_excluded_paths, \
+    get_existing_names, get_needed_models
+from app.paperless.manage_database.exclusion import ExclusionFilter
+from app.paperless.manage_database.hooks import run_sync_hooks
+from app.paperless.manage_database.plan import PLAN_KEYS, SyncPlan
+from app.paperless.manage_database.snapshot import list_subdirs, scan_incremental
+from app.paperless.manage_database.tree import DB_Tree
+from app.paperless.manage_database.utils import get_or_create, lock_sync, remove
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+# Le cartelle documento (livello 5) non vengono sorvegliate: la loro creazione o
+# eliminazione genera già un evento nella cartella padre (livello 4).
+WATCHED_DEPTH = 4
+
+DirtyKey = tuple[str, ...]
+
+
+class PollingSource:
+    """
+    Sorgente di modifiche basata su polling: ogni `interval` secondi esegue una
+    scansione incrementale e confronta i figli di ciascuna cartella con lo snapshot precedente.
+    """
+
+    def __init__(self, root: str, excluded: ExclusionFilter, interval: float = 5.0):
+        self.root = root
+        self.excluded = excluded
+        self.interval = interval
+        _, self.snapshot, _ = scan_incremental(root, excluded)
+
+    def wait(self, timeout: float) -> set[DirtyKey]:
+        """Attende un intervallo di polling e restituisce le cartelle create o rimosse."""
+        time.sleep(self.interval)
+        _, snapshot, _ = scan_incremental(self.root, self.excluded, self.snapshot)
+
+        dirty = set()
+        for rel, (_, _, children) in snapshot.dirs.items():
+            previous = self.snapshot.dirs.get(rel)
+            if previous is None:
+                continue  # cartella nuova: è già coperta dalla chiave creata sul padre
+            parts = tuple(rel.split('/')) if rel else ()
+            for name in set(children) ^ set(previous[2]):
+                dirty.add(parts + (name,))
+
+        self.snapshot = snapshot
+        return dirty
+
+    def close(self):
+        pass
+
+
+class InotifySource:
+    """
+    Sorgente di modifiche basata su inotify. Sorveglia tutte le cartelle fino al
+    livello `WATCHED_DEPTH` e aggiunge dinamicamente i watch per quelle nuove.
+    """
+
+    MASK = None if INotify is None else (
+        flags.CREATE | flags.DELETE | flags.MOVED_FROM | flags.MOVED_TO | flags.ONLYDIR
+    )
+
+    def __init__(self, root: str, excluded: ExclusionFilter):
+        if INotify is None:
+            raise RuntimeError("inotify_simple non è installato. Usa `pip install inotify_simple`.")
+
+        self.root = root
+        self.excluded = excluded
+        self.inotify = INotify()
+        self.watches: dict[int, DirtyKey] = {}
+        self._watch(())
+
+    def _watch(self, parts: DirtyKey):
+        """Aggiunge ricorsivamente i watch alla cartella `parts` e alle sue sottocartelle."""
+        if len(parts) > WATCHED_DEPTH:
+            return
+
+        path = os.path.join(self.root, *parts)
+        try:
+            wd = self.inotify.add_watch(path, self.MASK)
+            children = list_subdirs(path, self.excluded, parts)
+        except (FileNotFoundError, NotADirectoryError):
+            return
+
+        self.watches[wd] = parts
+        for name in children:
+            self._watch(parts + (name,))
+
+    def wait(self, timeout: float) -> set[DirtyKey]:
+        """Attende al più `timeout` secondi e restituisce le cartelle coinvolte dagli eventi."""
+        dirty = set()
+
+        for event in self.inotify.read(timeout=int(timeout * 1000)):
+            if event.mask & flags.Q_OVERFLOW:
+                # Eventi persi dal kernel: l'unica opzione sicura è ricontrollare tutto
+                logger.warning("Coda inotify piena: risincronizzazione dell'intero archivio")
+                dirty.add(())
+                continue
+
+            if event.mask & flags.IGNORED:
+                self.watches.pop(event.wd, None)
+                continue
+
+            parts = self.watches.get(event.wd)
+            if parts is None or not event.mask & flags.ISDIR:
+                continue
+
+            key = parts + (event.name,)
+            if self.excluded.matches(key):
+                continue
+            dirty.add(key)
+
+            if event.mask & (flags.CREATE | flags.MOVED_TO):
+                self._watch(key)
+
+        return dirty
+
+    def close(self):
+        self.inotify.close()
+
+
+def collapse(keys: set[DirtyKey]) -> list[DirtyKey]:
+    """
+    Unisce le chiavi sporche eliminando quelle contenute in una cartella già sporca.
+
+    Esempio:
+        collapse({('Banca',), ('Banca', 'Enel'), ('Salute', 'ASL')})
+        → [('Banca',), ('Salute', 'ASL')]
+    """
+    result = []
+    for key in sorted(keys, key=len):
+        if not any(key[:len(parent)] == parent for parent in result):
+            result.append(key)
+    return result
+
+
+def scan_subtree(root: str, prefix: DirtyKey, excluded: ExclusionFilter, tree: DB_Tree):
+    """
+    Aggiunge a `tree` le cartelle presenti sul disco sotto `prefix`,
+    compresi i nomi dei livelli del prefisso stesso.
+    """
+    path = os.path.join(root, *prefix)
+    if not os.path.isdir(path):
+        return
+
+    for level, name in zip(DB_Tree.structure, prefix):
+        tree.add(level, name)
+
+    if len(prefix) == len(DB_Tree.structure):
+        tree.add('paths', '/'.join(prefix))
+        return
+
+    try:
+        children = list_subdirs(path, excluded, prefix)
+    except FileNotFoundError:
+        return
+
+    for name in children:
+        scan_subtree(root, prefix + (name,), excluded, tree)
+
+
+class Watcher:
+    """
+    Servizio che tiene allineato il database con il file system in tempo reale.
+
+    Esempio:
+        watcher = Watcher(ADMINISTRATION_PATH)
+        watcher.start()   # in un thread separato
+        ...
+        watcher.stop()
+    """
+
+    def __init__(self, root: Union[str, PathLike], *, debounce: float = 2.0, max_delay: float = 30.0,
+                 poll_interval: float = 5.0, force_polling: bool = False):
+        self.root = os.fspath(root)
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.force_polling = force_polling
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _source(self, excluded: ExclusionFilter):
+        """Sceglie inotify quando disponibile, altrimenti il polling."""
+        if INotify is not None and not self.force_polling:
+            return InotifySource(self.root, excluded)
+
+        logger.info(f"Watcher in modalità polling (ogni {self.poll_interval} s)")
+        return PollingSource(self.root, excluded, self.poll_interval)
+
+    def flush(self, keys: set[DirtyKey], excluded: ExclusionFilter):
+        """
+        Applica in un'unica transazione le modifiche relative alle chiavi sporche:
+        crea le entità e i path presenti sul disco e rimuove i path scomparsi.
+        Dopo il commit notifica le modifiche agli hook di sincronizzazione.
+        """
+        keys = collapse(keys)
+        real_tree = DB_Tree()
+
+        for key in keys:
+            scan_subtree(self.root, key, excluded, real_tree)
+
+        with session_scope() as db:
+            # Non si sovrappone a una sincronizzazione completa in corso
+            lock_sync(db)
+
+            db_paths = set()
+            for key in keys:
+                db_paths.update(get_all_path_labels(db, 'posix', prefix=key))
+
+            to_add = real_tree.paths - db_paths
+            to_remove = db_paths - real_tree.paths
+            needed_models = get_needed_models()
+            changes = SyncPlan(
+                create={key: [] for key in PLAN_KEYS},
+                delete={key: [] for key in PLAN_KEYS}
+            )
+
+            for level in DB_Tree.structure:
+                # Nomi già presenti, per notificare agli hook solo le entità davvero nuove
+                existing = set(map(str, get_existing_names(db, needed_models[level], real_tree[level])))
+                changes.create[level] = sorted(real_tree[level] - existing)
+
+                for name in real_tree[level]:
+                    get_or_create(db, model=needed_models[level], filter_key='name', name=name)
+
+            for path in to_add:
+                crud_path(db, path, get_or_create)
+
+            for path in to_remove:
+                crud_path(db, path, remove)
+
+            changes.create['paths'] = sorted(to_add)
+            changes.delete['paths'] = sorted(to_remove)
+
+        run_sync_hooks(changes)
+
+        logger.info(f"Watcher: {len(keys)} cartelle, {len(to_add)} path aggiunti, {len(to_remove)} rimossi")
+
+    def run(self):
+        """Ciclo principale: raccoglie gli eventi, applica il debounce e sincronizza."""
+        with session_scope() as db:
+            excluded = ExclusionFilter(get_excluded_paths(db))
+        source = self._source(excluded)
+        pending: set[DirtyKey] = set()
+        first_event_at = None
+
+        try:
+            while not self._stop.is_set():
+                changes = source.wait(self.debounce)
+                now = time.monotonic()
+
+                if changes:
+                    pending |= changes
+                    first_event_at = first_event_at or now
+
+                # Sincronizza quando il file system è tornato quieto o l'attesa è troppo lunga
+                if pending and (not changes or now - first_event_at >= self.max_delay):
+                    try:
+                        self.flush(pending, excluded)
+                    except Exception as e:
+                        logger.error(f"Watcher: sincronizzazione fallita ({e}), nuovo tentativo tra {self.debounce} s")
+                    else:
+                        pending = set()
+                        first_event_at = None
+        finally:
+            source.close()
+
+    def start(self):
+        """Avvia il watcher in un thread daemon."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name='paperless-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Richiede l'arresto del watcher e attende la fine del ciclo corrente."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -9,12 +9,28 @@ e i documenti scansionati, insieme ai metadati e alle entità correlate.
 """
 
 
-from sqlalchemy import Column, Integer, String, UniqueConstraint
-from sqlalchemy import ForeignKey, CheckConstraint
+from sqlalchemy import BigInteger, Column, Computed, DateTime, Index, Integer, MetaData, String, Table, Text, UniqueConstraint
+from sqlalchemy import DDL, ForeignKey, CheckConstraint, event, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 
+def trigram_index(table: str) -> Index:
+    """
+    Indice GIN con gli operatori trigrammi di `pg_trgm` sulla colonna `name`,
+    usato dalla ricerca fuzzy (`similarity`, `<%`, `ILIKE '%...%'`).
+    Creato dalla migrazione Alembic che abilita l'estensione; con `create_all`
+    l'estensione viene creata dal listener `before_create` qui sotto.
+    """
+    return Index(f"ix_{table}_name_trgm", "name",
+                 postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"})
+
+
+# `gin_trgm_ops` esiste solo con l'estensione: `create_all` la crea prima delle tabelle
+event.listen(Base.metadata, 'before_create', DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+
 class Category(Base):
     """
     Rappresenta una categoria di documenti (es. 'Salute', 'Banca', ecc.).
@@ -27,7 +43,10 @@ class Category(Base):
     """
 
     __tablename__ = "categories"
-    __table_args__ = {"schema": "paperless"}  #
+    __table_args__ = (
+        trigram_index("categories"),
+        {"schema": "paperless"}
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, nullable=False, unique=True, index=True)
@@ -49,7 +68,10 @@ class Utility(Base):
     """
 
     __tablename__ = "utilities"
-    __table_args__ = {"schema": "paperless"}  #
+    __table_args__ = (
+        trigram_index("utilities"),
+        {"schema": "paperless"}
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, nullable=False, unique=True, index=True)
@@ -73,7 +95,7 @@ class Year(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(Integer,
-                  CheckConstraint("year >= 2000", name="check_year_range"),
+                  CheckConstraint("name >= 2000", name="check_year_range"),
                   nullable=False, unique=True, index=True)
 
     paths = relationship("Path", back_populates="year_rel")
@@ -115,7 +137,10 @@ class Document(Base):
     """
 
     __tablename__ = "documents"
-    __table_args__ = {"schema": "paperless"}
+    __table_args__ = (
+        trigram_index("documents"),
+        {"schema": "paperless"}
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, nullable=False)
@@ -165,6 +190,82 @@ class Path(Base):
     document_rel = relationship("Document", back_populates="paths")
 
 
+class DocumentFile(Base):
+    """
+    Indice dei file contenuti nelle cartelle documento (livello 5), compilato dalla
+    scansione dei file (vedi `manage_database.files`).
+
+    Dimensione e mtime servono a riconoscere i file modificati senza rileggerli:
+    l'hash del contenuto viene ricalcolato solo quando uno dei due cambia.
+    Le righe vengono eliminate insieme al `Path` a cui appartengono.
+
+    Attributi:
+        id (int): Chiave primaria.
+        path_id (int): FK verso `paths`.
+        filename (str): Nome del file nella cartella documento.
+        size (int): Dimensione in byte.
+        mtime_ns (int): Data di modifica, in nanosecondi.
+        content_hash (str): SHA-256 del contenuto (esadecimale).
+        pages (int): Numero di pagine, solo per i PDF leggibili.
+    """
+
+    __tablename__ = "document_files"
+    __table_args__ = (
+        UniqueConstraint("path_id", "filename", name="unique_document_file"),
+        {"schema": "paperless"}
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    path_id = Column(Integer, ForeignKey("paperless.paths.id", ondelete="CASCADE"), nullable=False)
+    filename = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    mtime_ns = Column(BigInteger, nullable=False)
+    content_hash = Column(String(64), nullable=False, index=True)
+    pages = Column(Integer)
+
+
+# Configurazione della ricerca testuale di Postgres usata per il testo dei documenti
+TEXT_SEARCH_CONFIG = "italian"
+
+
+class DocumentText(Base):
+    """
+    Testo estratto da un file indicizzato (vedi `manage_database.extraction`), dal livello
+    di testo dei PDF o tramite OCR.
+
+    `content_hash` è l'hash del file al momento dell'estrazione: se differisce da quello
+    di `DocumentFile` il file è cambiato e il testo va estratto di nuovo.
+    Un'estrazione fallita viene registrata senza testo, con `error` valorizzato, e
+    ritentata dalle estrazioni successive finché `attempts` non raggiunge il limite.
+    `search_vector` è una colonna generata da Postgres, indicizzata con GIN per la ricerca.
+
+    Attributi:
+        file_id (int): Chiave primaria, FK verso `document_files`.
+        content_hash (str): Hash del file da cui è stato estratto il testo.
+        method (str): 'text' (livello di testo del PDF), 'ocr' o 'none' (nessun testo).
+        content (str): Testo estratto.
+        error (str): Ultimo errore di estrazione, None se l'estrazione è riuscita.
+        attempts (int): Tentativi falliti con l'hash corrente.
+        search_vector (tsvector): Testo normalizzato per la ricerca full-text.
+    """
+
+    __tablename__ = "document_texts"
+    __table_args__ = (
+        Index("ix_document_texts_search_vector", "search_vector", postgresql_using="gin"),
+        {"schema": "paperless"}
+    )
+
+    file_id = Column(Integer, ForeignKey("paperless.document_files.id", ondelete="CASCADE"), primary_key=True)
+    content_hash = Column(String(64), nullable=False)
+    method = Column(String,
+                    CheckConstraint("method IN ('text', 'ocr', 'none')", name="check_valid_extraction_method"),
+                    nullable=False)
+    content = Column(Text, nullable=False, default="")
+    error = Column(String)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    search_vector = Column(TSVECTOR, Computed(f"to_tsvector('{TEXT_SEARCH_CONFIG}', content)", persisted=True))
+
+
 class Tag(Base):
     """
     Tag semantici assegnabili ai documenti.
@@ -234,6 +335,8 @@ class PendingScan(Base):
     Rappresenta una voce creata ma non ancora scannerizzata.
 
     Usato per prevenire la perdita di dati in caso di crash o chiusura dell'app.
+    La scansione prodotta viene archiviata da `manage_database.ingestion`, che elimina
+    la voce quando il file è stato spostato nella cartella documento.
 
     Attributi:
         id (int): Chiave primaria.
@@ -242,6 +345,12 @@ class PendingScan(Base):
         year (int)
         document_type (str)
         document (str)
+        filename (str): File della cartella di acquisizione da archiviare; se assente,
+            i file il cui nome inizia con l'id della voce (es. '12.pdf', '12-2.jpg').
+        status (str): 'pending' (in attesa del file) o 'failed' (scartata da una fase).
+        attempts (int): Tentativi di archiviazione falliti.
+        error (str): Ultimo errore di archiviazione.
+        created_at (datetime): Data di creazione.
     """
 
     __tablename__ = "pending_scans"
@@ -253,3 +362,83 @@ class PendingScan(Base):
     year = Column(Integer, nullable=False)
     document_type = Column(String, nullable=False)
     document = Column(String, nullable=False)
+    filename = Column(String)
+    status = Column(String,
+                    CheckConstraint("status IN ('pending', 'failed')", name="check_valid_scan_status"),
+                    nullable=False, default="pending", server_default="pending", index=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    error = Column(String)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+class Generation(Base):
+    """
+    Contatori di generazione dei dati, condivisi tra processi (vedi `paperless.generation`).
+
+    La riga 'data' viene incrementata, una volta per transazione, dal trigger
+    `bump_data_generation` creato dalla migrazione Alembic `data_generation` su ogni
+    scrittura nelle tabelle della gerarchia e dei tag. Con `create_all` riga, funzione
+    e trigger vengono creati dai listener qui sotto.
+
+    Attributi:
+        name (str): Chiave primaria, nome del contatore.
+        value (int): Valore corrente.
+        xact (int): Ultima transazione che ha incrementato il contatore.
+    """
+
+    __tablename__ = "generations"
+    __table_args__ = {"schema": "paperless"}
+
+    name = Column(String, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0, server_default="0")
+    xact = Column(BigInteger)
+
+
+# Con `create_all` il contatore resterebbe senza la riga 'data' e senza trigger, quindi
+# fermo a 0: le cache servirebbero risposte superate. I listener eseguono le stesse
+# istruzioni della migrazione `data_generation`. La funzione viene creata prima delle
+# tabelle (i trigger la richiedono), la riga e i trigger insieme alle rispettive tabelle.
+DATA_GENERATION_TABLES = (Category, Utility, Year, DocumentType, Document, Path, Tag, DocumentTag)
+
+event.listen(Base.metadata, 'before_create', DDL("""
+    CREATE OR REPLACE FUNCTION paperless.bump_data_generation() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE paperless.generations
+        SET value = value + 1, xact = txid_current()
+        WHERE name = 'data' AND xact IS DISTINCT FROM txid_current();
+        RETURN NULL;
+    END
+    $$
+"""))
+event.listen(Generation.__table__, 'after_create', DDL("INSERT INTO %(fullname)s (name) VALUES ('data')"))
+for model in DATA_GENERATION_TABLES:
+    event.listen(model.__table__, 'after_create', DDL(
+        "CREATE TRIGGER %(table)s_data_generation "
+        "BEFORE INSERT OR UPDATE OR DELETE OR TRUNCATE ON %(fullname)s "
+        "FOR EACH STATEMENT EXECUTE FUNCTION paperless.bump_data_generation()"
+    ))
+
+
+# Vista materializzata creata dalla migrazione Alembic `path_tree_view`, aggiornata
+# dalla sincronizzazione (vedi `manage_database.views`). È descritta su un MetaData
+# separato così che `create_all` e l'autogenerate di Alembic non la trattino come tabella.
+view_metadata = MetaData()
+
+path_tree = Table(
+    "path_tree",
+    view_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("category_id", Integer),
+    Column("utility_id", Integer),
+    Column("year_id", Integer),
+    Column("document_type_id", Integer),
+    Column("document_id", Integer),
+    Column("category", String),
+    Column("utility", String),
+    Column("year", String),
+    Column("document_type", String),
+    Column("document", String),
+    Column("full_path", String),
+    schema="paperless"
+)
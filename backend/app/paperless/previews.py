@@ -0,0 +1,280 @@
+# backend/app/paperless/previews.py
+
+"""
+Anteprime dei documenti: la prima pagina di un file indicizzato, come PNG della
+dimensione richiesta (lato maggiore in pixel).
+
+- I PDF vengono convertiti con `pdftoppm` (poppler), le immagini ridimensionate con OpenCV.
+- Le anteprime sono salvate su disco in `PREVIEW_CACHE_PATH`, con chiave hash del
+  contenuto + dimensione: un file spostato o duplicato riusa la stessa anteprima,
+  un file modificato ne ottiene una nuova.
+- La cache ha una dimensione massima (`PREVIEW_CACHE_SIZE`): oltre la soglia vengono
+  eliminate le anteprime usate meno di recente (LRU sull'mtime, aggiornato a ogni lettura).
+  Le anteprime usate negli ultimi `EVICTION_GRACE` secondi non vengono eliminate:
+  una risposta che ha appena ottenuto il percorso di un'anteprima la trova ancora su disco.
+- La generazione avviene in un pool di thread di dimensione fissa, che limita le
+  conversioni contemporanee; richieste simultanee della stessa anteprima attendono
+  un'unica generazione.
+
+Con `PREVIEW_PREWARM=true` l'applicazione registra un hook di sincronizzazione che
+genera in background le anteprime dei path appena creati.
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from os import PathLike
+from pathlib import Path
+from typing import Optional, Union
+
+from app.config import PREVIEW_CACHE_SIZE, PREVIEW_PREWARM
+from app.logger import logger
+from app.paperless.manage_database.constants import ARCHIVE_PATH, PREVIEW_CACHE_PATH
+from app.paperless.manage_database.files import file_digest
+from app.paperless.manage_database.hooks import register_sync_hook
+from app.paperless.manage_database.plan import SyncPlan
+
+# OpenCV serve solo per le anteprime delle immagini
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+# Generazioni di anteprime contemporanee
+PREVIEW_WORKERS = 4
+
+# Dimensione delle anteprime generate in anticipo dall'hook di sincronizzazione
+PREWARM_SIZE = 256
+
+# Tempo massimo concesso a `pdftoppm` per una pagina, in secondi
+RENDER_TIMEOUT = 60
+
+# Dopo un'eliminazione la cache scende a questa frazione del massimo, così da non
+# dover ripetere la pulizia a ogni nuova anteprima
+EVICTION_TARGET = 0.9
+
+# Secondi dall'ultimo utilizzo durante i quali un'anteprima non può essere eliminata:
+# coprono l'intervallo tra `PreviewCache.get` e l'apertura del file da parte della risposta
+EVICTION_GRACE = 60
+
+IMAGE_SUFFIXES = ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp')
+
+
+class UnsupportedPreview(Exception):
+    """Sollevata per i file di cui non è possibile generare un'anteprima (formato non supportato)."""
+
+
+class PreviewUnavailable(Exception):
+    """Sollevata quando la generazione fallisce o il programma necessario non è installato."""
+
+
+def render_preview(source: Union[str, PathLike], target: Union[str, PathLike], size: int):
+    """
+    Genera in `target` (PNG) l'anteprima della prima pagina di `source`,
+    con il lato maggiore di `size` pixel.
+
+    Raises:
+        UnsupportedPreview: se il formato di `source` non è supportato.
+        PreviewUnavailable: se manca il programma necessario o la conversione fallisce.
+    """
+    suffix = os.path.splitext(str(source))[1].lower()
+
+    if suffix == '.pdf':
+        if shutil.which('pdftoppm') is None:
+            raise PreviewUnavailable("pdftoppm (poppler) non è installato")
+        # -singlefile scrive '<prefisso>.png' invece di '<prefisso>-1.png'
+        prefix = os.path.splitext(str(target))[0]
+        try:
+            subprocess.run(['pdftoppm', '-f', '1', '-l', '1', '-singlefile', '-png',
+                            '-scale-to', str(size), str(source), prefix],
+                           capture_output=True, timeout=RENDER_TIMEOUT, check=True)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            raise PreviewUnavailable(f"Conversione di {source} fallita: {e}") from e
+        return
+
+    if suffix in IMAGE_SUFFIXES:
+        if cv2 is None:
+            raise PreviewUnavailable("OpenCV non è installato")
+        image = cv2.imread(str(source), cv2.IMREAD_COLOR)
+        if image is None:
+            raise PreviewUnavailable(f"Impossibile leggere l'immagine {source}")
+        height, width = image.shape[:2]
+        scale = size / max(height, width)
+        if scale < 1:
+            image = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                               interpolation=cv2.INTER_AREA)
+        if not cv2.imwrite(str(target), image):
+            raise PreviewUnavailable(f"Impossibile salvare l'anteprima di {source}")
+        return
+
+    raise UnsupportedPreview(f"Anteprima non disponibile per i file '{suffix or 'senza estensione'}'")
+
+
+def current_hash(location: Union[str, PathLike], size: int, mtime_ns: int, content_hash: str) -> str:
+    """
+    Restituisce l'hash indicizzato di un file se dimensione e mtime non sono cambiati
+    dall'indicizzazione, altrimenti lo ricalcola: un file modificato dopo l'ultima
+    indicizzazione non deve ricevere l'anteprima del contenuto precedente.
+
+    Raises:
+        FileNotFoundError: se il file non esiste più.
+    """
+    stat = os.stat(location)
+    if (stat.st_size, stat.st_mtime_ns) == (size, mtime_ns):
+        return content_hash
+    return file_digest(location)
+
+
+class PreviewCache:
+    """
+    Cache su disco delle anteprime, con dimensione massima ed eliminazione LRU.
+
+    Esempio:
+        target = preview_cache.get('/archivio/.../scan.pdf', content_hash, 256)
+    """
+
+    def __init__(self, folder: Union[str, PathLike], max_bytes: int, workers: int = PREVIEW_WORKERS):
+        self.folder = Path(folder)
+        self.max_bytes = max_bytes
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='preview')
+        self._lock = threading.Lock()
+        self._pending: dict[Path, Future] = {}
+        # Byte occupati, calcolati alla prima anteprima generata
+        self._total: Optional[int] = None
+
+    def path(self, content_hash: str, size: int) -> Path:
+        """Percorso dell'anteprima; le sottocartelle per prefisso evitano cartelle enormi."""
+        return self.folder / content_hash[:2] / f'{content_hash}-{size}.png'
+
+    def get(self, source: Union[str, PathLike], content_hash: str, size: int) -> Path:
+        """
+        Restituisce il percorso dell'anteprima, generandola se non è in cache
+        (attende la generazione nel pool).
+
+        Raises:
+            UnsupportedPreview, PreviewUnavailable: vedi `render_preview`.
+        """
+        target = self.path(content_hash, size)
+        # Sotto il lock dell'eliminazione: l'anteprima o è già stata eliminata (e viene
+        # rigenerata) o, con l'mtime aggiornato, resta protetta per `EVICTION_GRACE` secondi
+        with self._lock:
+            try:
+                # L'mtime segna l'ultimo utilizzo, su cui si basa l'eliminazione
+                os.utime(target)
+                return target
+            except FileNotFoundError:
+                pass
+        return self.submit(source, content_hash, size).result()
+
+    def submit(self, source: Union[str, PathLike], content_hash: str, size: int) -> Future:
+        """Accoda la generazione di un'anteprima; una generazione già in corso viene condivisa."""
+        target = self.path(content_hash, size)
+        with self._lock:
+            future = self._pending.get(target)
+            if future is not None:
+                return future
+            future = self._pool.submit(self._render, source, target, size)
+            self._pending[target] = future
+        # Fuori dal lock: se il task è già concluso la callback viene eseguita subito da questo thread
+        future.add_done_callback(lambda _: self._forget(target))
+        return future
+
+    def _forget(self, target: Path):
+        with self._lock:
+            self._pending.pop(target, None)
+
+    def _render(self, source: Union[str, PathLike], target: Path, size: int) -> Path:
+        if target.exists():
+            return target
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Generata con un nome temporaneo e poi rinominata: una lettura concorrente
+        # non vede mai un file incompleto
+        temporary = target.with_name(f'.{uuid.uuid4().hex}.png')
+        try:
+            render_preview(source, temporary, size)
+            os.replace(temporary, target)
+        finally:
+            temporary.unlink(missing_ok=True)
+        self._added(target.stat().st_size)
+        return target
+
+    def _scan(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for folder in self.folder.glob('*/'):
+            try:
+                with os.scandir(folder) as children:
+                    for entry in children:
+                        if entry.is_file() and not entry.name.startswith('.'):
+                            stat = entry.stat()
+                            entries.append((stat.st_mtime, stat.st_size, Path(entry.path)))
+            except OSError:
+                continue
+        return entries
+
+    def _added(self, size: int):
+        with self._lock:
+            if self._total is None:
+                self._total = sum(size for _, size, _ in self._scan())
+            else:
+                self._total += size
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """
+        Elimina le anteprime usate meno di recente fino a scendere sotto `EVICTION_TARGET`,
+        risparmiando quelle usate negli ultimi `EVICTION_GRACE` secondi.
+        """
+        entries = sorted(self._scan())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICTION_TARGET
+        recent = time.time() - EVICTION_GRACE
+        removed = 0
+        for mtime, size, path in entries:
+            if total <= target or mtime > recent:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        self._total = total
+        logger.info(f"Cache delle anteprime: eliminate {removed} anteprime")
+
+    def prewarm(self, source: Union[str, PathLike], size: int = PREWARM_SIZE):
+        """Genera in background l'anteprima di `source`, se supportata (l'hash viene calcolato nel pool)."""
+        suffix = os.path.splitext(str(source))[1].lower()
+        if suffix == '.pdf' or suffix in IMAGE_SUFFIXES:
+            self._pool.submit(self._prewarm, source, size)
+
+    def _prewarm(self, source: Union[str, PathLike], size: int):
+        # Eseguita già nel pool: genera direttamente, senza accodare e attendere un altro
+        # task (con il pool saturo l'attesa non terminerebbe). Una richiesta concorrente
+        # della stessa anteprima al più la rigenera: la rinomina finale è atomica.
+        try:
+            self._render(source, self.path(file_digest(source), size), size)
+        except Exception as e:
+            logger.warning(f"Anteprima di {source} non generata: {e}")
+
+
+preview_cache = PreviewCache(PREVIEW_CACHE_PATH, PREVIEW_CACHE_SIZE)
+
+
+def prewarm_previews(changes: SyncPlan):
+    """Hook di sincronizzazione: genera in background le anteprime dei file dei path creati."""
+    for path in changes.create.get('paths', []):
+        try:
+            with os.scandir(os.path.join(ARCHIVE_PATH, path)) as entries:
+                for entry in entries:
+                    if entry.is_file() and not entry.name.startswith('.'):
+                        preview_cache.prewarm(entry.path)
+        except OSError:
+            continue
+
+
+# Registrato solo dall'applicazione (che importa questo modulo): una sincronizzazione da
+# riga di comando terminerebbe prima che le anteprime in background siano pronte
+if PREVIEW_PREWARM:
+    register_sync_hook(prewarm_previews)
@@ -5,6 +5,12 @@ from .document_type import router as document_type_router
 from .document import router as document_router
 from .path import router as path_router
 from .form import router as form_router
+from .sync import router as sync_router
+from .search import router as search_router
+from .tree import router as tree_router
+from .stats import router as stats_router
+from .file import router as file_router
+from .pending_scan import router as pending_scan_router
 
 __all__ = [
     'category_router',
@@ -13,5 +19,11 @@ __all__ = [
     'document_type_router',
     'document_router',
     'path_router',
-    'form_router'
+    'form_router',
+    'sync_router',
+    'search_router',
+    'tree_router',
+    'stats_router',
+    'file_router',
+    'pending_scan_router'
 ]
\ No newline at end of file
@@ -1,19 +1,26 @@
 # backend/app/paperless/routers/category.py
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Response
 
 from app.paperless.CRUD.category import get_category_by_id, get_all_categories
+from app.paperless.models import Category
+from app.paperless.routers.functions import CachedRoute, PageParams, run_read
 from app.paperless.schema.response import CategorySchema
-from app.database import get_db
+from app.database import get_read_db
 
-router = APIRouter(prefix="/categories", tags=["Categories"])
+router = APIRouter(prefix="/categories", tags=["Categories"], route_class=CachedRoute)
 
 
 @router.get("/", response_model=list[CategorySchema])
-def _get_categories(db: Session = Depends(get_db)):
-    return get_all_categories(db)
+async def _get_categories(response: Response, page: PageParams = Depends(), db=Depends(get_read_db)):
+    attrs = page.columns(Category, CategorySchema)
+
+    def read(session):
+        rows = get_all_categories(session, attrs=attrs, after_id=page.after_id, limit=page.limit)
+        return page.respond(session, Category, rows, response, attrs)
+
+    return await run_read(db, read)
 
 
 @router.get("/{category_id}", response_model=CategorySchema)
-def _get_category_by_id(category_id: int, db: Session = Depends(get_db)):
-    return get_category_by_id(category_id, db)
+async def _get_category_by_id(category_id: int, db=Depends(get_read_db)):
+    return await run_read(db, lambda session: get_category_by_id(category_id, session))
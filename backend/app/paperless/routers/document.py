@@ -1,19 +1,40 @@
-from fastapi import APIRouter, Depends
+from typing import Annotated
+
+from fastapi import APIRouter, Body, Depends, Response
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.paperless.CRUD.document import get_document_by_id, get_all_documents
+from app.database import get_db, get_read_db
+from app.paperless.CRUD.document import create_documents, get_document_by_id, get_all_documents
+from app.paperless.manage_database.bulk import BATCH_SIZE
+from app.paperless.models import Document
+from app.paperless.routers.functions import CachedRoute, PageParams, run_read
+from app.paperless.schema.batch import BatchResultSchema
+from app.paperless.schema.creation import DocumentCreationSchema
 from app.paperless.schema.response import DocumentSchema
 
-router = APIRouter(prefix="/documents", tags=["Documents"])
+router = APIRouter(prefix="/documents", tags=["Documents"], route_class=CachedRoute)
+
+
+@router.post("/batch", response_model=BatchResultSchema)
+def _create_documents(documents: Annotated[list[DocumentCreationSchema], Body(max_length=BATCH_SIZE)],
+                      db: Session = Depends(get_db)):
+    return create_documents(db, documents)
 
 
 @router.get("/{document_id}", response_model=DocumentSchema)
-def _get_document_by_id(document_id: int, db: Session = Depends(get_db)):
-    return get_document_by_id(document_id, db)
+async def _get_document_by_id(document_id: int, db=Depends(get_read_db)):
+    return await run_read(db, lambda session: get_document_by_id(document_id, session))
 
 
 @router.get("/", response_model=list[DocumentSchema])
-def _get_documents(db: Session = Depends(get_db)):
-    return get_all_documents(db)
+async def _get_documents(response: Response, page: PageParams = Depends(), db=Depends(get_read_db)):
+    attrs = page.columns(Document, DocumentSchema)
+
+    def read(session):
+        # Senza `fields` la risposta completa include i tag, letti con una sottoquery
+        rows = get_all_documents(session, attrs=attrs, after_id=page.after_id, limit=page.limit,
+                                 with_tags=not page.fields)
+        return page.respond(session, Document, rows, response, attrs)
+
+    return await run_read(db, read)
 
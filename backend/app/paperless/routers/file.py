@@ -0,0 +1,72 @@
+# backend/app/paperless/routers/file.py
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.paperless.CRUD.file import get_duplicates, get_file
+from app.paperless.manage_database.constants import ARCHIVE_PATH
+from app.paperless.manage_database.extraction import extraction_state, start_extraction
+from app.paperless.manage_database.files import indexing_state, start_indexing
+from app.paperless.previews import PreviewUnavailable, UnsupportedPreview, current_hash, preview_cache
+from app.paperless.schema.file import DuplicateGroupSchema, ExtractionStateSchema, FileIndexStateSchema
+from app.responses import etag_matches
+
+router = APIRouter(prefix="/files", tags=["Files"])
+
+# Le anteprime dipendono solo dal contenuto: il client le riusa per un giorno senza chiedere,
+# poi le riconvalida con l'ETag
+PREVIEW_CACHE_CONTROL = "private, max-age=86400"
+
+
+@router.post("/index", response_model=FileIndexStateSchema, status_code=202)
+def _start_indexing():
+    if not start_indexing(ARCHIVE_PATH):
+        raise HTTPException(status_code=409, detail="Un'indicizzazione dei file è già in corso")
+    return indexing_state()
+
+
+@router.get("/index", response_model=FileIndexStateSchema)
+def _get_indexing_state():
+    return indexing_state()
+
+
+@router.get("/duplicates", response_model=list[DuplicateGroupSchema])
+def _get_duplicates(min_size: int = Query(0, ge=0), db: Session = Depends(get_db)):
+    return get_duplicates(db, min_size=min_size)
+
+
+@router.post("/extract", response_model=ExtractionStateSchema, status_code=202)
+def _start_extraction():
+    if not start_extraction(ARCHIVE_PATH):
+        raise HTTPException(status_code=409, detail="Un'estrazione del testo è già in corso")
+    return extraction_state()
+
+
+@router.get("/extract", response_model=ExtractionStateSchema)
+def _get_extraction_state():
+    return extraction_state()
+
+
+@router.get("/{file_id}/preview", response_class=FileResponse)
+def _get_preview(file_id: int, request: Request, size: int = Query(256, ge=32, le=2048),
+                 db: Session = Depends(get_db)):
+    file = get_file(db, file_id, ARCHIVE_PATH)
+    # La connessione non serve durante la generazione, che può richiedere qualche secondo
+    db.close()
+    try:
+        content_hash = current_hash(file['location'], file['size'], file['mtime_ns'], file['content_hash'])
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File non più presente nell'archivio")
+
+    headers = {"ETag": f'"{content_hash[:32]}-{size}"', "Cache-Control": PREVIEW_CACHE_CONTROL}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        target = preview_cache.get(file['location'], content_hash, size)
+    except UnsupportedPreview as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except PreviewUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return FileResponse(target, media_type="image/png", headers=headers)
@@ -1,33 +1,31 @@
 # backend/app/paperless/routers/form.py
-import re
-from fastapi import APIRouter, Depends
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
 from datetime import datetime
 
 from app.database import get_db
-from app.functions import flat_singleton_list
-from app.paperless.CRUD.document import get_all_documents
-from app.paperless.CRUD.utility import get_all_utilities
+from app.paperless.autocomplete import structure_index
 from app.paperless.schema.form import FieldMeta
-from app.paperless.CRUD.category import get_all_categories
 
 router = APIRouter(prefix="/form", tags=["Form Metadata"])
 
+
+def structure_etag(version_tag: str) -> str:
+    # Il form dipende anche dall'anno corrente (valore massimo del campo anno)
+    return f'{version_tag[:-1]}-{datetime.now().year}"'
+
+
 @router.get("/structure", response_model=list[FieldMeta])
-def get_structure_form_fields(db: Session = Depends(get_db)):
-    db_categories = flat_singleton_list(get_all_categories(db, attrs=['name']))
-    db_utilities = flat_singleton_list(get_all_utilities(db, attrs=['name']))
-    db_documents = flat_singleton_list(get_all_documents(db, attrs=['name']))
-    # filter out documents with no letters
-    db_documents = [doc for doc in db_documents if re.search(r"[a-zA-Z]", doc)]
-    # remove numbers, commas, colons, euro symbols, parentheses, hyphens, and periods
-    db_documents = [re.sub(r"[\d,:€()\-.]", "", doc).strip() for doc in db_documents]
-    # split by spaces
-    db_documents = [doc.split(" ") for doc in db_documents]
-    # flatten list and filter out words with less than 3 characters
-    db_documents = [item for sublist in db_documents for item in sublist if len(item) > 2]
-    # sort and remove duplicates
-    db_documents = sorted(set(db_documents))
+def get_structure_form_fields(request: Request, response: Response, db: Session = Depends(get_db)):
+    # Se il client ha già la versione corrente non serve nemmeno consultare l'indice
+    etag = structure_etag(structure_index.etag)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    db_categories, db_utilities, db_documents, version_tag = structure_index.structure(db)
+    response.headers["ETag"] = structure_etag(version_tag)
     return [
         FieldMeta(
             id="category_id",
@@ -70,3 +68,10 @@ def get_structure_form_fields(db: Session = Depends(get_db)):
             autocomplete=db_documents
         )
     ]
+
+
+@router.get("/autocomplete", response_model=list[str])
+def get_autocomplete(q: str = "", limit: int = Query(20, ge=1, le=200),
+                     field: Literal["category", "utility", "document"] = "document",
+                     db: Session = Depends(get_db)):
+    return structure_index.search(db, field, q, limit)
@@ -1,8 +1,27 @@
 # backend/app/paperless/routers/functions.py
-from fastapi import HTTPException
+from typing import Callable, Optional, TypeVar, Union
+from urllib.parse import urlencode
+
+from fastapi import HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session  # Importa la sessione per interagire con il database
 from sqlalchemy.orm.attributes import InstrumentedAttribute
 from app.database import Base
+from app.paperless.cache import CachedResponse, response_cache
+from app.responses import ORJSONResponse, etag_matches
+
+# Dimensione predefinita e massima delle pagine degli endpoint di elenco
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Header delle risposte da conservare insieme al corpo nella cache delle risposte
+CACHED_HEADERS = ('content-type', 'x-next-after-id', 'x-total-count')
+
+T = TypeVar('T')
 
 
 def try_except(func):
@@ -43,34 +62,262 @@ def select(model, attributes: list[str]) -> list[InstrumentedAttribute]:
     return [getattr(model, attr) for attr in attributes]
 
 
+async def run_read(db: Union[AsyncSession, Session], read: Callable[[Session], T]) -> T:
+    """
+    Esegue una lettura scritta per la sessione sincrona (funzioni CRUD, `PageParams.respond`)
+    con la sessione della dependency `get_read_db`.
+
+    Con una `AsyncSession` il codice gira con `run_sync`: le query passano da asyncpg e
+    l'attesa del database non occupa un thread del threadpool. Con una `Session` sincrona
+    (asyncpg non installato) gira nel threadpool, come un endpoint sincrono.
+
+    :param db: Sessione restituita da `get_read_db`.
+    :param read: Funzione che riceve la sessione sincrona e restituisce il risultato.
+    :return: Il risultato di `read`.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(read)
+    return await run_in_threadpool(read, db)
 
 
 @try_except
-def get_one(db: Session, model: type[Base], obj_id: int, *, attrs: list[str] = None) -> Base:
+def get_one(db: Session, model: type[Base], obj_id: int, *, attrs: list[str] = None,
+            options: tuple = ()) -> Base:
     """
     Recupera un oggetto di un modello dal database.
 
     :param db: Sessione del database.
     :param model: Modello da cui recuperare l'oggetto.
     :param obj_id: ID dell'oggetto da recuperare.
+    :param options: Opzioni di caricamento delle relazioni (vedi `CRUD.loaders`),
+        ignorate se si selezionano solo alcuni attributi.
     :return: Oggetto del modello.
     """
-    query = db.query(*select(model, attrs)).filter(model.id == obj_id).first()
+    query = db.query(*select(model, attrs))
+    if not attrs:
+        query = query.options(*options)
+    query = query.filter(model.id == obj_id).first()
     if not query:
         raise HTTPException(status_code=404, detail=f'"{model.__name__}" non trovato')
     return query
 
 
 @try_except
-def get_all(db: Session, model: type[Base], *, attrs: list[str] = None) -> list[Base]:
+def get_all(db: Session, model: type[Base], *, attrs: list[str] = None,
+            after_id: int = None, limit: int = None, options: tuple = (), extra: tuple = ()) -> list[Base]:
     """
-    Recupera tutti gli oggetti di un modello dal database.
+    Recupera tutti gli oggetti di un modello dal database, eventualmente una pagina alla volta.
+
+    La paginazione è per chiave (keyset): la pagina successiva si ottiene passando come
+    `after_id` l'id dell'ultimo oggetto ricevuto, così che il costo della query dipenda
+    solo da `limit` e non dalla posizione nella tabella (a differenza di OFFSET).
 
     :param db: Sessione del database.
     :param model: Modello da cui recuperare gli oggetti.
+    :param after_id: Se indicato, restituisce solo gli oggetti con id maggiore.
+    :param limit: Numero massimo di oggetti da restituire.
+    :param options: Opzioni di caricamento delle relazioni (vedi `CRUD.loaders`),
+        ignorate se si selezionano solo alcuni attributi.
+    :param extra: Espressioni etichettate da selezionare insieme agli attributi
+        (es. una sottoquery), solo se si selezionano alcuni attributi.
     :return: Lista di oggetti del modello.
     """
-    query = db.query(*select(model, attrs)).order_by(model.id).all()
-    if not query:
+    query = db.query(*select(model, attrs), *(extra if attrs else ()))
+    if not attrs:
+        query = query.options(*options)
+    if after_id is not None:
+        query = query.filter(model.id > after_id)
+    query = query.order_by(model.id).limit(limit).all()
+
+    # Una pagina vuota dopo l'ultima non è un errore: lo è solo una tabella vuota
+    if not query and after_id is None:
         raise HTTPException(status_code=404, detail=f'"{model.__name__}" non trovato')
     return query
+
+
+def schema_columns(model: type[Base], schema: type[BaseModel]) -> list[str]:
+    """
+    Restituisce le colonne del modello esposte dallo schema, nell'ordine dei campi dello schema.
+
+    :param model: Modello interrogato.
+    :param schema: Schema di risposta.
+    :return: Lista di nomi di colonne.
+    """
+    columns = model.__table__.columns.keys()
+    return [field for field in schema.model_fields if field in columns]
+
+
+def rows_to_dicts(rows: list) -> list[dict]:
+    """
+    Converte le righe di una query con proiezione in dizionari, senza validazione.
+
+    È il percorso veloce degli endpoint di elenco: le colonne selezionate sono già
+    quelle dello schema di risposta, quindi la validazione riga per riga di Pydantic
+    sarebbe solo un costo. Da usare solo con righe prodotte da `get_all` con `attrs`.
+
+    :param rows: Righe SQLAlchemy (`Row`) o dizionari.
+    :return: Lista di dizionari pronti per la serializzazione.
+    """
+    if not rows or isinstance(rows[0], dict):
+        return list(rows)
+    keys = rows[0]._fields
+    return [dict(zip(keys, row)) for row in rows]
+
+
+@try_except
+def count_all(db: Session, model: type[Base]) -> int:
+    """
+    Conta gli oggetti di un modello nel database.
+
+    :param db: Sessione del database.
+    :param model: Modello da contare.
+    :return: Numero di righe della tabella.
+    """
+    return db.query(func.count(model.id)).scalar()
+
+
+def batch_result(results: list[dict]) -> dict:
+    """
+    Riepiloga gli esiti per elemento di una creazione in blocco.
+
+    :param results: Esiti, ciascuno con 'index', 'status' ('created', 'existing' o 'error') e 'id'/'detail'.
+    :return: Dizionario conforme a `BatchResultSchema`.
+    """
+    results = sorted(results, key=lambda result: result['index'])
+    statuses = [result['status'] for result in results]
+    return {
+        'created': statuses.count('created'),
+        'existing': statuses.count('existing'),
+        'errors': statuses.count('error'),
+        'results': results,
+    }
+
+
+class PageParams:
+    """
+    Parametri di paginazione e proiezione comuni agli endpoint di elenco,
+    da usare come dependency (`page: PageParams = Depends()`).
+
+    - `after_id` e `limit`: paginazione per chiave, vedi `get_all`;
+    - `fields`: elenco separato da virgole dei campi da restituire (es. `fields=id,name`);
+    - `with_total`: se True aggiunge l'header `X-Total-Count`, calcolato solo su richiesta.
+
+    Quando la pagina è piena, l'header `X-Next-After-Id` contiene il valore di
+    `after_id` da usare per la pagina successiva.
+    """
+
+    def __init__(self, after_id: Optional[int] = Query(None, ge=0),
+                 limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                 fields: Optional[str] = None, with_total: bool = False):
+        self.after_id = after_id
+        self.limit = limit
+        self.fields = fields
+        self.with_total = with_total
+
+    def attrs(self, model: type[Base], schema: type[BaseModel]) -> Optional[list[str]]:
+        """
+        Traduce `fields` negli `attrs` di `get_all`, ammettendo solo le colonne del modello
+        esposte dallo schema di risposta. L'id viene sempre incluso, serve alla paginazione.
+
+        :param model: Modello interrogato.
+        :param schema: Schema di risposta dell'endpoint.
+        :return: Lista di attributi, o None per restituire gli oggetti completi.
+        """
+        if not self.fields:
+            return None
+
+        requested = [field.strip() for field in self.fields.split(',') if field.strip()]
+        allowed = set(schema_columns(model, schema))
+        invalid = [field for field in requested if field not in allowed]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Campi non validi per {model.__name__}: {invalid}")
+
+        return ['id'] + [field for field in dict.fromkeys(requested) if field != 'id']
+
+    def columns(self, model: type[Base], schema: type[BaseModel]) -> list[str]:
+        """
+        Come `attrs`, ma senza `fields` restituisce tutte le colonne esposte dallo schema:
+        l'endpoint risponde sempre con una proiezione e usa il percorso veloce di `respond`.
+        Adatto agli schemi i cui campi sono tutti colonne (o espressioni passate con `extra`).
+
+        :param model: Modello interrogato.
+        :param schema: Schema di risposta dell'endpoint.
+        :return: Lista di attributi.
+        """
+        return self.attrs(model, schema) or schema_columns(model, schema)
+
+    def respond(self, db: Session, model: type[Base], rows: list, response: Response,
+                attrs: Optional[list[str]] = None):
+        """
+        Completa la risposta di un endpoint di elenco con gli header di paginazione.
+
+        Con una proiezione (`attrs`) restituisce direttamente le righe come JSON (orjson),
+        senza passare dallo schema: le righe contengono già solo colonne dello schema.
+
+        :param db: Sessione del database.
+        :param model: Modello interrogato.
+        :param rows: Righe restituite da `get_all` (oggetti, righe o dizionari con 'id').
+        :param response: Risposta di FastAPI su cui impostare gli header.
+        :param attrs: Attributi selezionati, come restituiti da `attrs`.
+        :return: Le righe, oppure una `ORJSONResponse` in caso di proiezione.
+        """
+        headers = {}
+        if len(rows) == self.limit:
+            last = rows[-1]
+            headers['X-Next-After-Id'] = str(last['id'] if isinstance(last, dict) else last.id)
+        if self.with_total:
+            headers['X-Total-Count'] = str(count_all(db, model))
+
+        if attrs:
+            return ORJSONResponse(rows_to_dicts(rows), headers=headers)
+
+        response.headers.update(headers)
+        return rows
+
+
+class CachedRoute(APIRoute):
+    """
+    Route con cache delle risposte GET, da usare come `route_class` dei router di sola lettura.
+
+    La chiave è il path con i parametri di query ordinati; l'ETag dipende dalla chiave e
+    dalla generazione della cache, che la sincronizzazione incrementa a ogni modifica.
+    Se il client invia un `If-None-Match` corrispondente la risposta è un 304 calcolato
+    senza toccare il database; altrimenti si restituisce la risposta in cache, se presente,
+    o si esegue l'endpoint e se ne memorizza la risposta (solo se 200).
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def cached_handler(request: Request) -> Response:
+            if request.method != "GET":
+                return await handler(request)
+
+            key = request.url.path
+            if request.query_params:
+                key += "?" + urlencode(sorted(request.query_params.multi_items()))
+
+            # La generazione viene letta prima della query: se una sincronizzazione la
+            # incrementa nel frattempo, la risposta finisce sotto una chiave già superata
+            generation = response_cache.generation()
+            etag = response_cache.etag(generation, key)
+            headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+
+            if etag_matches(request, etag):
+                return Response(status_code=304, headers=headers)
+
+            cached = response_cache.get(generation, key)
+            if cached is not None:
+                return Response(content=cached['body'], headers={**cached['headers'], **headers})
+
+            response = await handler(request)
+            if response.status_code == 200:
+                response_cache.set(generation, key, CachedResponse(
+                    body=response.body.decode(),
+                    headers={name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+                ))
+                response.headers.update(headers)
+            return response
+
+        return cached_handler
+
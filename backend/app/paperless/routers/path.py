@@ -1,4 +1,58 @@
-from fastapi import APIRouter
+# backend/app/paperless/routers/path.py
+from typing import Annotated, Union
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+
+from app.database import get_db, get_read_db
+from app.paperless.CRUD.path import create_paths, get_all_paths, get_path_by_id, get_path_folder
+from app.paperless.downloads import archive_location, file_response, is_safe_filename
+from app.paperless.manage_database.bulk import BATCH_SIZE
+from app.paperless.manage_database.constants import ARCHIVE_PATH
+from app.paperless.models import Path
+from app.paperless.routers.functions import PageParams, run_read
+from app.paperless.schema.batch import BatchResultSchema
+from app.paperless.schema.creation import PathCreationSchema, PathLabelsCreationSchema
 from app.paperless.schema.response import PathSchema
 
-router = APIRouter(prefix="/paths", tags=["Paths"])
\ No newline at end of file
+router = APIRouter(prefix="/paths", tags=["Paths"])
+
+
+@router.post("/batch", response_model=BatchResultSchema)
+def _create_paths(paths: Annotated[list[Union[PathCreationSchema, PathLabelsCreationSchema]],
+                                   Body(max_length=BATCH_SIZE)],
+                  db: Session = Depends(get_db)):
+    return create_paths(db, paths)
+
+
+@router.get("/", response_model=list[PathSchema])
+async def _get_paths(response: Response, page: PageParams = Depends(), db=Depends(get_read_db)):
+    if page.fields:
+        raise HTTPException(status_code=400, detail="La proiezione `fields` non è disponibile per i path")
+
+    def read(session):
+        rows = get_all_paths(session, after_id=page.after_id, limit=page.limit)
+        return page.respond(session, Path, rows, response)
+
+    return await run_read(db, read)
+
+
+@router.get("/{path_id}", response_model=PathSchema)
+async def _get_path_by_id(path_id: int, db=Depends(get_read_db)):
+    return await run_read(db, lambda session: get_path_by_id(path_id, session))
+
+
+@router.get("/{path_id}/files/{filename}")
+def _download_file(path_id: int, filename: str, request: Request, download: bool = False,
+                   db: Session = Depends(get_db)):
+    if not is_safe_filename(filename):
+        raise HTTPException(status_code=400, detail="Nome del file non valido")
+    folder = get_path_folder(db, path_id, ARCHIVE_PATH)
+    # Un link simbolico non deve portare fuori dalla cartella del documento
+    location = archive_location(folder, filename)
+    if location is None:
+        raise HTTPException(status_code=404, detail="File non trovato")
+    try:
+        return file_response(request, location, download=download)
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail="File non trovato")
@@ -1,4 +1,48 @@
-from fastapi import APIRouter
-from app.paperless.schema.response import PendingScanSchema
+# backend/app/paperless/routers/pending_scan.py
+from typing import Literal, Optional
 
-router = APIRouter(prefix="/pending_scans", tags=["Pending Scans"])
\ No newline at end of file
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.paperless.CRUD.pending_scan import (create_pending_scan, delete_pending_scan, get_pending_scans,
+                                             retry_pending_scan)
+from app.paperless.manage_database.constants import ARCHIVE_PATH, SCAN_DROP_PATH
+from app.paperless.manage_database.ingestion import ingestion_state, start_ingestion
+from app.paperless.schema.creation import PendingScanCreationSchema
+from app.paperless.schema.response import IngestionStateSchema, PendingScanSchema
+
+router = APIRouter(prefix="/pending_scans", tags=["Pending Scans"])
+
+
+@router.get("/", response_model=list[PendingScanSchema])
+def _get_pending_scans(status: Optional[Literal["pending", "failed"]] = None, db: Session = Depends(get_db)):
+    return get_pending_scans(db, status=status)
+
+
+@router.post("/", response_model=PendingScanSchema, status_code=201)
+def _create_pending_scan(scan: PendingScanCreationSchema, db: Session = Depends(get_db)):
+    return create_pending_scan(db, scan)
+
+
+@router.post("/ingest", response_model=IngestionStateSchema, status_code=202)
+def _start_ingestion(workers: int = Query(1, ge=1, le=8)):
+    if not start_ingestion(ARCHIVE_PATH, SCAN_DROP_PATH, workers=workers):
+        raise HTTPException(status_code=409, detail="Un'archiviazione delle scansioni è già in corso")
+    return ingestion_state()
+
+
+@router.get("/ingest", response_model=IngestionStateSchema)
+def _get_ingestion_state():
+    return ingestion_state()
+
+
+@router.post("/{scan_id}/retry", response_model=PendingScanSchema)
+def _retry_pending_scan(scan_id: int, db: Session = Depends(get_db)):
+    return retry_pending_scan(db, scan_id)
+
+
+@router.delete("/{scan_id}", status_code=204)
+def _delete_pending_scan(scan_id: int, db: Session = Depends(get_db)):
+    delete_pending_scan(db, scan_id)
+    return Response(status_code=204)
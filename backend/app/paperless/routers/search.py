@@ -0,0 +1,54 @@
+# backend/app/paperless/routers/search.py
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.database import get_read_db
+from app.paperless.CRUD.search import encode_cursor, search_names, search_text
+from app.paperless.routers.functions import run_read
+from app.paperless.schema.search import SearchPageSchema, TextSearchPageSchema
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+# Numero massimo di risultati per pagina
+MAX_LIMIT = 50
+
+
+@router.get("/", response_model=SearchPageSchema)
+async def _search(q: str = Query(..., min_length=2),
+                  kind: Optional[list[Literal["category", "utility", "document"]]] = Query(None),
+                  limit: int = Query(20, ge=1, le=MAX_LIMIT),
+                  cursor: Optional[str] = None,
+                  db=Depends(get_read_db)):
+    kinds = sorted(set(kind)) if kind else ["category", "document", "utility"]
+    try:
+        rows = await run_read(db, lambda session: search_names(session, q, kinds=kinds, limit=limit, cursor=cursor))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    results = [row._asdict() for row in rows]
+    # Pagina piena: potrebbero esserci altri risultati dopo l'ultimo
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = encode_cursor(last.score, last.kind, last.id)
+
+    return {"results": results, "next_cursor": next_cursor}
+
+
+@router.get("/text", response_model=TextSearchPageSchema)
+async def _search_text(q: str = Query(..., min_length=2),
+                       limit: int = Query(20, ge=1, le=MAX_LIMIT),
+                       cursor: Optional[str] = None,
+                       db=Depends(get_read_db)):
+    try:
+        rows = await run_read(db, lambda session: search_text(session, q, limit=limit, cursor=cursor))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = encode_cursor(last.rank, "text", last.file_id)
+
+    return {"results": [row._asdict() for row in rows], "next_cursor": next_cursor}
@@ -0,0 +1,24 @@
+# backend/app/paperless/routers/stats.py
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from app.database import get_read_db
+from app.paperless.CRUD.stats import get_stats
+from app.paperless.routers.functions import run_read
+from app.paperless.schema.stats import StatsSchema
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+
+@router.get("/", response_model=StatsSchema)
+async def _get_stats(by: list[Literal["category", "utility", "year", "document_type"]] = Query(["category"]),
+                     category: Optional[str] = None,
+                     utility: Optional[str] = None,
+                     year: Optional[int] = None,
+                     document_type: Optional[str] = None,
+                     db=Depends(get_read_db)):
+    group_by = list(dict.fromkeys(by))
+    filters = {"category": category, "utility": utility, "year": year, "document_type": document_type}
+    rows = await run_read(db, lambda session: get_stats(session, group_by, filters))
+    return {"group_by": group_by, "total": sum(row["count"] for row in rows), "rows": rows}
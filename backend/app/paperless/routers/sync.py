@@ -0,0 +1,55 @@
+# backend/app/paperless/routers/sync.py
+import json
+from dataclasses import asdict
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.paperless.manage_database.constants import ARCHIVE_PATH
+from app.paperless.manage_database.core import apply_plan, plan_sync
+from app.paperless.manage_database.jobs import SyncInProgress, get_job, start_sync_job
+from app.paperless.manage_database.plan import SyncPlan
+from app.paperless.schema.sync import SyncJobRequest, SyncJobSchema, SyncPlanSchema, SyncReportSchema
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+
+@router.get("/plan", response_model=SyncPlanSchema)
+def _get_sync_plan(incremental: bool = False):
+    return plan_sync(ARCHIVE_PATH, incremental=incremental).to_dict()
+
+
+@router.post("/apply", response_model=SyncReportSchema)
+def _apply_sync_plan(plan: SyncPlanSchema):
+    return asdict(apply_plan(SyncPlan.from_dict(plan.model_dump())))
+
+
+@router.post("/jobs", response_model=SyncJobSchema, status_code=202)
+def _start_sync_job(request: SyncJobRequest):
+    plan = SyncPlan.from_dict(request.plan.model_dump()) if request.plan else None
+    try:
+        job = start_sync_job(ARCHIVE_PATH, plan=plan, files=request.files, bulk=request.bulk,
+                             incremental=request.incremental)
+    except SyncInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return job.state()
+
+
+def _get_job_or_404(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail='"SyncJob" non trovato')
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=SyncJobSchema)
+def _get_sync_job(job_id: str):
+    return _get_job_or_404(job_id).state()
+
+
+@router.get("/jobs/{job_id}/progress")
+def _stream_sync_job(job_id: str):
+    # Una riga JSON (NDJSON) per ogni aggiornamento, fino alla conclusione del job
+    job = _get_job_or_404(job_id)
+    lines = (json.dumps(state) + "\n" for state in job.stream())
+    return StreamingResponse(lines, media_type="application/x-ndjson")
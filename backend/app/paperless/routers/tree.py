@@ -0,0 +1,45 @@
+# backend/app/paperless/routers/tree.py
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.database import get_read_db, session_scope
+from app.paperless.CRUD.tree import get_paths_under, get_tree_children
+from app.paperless.downloads import content_disposition, folder_entries, stream_zip
+from app.paperless.manage_database.constants import ARCHIVE_PATH
+from app.paperless.manage_database.tree import DB_Tree
+from app.paperless.routers.functions import run_read
+from app.paperless.schema.tree import TreeLevelSchema
+
+router = APIRouter(prefix="/tree", tags=["Tree"])
+
+
+@router.get("/", response_model=TreeLevelSchema)
+async def _get_tree_level(prefix: str = "", db=Depends(get_read_db)):
+    parts = tuple(part for part in prefix.split("/") if part)
+    if len(parts) >= len(DB_Tree.structure):
+        raise HTTPException(status_code=400, detail="Il prefisso indica già un documento: non ha figli")
+
+    rows = await run_read(db, lambda session: get_tree_children(session, parts))
+    return {
+        "prefix": "/".join(parts),
+        "level": DB_Tree.structure[len(parts)],
+        "children": [row._asdict() for row in rows]
+    }
+
+
+@router.get("/zip")
+def _download_zip(prefix: str):
+    parts = tuple(part for part in prefix.split("/") if part)
+    if not 2 <= len(parts) <= 4:
+        raise HTTPException(status_code=400, detail="Lo zip è disponibile per un'utenza, un anno o un tipo documento")
+
+    # La sessione serve solo per l'elenco dei path: non resta aperta durante lo streaming
+    with session_scope() as db:
+        paths = get_paths_under(db, parts)
+    if not paths:
+        raise HTTPException(status_code=404, detail="Nessun documento sotto il prefisso indicato")
+
+    # Nello zip i path partono dall'ultima cartella del prefisso (es. '2024/paid/documento/file.pdf')
+    entries = folder_entries(ARCHIVE_PATH, paths, start=len(parts) - 1)
+    headers = {"Content-Disposition": content_disposition("attachment", "-".join(parts) + ".zip")}
+    return StreamingResponse(stream_zip(entries), media_type="application/zip", headers=headers)
@@ -1,19 +1,26 @@
 # backend/app/paperless/routers/utility.py
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Response
 
-from app.database import get_db
+from app.database import get_read_db
 from app.paperless.CRUD.utility import get_utility_by_id, get_all_utilities
+from app.paperless.models import Utility
+from app.paperless.routers.functions import CachedRoute, PageParams, run_read
 from app.paperless.schema.response import UtilitySchema
 
-router = APIRouter(prefix="/utilities", tags=["Utilities"])
+router = APIRouter(prefix="/utilities", tags=["Utilities"], route_class=CachedRoute)
 
 
 @router.get("/{utility_id}", response_model=UtilitySchema)
-def _get_utility_by_id(utility_id: int, db: Session = Depends(get_db)):
-    return get_utility_by_id(utility_id, db)
+async def _get_utility_by_id(utility_id: int, db=Depends(get_read_db)):
+    return await run_read(db, lambda session: get_utility_by_id(utility_id, session))
 
 
 @router.get("/", response_model=list[UtilitySchema])
-def _get_utilities(db: Session = Depends(get_db)):
-    return get_all_utilities(db)
+async def _get_utilities(response: Response, page: PageParams = Depends(), db=Depends(get_read_db)):
+    attrs = page.columns(Utility, UtilitySchema)
+
+    def read(session):
+        rows = get_all_utilities(session, attrs=attrs, after_id=page.after_id, limit=page.limit)
+        return page.respond(session, Utility, rows, response, attrs)
+
+    return await run_read(db, read)
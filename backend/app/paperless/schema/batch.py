@@ -0,0 +1,18 @@
+# backend/app/paperless/schema/batch.py
+
+from typing import Literal, Optional
+from pydantic import BaseModel
+
+
+class BatchItemResultSchema(BaseModel):
+    index: int
+    status: Literal["created", "existing", "error"]
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class BatchResultSchema(BaseModel):
+    created: int
+    existing: int
+    errors: int
+    results: list[BatchItemResultSchema]
@@ -1,6 +1,6 @@
 # backend/app/paperless/schema/creation.py
-from typing import Optional
-from pydantic import BaseModel
+from typing import Literal, Optional
+from pydantic import BaseModel, field_validator
 
 from app.paperless.schema.base import BaseCreationSchema, DescriptionCreationSchema
 
@@ -33,6 +33,42 @@ class PathCreationSchema(BaseModel):
     document_id: int
 
 
+def check_path_label(label: str) -> str:
+    """
+    Verifica che `label` sia utilizzabile come nome di una cartella dell'archivio:
+    non vuoto, senza separatori né caratteri nulli, senza punto iniziale (esclude
+    anche '.' e '..'). Restituisce `label` invariato.
+
+    :raises ValueError: se il nome non è valido.
+    """
+    if not label.strip():
+        raise ValueError("il nome non può essere vuoto")
+    if any(char in label for char in ('/', '\\', '\0')):
+        raise ValueError("il nome non può contenere separatori di percorso")
+    if label.startswith('.'):
+        raise ValueError("il nome non può iniziare con un punto")
+    return label
+
+
+class PathLabelsCreationSchema(BaseModel):
+    category: str
+    utility: str
+    year: int
+    document_type: str
+    document: str
+
+    # I nomi diventano cartelle dell'archivio (es. nell'archiviazione delle scansioni)
+    @field_validator("category", "utility", "document_type", "document")
+    @classmethod
+    def path_label(cls, label: str) -> str:
+        return check_path_label(label)
+
+
+class PendingScanCreationSchema(PathLabelsCreationSchema):
+    document_type: Literal["paid", "not_paid", "default"]
+    filename: Optional[str] = None
+
+
 class TagCreationSchema(BaseCreationSchema):
     pass
 
@@ -0,0 +1,43 @@
+# backend/app/paperless/schema/file.py
+
+from typing import Optional
+from pydantic import BaseModel
+
+
+class DocumentFileSchema(BaseModel):
+    id: int
+    path_id: int
+    path: Optional[str] = None
+    filename: str
+
+
+class DuplicateGroupSchema(BaseModel):
+    content_hash: str
+    size: int
+    count: int
+    files: list[DocumentFileSchema]
+
+
+class FileIndexReportSchema(BaseModel):
+    files: int
+    hashed: int
+    removed: int
+    documents: int
+
+
+class FileIndexStateSchema(BaseModel):
+    running: bool
+    report: Optional[FileIndexReportSchema] = None
+
+
+class ExtractionReportSchema(BaseModel):
+    processed: int
+    text: int
+    ocr: int
+    empty: int
+    failed: int
+
+
+class ExtractionStateSchema(BaseModel):
+    running: bool
+    report: Optional[ExtractionReportSchema] = None
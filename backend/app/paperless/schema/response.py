@@ -1,6 +1,9 @@
 # backend/app/paperless/schema/response.py
+from datetime import datetime
 from typing import Optional
 
+from pydantic import BaseModel, field_validator
+
 from app.paperless.schema.base import BaseSchema, DescriptionSchema, OrmSchema
 
 
@@ -23,6 +26,14 @@ class DocumentTypeSchema(DescriptionSchema, OrmSchema):
 class DocumentSchema(DescriptionSchema, OrmSchema):
     tags: Optional[list[str]] = None
 
+    # La relazione `Document.tags` restituisce oggetti `Tag`: se ne espone solo il nome
+    @field_validator("tags", mode="before")
+    @classmethod
+    def tag_names(cls, tags):
+        if tags is None:
+            return None
+        return [getattr(tag, "name", tag) for tag in tags]
+
 
 class PathSchema(OrmSchema):
     id: int
@@ -37,7 +48,23 @@ class PendingScanSchema(OrmSchema):
     id: int
     category: str
     utility: str
-    year: str
+    year: int
     document_type: str
     document: str
+    filename: Optional[str] = None
+    status: str
+    attempts: int
+    error: Optional[str] = None
+    created_at: datetime
+
+
+class IngestionReportSchema(BaseModel):
+    filed: int
+    failed: int
+    retried: int
+
+
+class IngestionStateSchema(BaseModel):
+    running: bool
+    report: Optional[IngestionReportSchema] = None
 
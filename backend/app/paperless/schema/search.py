@@ -0,0 +1,30 @@
+# backend/app/paperless/schema/search.py
+
+from typing import Literal, Optional
+from pydantic import BaseModel
+
+
+class SearchResultSchema(BaseModel):
+    kind: Literal["category", "utility", "document"]
+    id: int
+    name: str
+    score: float
+
+
+class SearchPageSchema(BaseModel):
+    results: list[SearchResultSchema]
+    next_cursor: Optional[str] = None
+
+
+class TextSearchResultSchema(BaseModel):
+    file_id: int
+    path_id: int
+    path: Optional[str] = None
+    filename: str
+    rank: float
+    snippet: str
+
+
+class TextSearchPageSchema(BaseModel):
+    results: list[TextSearchResultSchema]
+    next_cursor: Optional[str] = None
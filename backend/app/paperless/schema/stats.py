@@ -0,0 +1,10 @@
+# backend/app/paperless/schema/stats.py
+
+from typing import Union
+from pydantic import BaseModel
+
+
+class StatsSchema(BaseModel):
+    group_by: list[str]
+    total: int
+    rows: list[dict[str, Union[str, int]]]
@@ -0,0 +1,40 @@
+# backend/app/paperless/schema/sync.py
+
+from typing import Literal, Optional
+from pydantic import BaseModel
+
+from app.paperless.schema.file import FileIndexReportSchema
+
+
+class SyncPlanSchema(BaseModel):
+    create: dict[str, list[str]]
+    delete: dict[str, list[str]]
+    counts: dict[str, dict[str, int]] = {}
+
+
+class SyncReportSchema(BaseModel):
+    created: dict[str, int]
+    removed: dict[str, int]
+    round_trips: int
+    skipped: int = 0
+    files: Optional[FileIndexReportSchema] = None
+
+
+class SyncJobRequest(BaseModel):
+    bulk: bool = True
+    incremental: bool = False
+    files: bool = True
+    plan: Optional[SyncPlanSchema] = None
+
+
+class SyncJobSchema(BaseModel):
+    job_id: str
+    status: Literal["running", "done", "failed"]
+    phase: str
+    processed: int
+    total: int
+    throughput: float
+    eta: Optional[float] = None
+    elapsed: float
+    report: Optional[SyncReportSchema] = None
+    error: Optional[str] = None
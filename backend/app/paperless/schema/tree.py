@@ -0,0 +1,15 @@
+# backend/app/paperless/schema/tree.py
+
+from pydantic import BaseModel
+
+
+class TreeNodeSchema(BaseModel):
+    name: str
+    id: int
+    count: int
+
+
+class TreeLevelSchema(BaseModel):
+    prefix: str
+    level: str
+    children: list[TreeNodeSchema]
@@ -0,0 +1,33 @@
+# backend/app/responses.py
+from typing import Any
+
+import orjson
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    Risposta JSON serializzata con orjson, molto più veloce di `json.dumps` sugli elenchi lunghi.
+    Gestisce nativamente datetime, UUID e dataclass; accetta chiavi non stringa (es. anni interi).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Indica se l'header `If-None-Match` della richiesta contiene `etag` (o '*'):
+    in tal caso il client ha già la risposta e si può rispondere con un 304.
+
+    Args:
+        request (Request): richiesta HTTP.
+        etag (str): ETag della risposta, tra virgolette.
+
+    Returns:
+        bool: True se la copia del client è ancora valida.
+    """
+    if_none_match = request.headers.get('if-none-match', '')
+    tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return etag in tags or '*' in tags
@@ -0,0 +1,146 @@
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from sqlalchemy import event, func, select, text
+
+from app.database import engine, session_scope
+from app.paperless import models
+from app.paperless.manage_database.bulk import bulk_delete
+from app.paperless.manage_database.core import path_labels_statement
+from app.paperless.manage_database.hooks import run_sync_hooks
+from app.paperless.manage_database.identity import LEVEL_MODELS
+from app.paperless.manage_database.plan import SyncPlan
+from app.paperless.manage_database.utils import lock_sync
+
+LEVEL_TABLES = ("categories", "utilities", "years", "document_types", "documents")
+
+
+class QueryCounter:
+    """Conta le istruzioni SQL eseguite sull'engine finché il blocco `with` è attivo."""
+
+    def __init__(self):
+        self.count = 0
+        self.statements: list[str] = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    """
+    Esempio:
+        with count_queries() as queries:
+            client.get("/api/paperless/documents/")
+        assert queries.count == 2
+    """
+    counter = QueryCounter()
+    event.listen(engine, 'before_cursor_execute', counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryCounter]:
+    """Fallisce se il blocco esegue più di `limit` istruzioni SQL."""
+    with count_queries() as counter:
+        yield counter
+    assert counter.count <= limit, (
+        f"Eseguite {counter.count} query (massimo {limit}):\n" + "\n".join(counter.statements)
+    )
+
+
+def _level_id(connection, table: str, name, created: dict[str, list[int]]) -> int:
+    """Id del livello `name`, creato (e annotato in `created`) se non esiste."""
+    level_id = connection.execute(text(f"SELECT id FROM paperless.{table} WHERE name = :name"), {"name": name}).scalar()
+    if level_id is None:
+        level_id = connection.execute(
+            text(f"INSERT INTO paperless.{table} (name) VALUES (:name) RETURNING id"), {"name": name}
+        ).scalar()
+        created.setdefault(table, []).append(level_id)
+    return level_id
+
+
+@contextmanager
+def paths_from_another_process(levels: tuple, documents: list[str]) -> Iterator[Callable[[], None]]:
+    """
+    Inserisce con SQL diretto, senza hook di sincronizzazione né identity map, i path
+    `levels` + documento per ciascun documento, come farebbe un altro processo.
+    Restituisce una funzione che li elimina allo stesso modo; all'uscita dal blocco
+    vengono comunque eliminati, insieme ai soli livelli creati.
+
+    Esempio:
+        with paths_from_another_process(("Banca", "Enel", 2099, "paid"), ["bolletta"]) as delete:
+            ...
+    """
+    created: dict[str, list[int]] = {}
+    with engine.begin() as connection:
+        ids = [_level_id(connection, table, name, created) for table, name in zip(LEVEL_TABLES, levels)]
+        created["paths"] = [
+            connection.execute(text(
+                "INSERT INTO paperless.paths (category, utility, year, document_type, document) "
+                "VALUES (:c, :u, :y, :t, :d) RETURNING id"
+            ), dict(zip("cuytd", (*ids, _level_id(connection, "documents", document, created))))).scalar()
+            for document in documents
+        ]
+
+    def delete():
+        with engine.begin() as connection:
+            for table in ("paths", *reversed(LEVEL_TABLES)):
+                connection.execute(
+                    text(f"DELETE FROM paperless.{table} WHERE id = ANY(:ids)"), {"ids": created.pop(table, [])}
+                )
+
+    try:
+        yield delete
+    finally:
+        delete()
+
+
+@contextmanager
+def cleanup_paths(prefix: str, levels: tuple) -> Iterator[None]:
+    """
+    All'uscita dal blocco elimina i documenti il cui nome inizia con `prefix`, con i loro
+    path, e, tra i livelli `levels` (categoria, utenza, anno, tipo documento),
+    quelli creati nel blocco e non più usati. L'eliminazione passa come una sincronizzazione:
+    lock e azzeramento dell'identity map, poi gli hook con le modifiche salvate.
+
+    Esempio:
+        with cleanup_paths("__test__", ("Banca", "Enel", 2099, "paid")):
+            client.post("/api/paperless/paths/batch", json=[...])
+    """
+    upper = list(LEVEL_MODELS.items())[:len(levels)]
+    with session_scope() as db:
+        existed = {
+            level: db.execute(select(model.id).where(model.name == name)).scalar() is not None
+            for (level, model), name in zip(upper, levels)
+        }
+
+    try:
+        yield
+    finally:
+        plan = SyncPlan()
+        with session_scope() as db:
+            lock_sync(db)
+            documents = db.execute(
+                select(models.Document.id, models.Document.name).where(func.starts_with(models.Document.name, prefix))
+            ).all()
+            statement = path_labels_statement().add_columns(models.Path.id) \
+                .where(models.Document.id.in_([document_id for document_id, _ in documents]))
+            rows = db.execute(statement).all()
+            bulk_delete(db, models.Path, [row[5] for row in rows])
+            bulk_delete(db, models.Document, [document_id for document_id, _ in documents])
+            plan.delete['paths'] = ['/'.join(map(str, row[:5])) for row in rows]
+            plan.delete['document'] = [name for _, name in documents]
+
+            for (level, model), name in zip(upper, levels):
+                column = getattr(models.Path, level)
+                level_id = db.execute(select(model.id).where(model.name == name)).scalar()
+                if existed[level] or level_id is None or db.execute(select(column).where(column == level_id)).first():
+                    continue
+                bulk_delete(db, model, [level_id])
+                plan.delete[level] = [str(name)]
+        run_sync_hooks(plan)
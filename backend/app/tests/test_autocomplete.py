@@ -0,0 +1,74 @@
+from sqlalchemy import text
+
+from app.database import engine, session_scope
+from app.paperless.autocomplete import StructureIndex, TokenIndex, tokenize
+from app.paperless.generation import data_generation
+from app.paperless.manage_database.hooks import register_sync_hook, run_sync_hooks, unregister_sync_hook
+from app.paperless.manage_database.plan import SyncPlan
+
+
+def test_tokenize_matches_form_pipeline():
+    assert tokenize("Bolletta Enel 12.03.2023 (luce)") == ['Bolletta', 'Enel', 'luce']
+    assert tokenize("2023-01") == []
+    assert tokenize("F24 - IMU acconto") == ['IMU', 'acconto']
+
+
+def test_token_index_is_refcounted():
+    index = TokenIndex()
+    index.build(["Bolletta Enel gennaio", "Bolletta Enel febbraio"])
+    assert index.vocabulary() == ['Bolletta', 'Enel', 'febbraio', 'gennaio']
+
+    index.remove(["Bolletta Enel gennaio"])
+    assert index.vocabulary() == ['Bolletta', 'Enel', 'febbraio']
+
+    index.add(["Referto ENEA"])
+    assert index.search("en", 10) == ['ENEA', 'Enel']
+    assert index.search("en", 1) == ['ENEA']
+    assert index.search("zz", 10) == []
+
+
+def test_sync_hook_updates_index():
+    index = StructureIndex()
+    index.categories, index.utilities = ['Banca'], ['Enel']
+    index.documents = TokenIndex()
+    index.documents.build(["Bolletta gennaio"])
+    index.generation = data_generation.refresh()
+    etag = index.etag
+
+    register_sync_hook(index.on_sync)
+    try:
+        run_sync_hooks(SyncPlan(create={'document': ["Bolletta marzo"]}, delete={'document': ["Bolletta gennaio"]}))
+    finally:
+        unregister_sync_hook(index.on_sync)
+
+    assert index.documents.vocabulary() == ['Bolletta', 'marzo']
+    assert index.categories == ['Banca']
+    assert index.etag != etag
+
+    # Un piano vuoto non notifica gli hook e non cambia l'ETag
+    etag = index.etag
+    index.on_sync(SyncPlan(create={'paths': ["Banca/Enel/2023/paid/x"]}))
+    assert index.etag == etag
+
+
+def test_index_reloads_after_writes_from_another_process(monkeypatch):
+    monkeypatch.setattr(data_generation, "ttl", 0)
+    index = StructureIndex()
+    name = "__test_autocomplete__cat"
+
+    with session_scope() as db:
+        assert index.search(db, 'category', name, 5) == []
+        etag = index.etag
+
+        # Scrittura con SQL diretto, senza hook: solo il trigger aggiorna la generazione
+        with engine.begin() as connection:
+            category_id = connection.execute(
+                text("INSERT INTO paperless.categories (name) VALUES (:name) RETURNING id"), {"name": name}
+            ).scalar()
+        try:
+            assert index.etag != etag
+            assert index.search(db, 'category', name, 5) == [name]
+        finally:
+            with engine.begin() as connection:
+                connection.execute(text("DELETE FROM paperless.categories WHERE id = :id"), {"id": category_id})
+        assert index.search(db, 'category', name, 5) == []
@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import session_scope
+from app.main import app
+from app.paperless.manage_database.utils import lock_sync
+from app.paperless.models import Document
+from app.tests.helpers import assert_max_queries, cleanup_paths
+
+client = TestClient(app)
+
+PREFIX = "__test_batch__"
+
+
+@pytest.fixture
+def cleanup():
+    """Elimina i path e le entità create dal test."""
+    with cleanup_paths(PREFIX, (f"{PREFIX}cat", f"{PREFIX}ut", 2099, "paid")):
+        yield
+
+
+def test_documents_batch_is_one_insert(cleanup):
+    documents = [{"name": f"{PREFIX} documento {i}"} for i in range(200)] + [{"name": f"{PREFIX} documento 0"}]
+
+    # Lock della sincronizzazione, SELECT dei nomi esistenti e INSERT multi-riga, la generazione
+    # della transazione letta prima del commit per l'identity map, più gli hook dopo il commit:
+    # aggiornamento della vista path_tree (lock, confronto delle generazioni, refresh, nuova
+    # generazione della vista) e rilettura della generazione dei dati
+    with assert_max_queries(9):
+        response = client.post("/api/paperless/documents/batch", json=documents)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["created"], body["existing"], body["errors"]) == (200, 1, 0)
+    assert body["results"][-1]["id"] == body["results"][0]["id"]
+
+    again = client.post("/api/paperless/documents/batch", json=documents[:2]).json()
+    assert [result["status"] for result in again["results"]] == ["existing", "existing"]
+
+
+def test_documents_batch_waits_for_the_sync_lock(cleanup):
+    name = f"{PREFIX} documento concorrente"
+    responses = []
+
+    with session_scope() as db:
+        lock_sync(db)
+        worker = threading.Thread(
+            target=lambda: responses.append(client.post("/api/paperless/documents/batch", json=[{"name": name}]))
+        )
+        worker.start()
+        worker.join(0.5)
+        assert worker.is_alive(), "La creazione non ha atteso il lock della sincronizzazione"
+        # Il nome inserito da chi detiene il lock è visibile alla SELECT della creazione
+        db.add(Document(name=name))
+
+    worker.join(10)
+    assert responses[0].json()["results"][0]["status"] == "existing"
+    with session_scope() as db:
+        assert db.query(Document).filter(Document.name == name).count() == 1
+
+
+def test_paths_batch_resolves_each_level_once(cleanup):
+    paths = [
+        {"category": f"{PREFIX}cat", "utility": f"{PREFIX}ut", "year": 2099,
+         "document_type": "paid", "document": f"{PREFIX} documento {i}"}
+        for i in range(200)
+    ]
+    paths.append({"category_id": -1, "utility_id": -1, "year_id": -1, "document_type_id": -1, "document_id": -1})
+
+    # Il numero di query dipende dai livelli, non dal numero di path: per livello al più
+    # il caricamento dell'identity map, la verifica degli id e l'INSERT dei nomi nuovi
+    with assert_max_queries(21):
+        response = client.post("/api/paperless/paths/batch", json=paths)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["created"], body["existing"], body["errors"]) == (200, 0, 1)
+    assert body["results"][-1]["detail"].startswith("Livelli non trovati")
+
+    again = client.post("/api/paperless/paths/batch", json=paths[:1]).json()
+    assert again["results"][0] == {**body["results"][0], "status": "existing"}
+
+
+@pytest.mark.parametrize("label", ["", " ", ".", "..", ".nascosto", "a/b", "a\\b", "../../etc"])
+def test_paths_batch_rejects_unsafe_labels(label):
+    path = {"category": f"{PREFIX}cat", "utility": f"{PREFIX}ut", "year": 2099,
+            "document_type": "paid", "document": label}
+    response = client.post("/api/paperless/paths/batch", json=[path])
+    assert response.status_code == 422
+
+    for level in ("category", "utility"):
+        assert client.post("/api/paperless/paths/batch", json=[{**path, "document": "ok", level: label}]).status_code == 422
@@ -0,0 +1,109 @@
+import time
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.database import engine
+from app.paperless.cache import CachedResponse, LocalRedis, RedisBackend, ResponseCache, TTLCache, response_cache
+from app.paperless.generation import data_generation
+from app.paperless.routers.functions import CachedRoute
+
+
+def test_ttl_cache_expires_and_evicts():
+    cache = TTLCache(ttl=0.05, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    # "b" è la voce meno recente dopo la lettura di "a"
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    time.sleep(0.06)
+    assert cache.get("a") is None
+
+
+def test_ttl_cache_get_or_set_and_clear():
+    cache = TTLCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return []
+
+    assert cache.get_or_set("rows", compute) == []
+    assert cache.get_or_set("rows", compute) == []
+    assert len(calls) == 1
+
+    cache.clear(object())
+    cache.get_or_set("rows", compute)
+    assert len(calls) == 2
+
+
+def bump_from_another_process():
+    """Scrittura fatta fuori dal processo: lo stato locale non viene toccato."""
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE paperless.generations SET value = value + 1 WHERE name = 'data'"))
+
+
+def test_response_cache_generation_on_local_redis():
+    cache = ResponseCache(RedisBackend(LocalRedis(), prefix="test"))
+    generation = cache.generation()
+    cache.set(generation, "/categories/", CachedResponse(body="[]", headers={}))
+    assert cache.get(generation, "/categories/")["body"] == "[]"
+
+    # Una nuova generazione rende irraggiungibili le voci e gli ETag precedenti
+    bump_from_another_process()
+    data_generation.refresh()
+    new_generation = cache.invalidate()
+    assert new_generation != generation
+    assert cache.get(new_generation, "/categories/") is None
+    assert cache.etag(new_generation, "/categories/") != cache.etag(generation, "/categories/")
+
+
+def test_cached_route_serves_304_without_running_the_endpoint():
+    router = APIRouter(route_class=CachedRoute)
+    calls = []
+
+    @router.get("/items")
+    def _items(limit: int = 10):
+        calls.append(limit)
+        return [{"id": 1}]
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+
+    first = client.get("/items?limit=5")
+    etag = first.headers["etag"]
+    assert client.get("/items?limit=5").json() == [{"id": 1}]
+    assert client.get("/items?limit=5", headers={"If-None-Match": etag}).status_code == 304
+    assert calls == [5]
+
+    bump_from_another_process()
+    data_generation.refresh()
+    response_cache.invalidate()
+    second = client.get("/items?limit=5", headers={"If-None-Match": etag})
+    assert second.status_code == 200
+    assert second.headers["etag"] != etag
+    assert calls == [5, 5]
+
+
+def test_writes_from_another_process_reach_the_cache_within_the_ttl(monkeypatch):
+    monkeypatch.setattr(data_generation, "ttl", 0.05)
+    generation = response_cache.generation()
+    # Entro il TTL la generazione nota viene riusata senza interrogare il database
+    bump_from_another_process()
+    assert response_cache.generation() == generation
+
+    time.sleep(0.06)
+    bumped = response_cache.generation()
+    assert int(bumped) == int(generation) + 1
+
+    # Il trigger incrementa la generazione una sola volta per transazione
+    with engine.begin() as connection:
+        for _ in range(2):
+            connection.execute(text("UPDATE paperless.years SET name = name WHERE false"))
+    assert int(data_generation.refresh()) == int(bumped) + 1
@@ -13,3 +13,97 @@ def test_database_connection():
         assert row[0] == 1, "La query SELECT 1 non ha restituito il valore corretto"
     finally:
         db.close()
+
+
+# Test dell'unità di lavoro: rollback in caso di eccezione e connessione restituita al pool
+def test_session_scope_rollback():
+    from app.database import engine, session_scope
+
+    with pytest.raises(RuntimeError):
+        with session_scope() as db:
+            db.execute(text("SELECT 1"))
+            raise RuntimeError("errore simulato")
+
+    assert engine.pool.checkedout() == 0, "La connessione non è stata restituita al pool"
+
+
+# Test del lock advisory: una seconda sessione non può acquisirlo finché il primo è attivo
+def test_sync_lock_is_exclusive():
+    from app.database import session_scope
+    from app.paperless.manage_database.utils import SYNC_LOCK_KEY, lock_sync
+
+    try_lock = text("SELECT pg_try_advisory_xact_lock(:key)")
+
+    with session_scope() as first:
+        lock_sync(first)
+        with session_scope() as second:
+            assert not second.execute(try_lock, {'key': SYNC_LOCK_KEY}).scalar()
+
+    # Al commit della prima sessione il lock viene rilasciato
+    with session_scope() as third:
+        assert third.execute(try_lock, {'key': SYNC_LOCK_KEY}).scalar()
+
+
+
+# Test della sessione asincrona (richiede asyncpg): le letture sincrone girano con `run_read`
+def test_async_database_connection():
+    import asyncio
+
+    from fastapi import HTTPException
+
+    from app.database import async_engine, get_async_db, session_scope
+    from app.paperless.models import Category, ExcludedPath
+    from app.paperless.routers.functions import get_all, get_one, run_read
+
+    if async_engine is None:
+        pytest.skip("asyncpg non installato")
+
+    async def query():
+        sessions = get_async_db()
+        db = await anext(sessions)
+        try:
+            row = (await db.execute(text("SELECT 1"))).fetchone()
+            rows = await run_read(db, lambda session: get_all(session, Category, attrs=['id', 'name'], limit=2))
+            with pytest.raises(HTTPException) as missing:
+                await run_read(db, lambda session: get_one(session, ExcludedPath, -1))
+            return row, rows, missing.value
+        finally:
+            await sessions.aclose()
+
+    # Ogni asyncio.run usa un nuovo event loop: la dependency rinnova il pool
+    for _ in range(2):
+        row, rows, missing = asyncio.run(query())
+        assert row[0] == 1, "La query SELECT 1 non ha restituito il valore corretto"
+        assert missing.status_code == 404
+
+    with session_scope() as db:
+        expected = get_all(db, Category, attrs=['id', 'name'], limit=2)
+    assert [tuple(row) for row in rows] == [tuple(row) for row in expected]
+
+
+# Test di `create_all`: la generazione dei dati ha la riga 'data' e i trigger, come con la migrazione
+def test_create_all_sets_up_the_data_generation():
+    from sqlalchemy import insert, select
+
+    from app.database import Base, engine
+    from app.paperless.models import Category, Generation, Tag
+
+    with engine.connect() as connection:
+        # Gli indici trigrammi dei modelli richiedono l'estensione
+        if not connection.execute(text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).scalar():
+            pytest.skip("pg_trgm non disponibile")
+
+        # Lo schema viene creato da zero in una transazione annullata alla fine del test
+        try:
+            connection.execute(text("ALTER SCHEMA paperless RENAME TO paperless_create_all"))
+            connection.execute(text("CREATE SCHEMA paperless"))
+            Base.metadata.create_all(connection)
+
+            generation = select(Generation.value).where(Generation.name == 'data')
+            assert connection.execute(generation).scalar() == 0
+            connection.execute(insert(Category), [{'name': 'a'}, {'name': 'b'}])
+            connection.execute(insert(Tag), [{'name': 't'}])
+            # Un solo incremento per transazione, come con i trigger della migrazione
+            assert connection.execute(generation).scalar() == 1
+        finally:
+            connection.rollback()
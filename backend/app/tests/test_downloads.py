@@ -0,0 +1,113 @@
+import io
+import os
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.database import session_scope
+from app.main import app
+from app.paperless import models
+from app.paperless.downloads import ZIP_CHUNK_SIZE, folder_entries, stream_zip
+from app.paperless.generation import data_generation
+from app.tests.helpers import cleanup_paths, paths_from_another_process
+
+client = TestClient(app)
+
+PREFIX = "__test_downloads__"
+LEVELS = (f"{PREFIX}cat", f"{PREFIX}ut", "2099", "paid")
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    """Due path (documenti doc0 e doc1) con le cartelle documento in un archivio temporaneo."""
+    paths = [dict(zip(("category", "utility", "year", "document_type"), LEVELS), document=f"{PREFIX}doc{i}")
+             for i in range(2)]
+    with cleanup_paths(PREFIX, LEVELS):
+        response = client.post("/api/paperless/paths/batch", json=paths)
+        assert response.status_code == 200
+        for path in paths:
+            tmp_path.joinpath(*LEVELS, path["document"]).mkdir(parents=True)
+        monkeypatch.setattr("app.paperless.routers.path.ARCHIVE_PATH", str(tmp_path))
+        monkeypatch.setattr("app.paperless.routers.tree.ARCHIVE_PATH", str(tmp_path))
+
+        yield tmp_path, [result["id"] for result in response.json()["results"]]
+
+
+def test_download_supports_range_and_conditional_requests(archive):
+    root, (path_id, _) = archive
+    content = os.urandom(3 * 1024 * 1024)
+    root.joinpath(*LEVELS, f"{PREFIX}doc0", "scansione.pdf").write_bytes(content)
+    url = f"/api/paperless/paths/{path_id}/files/scansione.pdf"
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == content
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.headers["content-disposition"].startswith("inline")
+
+    partial = client.get(url, headers={"Range": "bytes=100-199"})
+    assert partial.status_code == 206 and partial.content == content[100:200]
+
+    assert client.get(url, headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+    assert client.get(url, headers={"If-Modified-Since": response.headers["last-modified"]}).status_code == 304
+    assert client.get(url, params={"download": True}).headers["content-disposition"].startswith("attachment")
+
+    assert client.get(f"/api/paperless/paths/{path_id}/files/.DS_Store").status_code == 400
+    assert client.get(f"/api/paperless/paths/{path_id}/files/mancante.pdf").status_code == 404
+    assert client.get("/api/paperless/paths/0/files/scansione.pdf").status_code == 404
+
+
+def test_zip_streams_a_utility_folder(archive):
+    root, _ = archive
+    files = {
+        f"{PREFIX}doc0/a.pdf": os.urandom(3 * 1024 * 1024),
+        f"{PREFIX}doc1/b.pdf": b"%PDF-1.4 piccolo",
+    }
+    for name, content in files.items():
+        root.joinpath(*LEVELS, name).write_bytes(content)
+
+    response = client.get("/api/paperless/tree/zip", params={"prefix": "/".join(LEVELS[:2])})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    archive_file = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive_file.testzip() is None
+    expected = {f"{PREFIX}ut/2099/paid/{name}": content for name, content in files.items()}
+    assert {name: archive_file.read(name) for name in archive_file.namelist()} == expected
+
+    # Il client di test raccoglie l'intera risposta: la produzione a pezzi si verifica sul
+    # generatore, che non trattiene mai più di un blocco letto (più le intestazioni)
+    chunks = list(stream_zip(folder_entries(root, [LEVELS + (f"{PREFIX}doc0",)])))
+    assert len(chunks) > 3
+    assert max(map(len, chunks)) <= ZIP_CHUNK_SIZE + 1024
+
+    assert client.get("/api/paperless/tree/zip", params={"prefix": LEVELS[0]}).status_code == 400
+    assert client.get("/api/paperless/tree/zip", params={"prefix": f"{PREFIX}x/y"}).status_code == 404
+
+
+def test_downloads_stay_inside_the_archive(archive, tmp_path_factory, monkeypatch):
+    root, (path_id, _) = archive
+    # Lo zip deve vedere subito il path inserito qui sotto
+    monkeypatch.setattr(data_generation, "ttl", 0)
+    outside = tmp_path_factory.mktemp("fuori")
+    (outside / "segreto.pdf").write_bytes(b"segreto")
+
+    # Un documento con '..' nel nome, inserito senza passare dalla validazione dei nomi
+    traversal = os.path.relpath(outside, root.joinpath(*LEVELS))
+    with paths_from_another_process(LEVELS, [traversal]):
+        with session_scope() as db:
+            traversal_id = db.execute(
+                select(models.Path.id).join(models.Path.document_rel).where(models.Document.name == traversal)
+            ).scalar()
+        assert client.get(f"/api/paperless/paths/{traversal_id}/files/segreto.pdf").status_code == 404
+
+        response = client.get("/api/paperless/tree/zip", params={"prefix": "/".join(LEVELS[:2])})
+        assert response.status_code == 200
+        assert zipfile.ZipFile(io.BytesIO(response.content)).namelist() == []
+
+    # Una cartella documento che è un link simbolico verso l'esterno
+    folder = root.joinpath(*LEVELS, f"{PREFIX}doc0")
+    folder.rmdir()
+    folder.symlink_to(outside)
+    assert client.get(f"/api/paperless/paths/{path_id}/files/segreto.pdf").status_code == 404
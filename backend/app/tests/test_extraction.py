@@ -0,0 +1,106 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import session_scope
+from app.main import app
+from app.paperless import models
+from app.paperless.manage_database import extraction
+from app.paperless.manage_database.extraction import run_extraction
+from app.paperless.manage_database.files import index_files
+from app.tests.helpers import cleanup_paths
+
+client = TestClient(app)
+
+PREFIX = "__test_extraction__"
+LEVELS = (f"{PREFIX}cat", f"{PREFIX}ut", "2099", "paid", f"{PREFIX}doc")
+
+
+def failing_extraction(location):
+    """Sostituisce `extract_text` nei processi del pool: deve restare una funzione di modulo."""
+    raise RuntimeError("pdf danneggiato")
+
+
+def text_pdf(text: str) -> bytes:
+    """PDF di una pagina con `text` nel livello di testo (font standard Helvetica)."""
+    stream = f"BT /F1 12 Tf 20 100 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 600 200] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    body, offsets = b"%PDF-1.4\n", []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += b"%d 0 obj\n%s\nendobj\n" % (number, obj)
+    xref = len(body)
+    body += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    body += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    body += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return body
+
+
+@pytest.fixture
+def archive(tmp_path):
+    path = dict(zip(("category", "utility", "year", "document_type", "document"), LEVELS))
+    with cleanup_paths(PREFIX, LEVELS[:4]):
+        assert client.post("/api/paperless/paths/batch", json=[path]).status_code == 200
+        tmp_path.joinpath(*LEVELS).mkdir(parents=True)
+
+        yield tmp_path.joinpath(*LEVELS)
+
+
+def test_extraction_is_incremental_and_searchable(archive, tmp_path):
+    pytest.importorskip("pypdf")
+    (archive / "bolletta.pdf").write_bytes(text_pdf("Fornitura di energia elettrica zzqxfatturazione marzo"))
+    (archive / "note.bin").write_bytes(b"\x00\x01")
+    index_files(tmp_path, workers=1)
+
+    report = run_extraction(tmp_path, workers=2, queue_size=1)
+    assert (report.processed, report.text, report.empty, report.failed) == (2, 1, 1, 0)
+    # Nessun file nuovo o modificato: nulla da rielaborare
+    assert run_extraction(tmp_path, workers=1).processed == 0
+
+    response = client.get("/api/paperless/search/text", params={"q": "zzqxfatturazione elettrica"})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["filename"] for result in results] == ["bolletta.pdf"]
+    assert results[0]["path"] == "/".join(LEVELS)
+    assert "<b>zzqxfatturazione</b>" in results[0]["snippet"]
+
+    # Il file modificato viene estratto di nuovo e il vecchio testo non si trova più
+    (archive / "bolletta.pdf").write_bytes(text_pdf("Fornitura di gas naturale zzqxconguaglio aprile"))
+    index_files(tmp_path, workers=1)
+    assert run_extraction(tmp_path, workers=1).processed == 1
+    assert client.get("/api/paperless/search/text", params={"q": "zzqxfatturazione"}).json()["results"] == []
+    assert len(client.get("/api/paperless/search/text", params={"q": "zzqxconguaglio"}).json()["results"]) == 1
+
+
+def test_failed_extractions_are_recorded_and_retried(archive, tmp_path, monkeypatch):
+    pytest.importorskip("pypdf")
+    (archive / "ricevuta.pdf").write_bytes(text_pdf("Ricevuta di pagamento zzqxricevuta"))
+    index_files(tmp_path, workers=1)
+
+    def stored():
+        with session_scope() as db:
+            text = db.query(models.DocumentText).join(models.DocumentFile).filter(
+                models.DocumentFile.filename == "ricevuta.pdf"
+            ).one()
+            return text.method, text.error, text.attempts
+
+    # Ogni estrazione successiva ritenta il file fallito, fino a MAX_ATTEMPTS volte
+    monkeypatch.setattr(extraction, "extract_text", failing_extraction)
+    for attempt in range(1, extraction.MAX_ATTEMPTS + 1):
+        report = run_extraction(tmp_path, workers=1)
+        assert (report.processed, report.failed) == (1, 1)
+        assert stored() == ("none", "pdf danneggiato", attempt)
+    assert run_extraction(tmp_path, workers=1).processed == 0
+
+    # Un contenuto nuovo viene estratto di nuovo, e il successo cancella l'errore
+    monkeypatch.undo()
+    (archive / "ricevuta.pdf").write_bytes(text_pdf("Ricevuta di pagamento zzqxquietanza"))
+    index_files(tmp_path, workers=1)
+    assert run_extraction(tmp_path, workers=1).text == 1
+    assert stored() == ("text", None, 0)
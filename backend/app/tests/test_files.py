@@ -0,0 +1,102 @@
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import session_scope
+from app.main import app
+from app.paperless import models
+from app.paperless.manage_database import files
+from app.paperless.manage_database.files import index_files
+from app.tests.helpers import cleanup_paths
+
+client = TestClient(app)
+
+PREFIX = "__test_files__"
+LEVELS = (f"{PREFIX}cat", f"{PREFIX}ut", "2099", "paid")
+
+
+@pytest.fixture
+def archive(tmp_path):
+    """Due path nel database con le rispettive cartelle documento in un archivio temporaneo."""
+    paths = [dict(zip(("category", "utility", "year", "document_type"), LEVELS), document=f"{PREFIX}doc{i}")
+             for i in range(2)]
+    with cleanup_paths(PREFIX, LEVELS):
+        assert client.post("/api/paperless/paths/batch", json=paths).status_code == 200
+        for path in paths:
+            (tmp_path.joinpath(*LEVELS) / path["document"]).mkdir(parents=True)
+
+        yield tmp_path
+
+
+def folder(root, i: int):
+    return root.joinpath(*LEVELS, f"{PREFIX}doc{i}")
+
+
+def test_index_rehashes_only_changed_files(archive):
+    folder(archive, 0).joinpath("a.txt").write_bytes(b"stesso contenuto")
+    folder(archive, 1).joinpath("b.txt").write_bytes(b"stesso contenuto")
+    folder(archive, 1).joinpath("c.txt").write_bytes(b"altro contenuto")
+    folder(archive, 1).joinpath(".DS_Store").write_bytes(b"")
+
+    report = index_files(archive, workers=2)
+    assert (report.files, report.hashed, report.removed) == (3, 3, 0)
+
+    # Nulla è cambiato: nessun file viene riletto
+    assert index_files(archive).hashed == 0
+
+    changed = folder(archive, 1) / "c.txt"
+    changed.write_bytes(b"contenuto modificato")
+    os.utime(changed, ns=(1, 1))
+    (folder(archive, 0) / "a.txt").unlink()
+    report = index_files(archive)
+    assert (report.files, report.hashed, report.removed) == (2, 1, 1)
+
+
+def test_duplicates_are_grouped_by_hash(archive):
+    for i, name in ((0, "a.txt"), (1, "b.txt"), (1, "copia.txt")):
+        folder(archive, i).joinpath(name).write_bytes(b"%s duplicato" % PREFIX.encode())
+    folder(archive, 1).joinpath("unico.txt").write_bytes(b"%s unico" % PREFIX.encode())
+    index_files(archive, workers=1)
+
+    groups = client.get("/api/paperless/files/duplicates").json()
+    group = next(group for group in groups if PREFIX in (group["files"][0]["path"] or ""))
+    assert group["count"] == 3
+    assert sorted(file["filename"] for file in group["files"]) == ["a.txt", "b.txt", "copia.txt"]
+    assert all(file["filename"] != "unico.txt" for group in groups for file in group["files"])
+
+
+def test_document_pages_from_pdf(archive):
+    pypdf = pytest.importorskip("pypdf")
+    for i, pages in ((0, 3), (1, 2)):
+        writer = pypdf.PdfWriter()
+        for _ in range(pages):
+            writer.add_blank_page(width=200, height=200)
+        writer.write(folder(archive, i) / "scansione.pdf")
+
+    assert index_files(archive, workers=1).documents == 2
+    with session_scope() as db:
+        pages = dict(db.query(models.Document.name, models.Document.pages)
+                     .filter(models.Document.name.like(f"{PREFIX}%")))
+    assert pages == {f"{PREFIX}doc0": 3, f"{PREFIX}doc1": 2}
+
+
+def test_index_runs_in_background(archive, monkeypatch):
+    monkeypatch.setattr("app.paperless.routers.file.ARCHIVE_PATH", archive)
+    folder(archive, 0).joinpath("a.txt").write_bytes(b"in background")
+
+    response = client.post("/api/paperless/files/index")
+    assert response.status_code == 202
+    deadline = time.monotonic() + 10
+    while client.get("/api/paperless/files/index").json()["running"]:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    assert client.get("/api/paperless/files/index").json()["report"]["hashed"] == 1
+
+    # Un'indicizzazione in corso non ne avvia un'altra
+    assert files._running.acquire(blocking=False)
+    try:
+        assert client.post("/api/paperless/files/index").status_code == 409
+    finally:
+        files._running.release()
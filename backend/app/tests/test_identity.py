@@ -0,0 +1,93 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app.database import SessionLocal, engine, session_scope
+from app.paperless import models
+from app.paperless.generation import data_generation
+from app.paperless.manage_database.identity import IdentityMap
+from app.paperless.manage_database.utils import get_or_create, remove
+from app.tests.helpers import assert_max_queries
+
+NAME = "__test_identity__"
+
+
+def test_identity_map_loads_each_level_once():
+    identity = IdentityMap()
+    with session_scope() as db:
+        identity.warm(db, ['category', 'utility'])
+        names = [name for name, in db.query(models.Category.name).limit(20)]
+
+        with assert_max_queries(0):
+            for name in names:
+                assert identity.get(db, models.Category, name) is not None
+
+
+def test_identity_map_publishes_changes_only_on_commit(monkeypatch):
+    identity = IdentityMap()
+    monkeypatch.setattr("app.paperless.manage_database.utils.identity_map", identity)
+    monkeypatch.setattr("app.paperless.manage_database.identity.identity_map", identity)
+    # La mappa parte dalla generazione esatta, non da una letta entro il TTL
+    monkeypatch.setattr(data_generation, "ttl", 0)
+
+    with session_scope() as db:
+        identity.warm(db, ['category'])
+
+    # Un inserimento annullato non lascia id nella mappa
+    db = SessionLocal()
+    try:
+        category = get_or_create(db, model=models.Category, filter_key='name', name=NAME)
+        assert identity.get(db, models.Category, NAME) == category.id
+        db.rollback()
+    finally:
+        db.close()
+    assert NAME not in identity._ids[models.Category]
+
+    with session_scope() as db:
+        category_id = get_or_create(db, model=models.Category, filter_key='name', name=NAME).id
+    assert identity._ids[models.Category][NAME] == category_id
+
+    with session_scope() as db:
+        remove(db, model=models.Category, filter_key='name', name=NAME)
+    assert NAME not in identity._ids[models.Category]
+
+
+def test_identity_map_expires_after_writes_from_another_process(monkeypatch):
+    identity = IdentityMap()
+    monkeypatch.setattr("app.paperless.manage_database.identity.identity_map", identity)
+    monkeypatch.setattr(data_generation, "ttl", 0)
+
+    with engine.begin() as connection:
+        category_id = connection.execute(
+            text("INSERT INTO paperless.categories (name) VALUES (:name) RETURNING id"), {"name": NAME}
+        ).scalar()
+    try:
+        with session_scope() as db:
+            assert identity.get(db, models.Category, NAME) == category_id
+
+        # Eliminata con SQL diretto: la nuova generazione fa ricaricare la mappa
+        with engine.begin() as connection:
+            connection.execute(text("DELETE FROM paperless.categories WHERE id = :id"), {"id": category_id})
+        with session_scope() as db:
+            assert identity.get(db, models.Category, NAME) is None
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text("DELETE FROM paperless.categories WHERE id = :id"), {"id": category_id})
+
+
+def test_integrity_error_clears_the_map(monkeypatch):
+    identity = IdentityMap()
+    monkeypatch.setattr("app.paperless.manage_database.identity.identity_map", identity)
+    with session_scope() as db:
+        identity.warm(db, ['category'])
+    assert identity._ids
+
+    db = SessionLocal()
+    try:
+        with pytest.raises(IntegrityError):
+            db.execute(text("INSERT INTO paperless.paths (category, utility, year, document_type, document) "
+                            "VALUES (-1, -1, -1, -1, -1)"))
+    finally:
+        db.rollback()
+        db.close()
+    assert identity._ids == {} and identity.generation is None
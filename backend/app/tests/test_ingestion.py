@@ -0,0 +1,177 @@
+import os
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import session_scope
+from app.main import app
+from app.paperless import models
+from app.paperless.manage_database import ingestion
+from app.paperless.manage_database.ingestion import run_ingestion
+from app.tests.helpers import cleanup_paths
+
+client = TestClient(app)
+
+PREFIX = "__test_ingestion__"
+LEVELS = {"category": f"{PREFIX}cat", "utility": f"{PREFIX}ut", "year": 2099, "document_type": "paid"}
+
+
+@pytest.fixture
+def folders(tmp_path):
+    """Archivio e cartella di acquisizione temporanei."""
+    root, drop = tmp_path / "archivio", tmp_path / "acquisizione"
+    root.mkdir()
+    drop.mkdir()
+
+    with cleanup_paths(PREFIX, tuple(LEVELS.values())):
+        yield root, drop
+
+    with session_scope() as db:
+        db.query(models.PendingScan).filter(models.PendingScan.category == LEVELS["category"]).delete()
+
+
+def pending_scan(document: str, **fields) -> dict:
+    body = {**LEVELS, "document": f"{PREFIX}{document}", **fields}
+    response = client.post("/api/paperless/pending_scans/", json=body)
+    assert response.status_code == 201
+    return response.json()
+
+
+def drop_file(drop, name: str, content: bytes = b"pagina"):
+    """Deposita un file già completo (mtime oltre l'attesa di assestamento)."""
+    location = drop / name
+    location.write_bytes(content)
+    os.utime(location, (1_000_000_000, 1_000_000_000))
+    return location
+
+
+def document_folder(root, document: str):
+    return root.joinpath(*map(str, LEVELS.values()), f"{PREFIX}{document}")
+
+
+def test_ingestion_files_scan_and_registers_path(folders):
+    root, drop = folders
+    scan = pending_scan("bolletta")
+    drop_file(drop, f"{scan['id']}-2.jpg", b"seconda")
+    drop_file(drop, f"{scan['id']}-1.jpg", b"prima")
+    named = pending_scan("contratto", filename="IMG_0001.png")
+    drop_file(drop, "IMG_0001.png")
+    # Ancora in scrittura: non viene preso
+    (drop / "IMG_0002.png").write_bytes(b"incompleto")
+    pending_scan("senza file")
+
+    report = run_ingestion(root, drop)
+    assert (report.filed, report.failed, report.retried) == (2, 0, 0)
+
+    target = document_folder(root, "bolletta")
+    assert sorted(os.listdir(target)) == ["scan-2.jpg", "scan.jpg"]
+    assert (target / "scan.jpg").read_bytes() == b"prima"
+    assert os.listdir(document_folder(root, "contratto")) == ["scan.png"]
+    assert sorted(os.listdir(drop)) == ["IMG_0002.png"]
+
+    with session_scope() as db:
+        pending = db.query(models.PendingScan).filter(models.PendingScan.category.like(f"{PREFIX}%"))
+        remaining = [s.id for s in pending]
+        assert scan["id"] not in remaining and named["id"] not in remaining and len(remaining) == 1
+        files = (
+            db.query(models.DocumentFile.filename)
+            .join(models.Path, models.Path.id == models.DocumentFile.path_id)
+            .join(models.Document, models.Document.id == models.Path.document)
+            .filter(models.Document.name == f"{PREFIX}bolletta")
+        )
+        assert sorted(name for name, in files) == ["scan-2.jpg", "scan.jpg"]
+
+    # Un'altra scansione dello stesso documento non sovrascrive i file già archiviati
+    again = pending_scan("bolletta")
+    drop_file(drop, f"{again['id']}.jpg", b"terza")
+    assert run_ingestion(root, drop).filed == 1
+    assert sorted(os.listdir(target)) == ["scan-2.jpg", "scan-3.jpg", "scan.jpg"]
+
+
+def test_concurrent_workers_do_not_process_a_scan_twice(folders):
+    root, drop = folders
+    scans = [pending_scan(f"doc{i}") for i in range(8)]
+    for scan in scans:
+        drop_file(drop, f"{scan['id']}.png", str(scan["id"]).encode())
+
+    reports = []
+    workers = [threading.Thread(target=lambda: reports.append(run_ingestion(root, drop))) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert sum(report.filed for report in reports) == len(scans)
+    assert sum(report.failed + report.retried for report in reports) == 0
+    for scan in scans:
+        target = document_folder(root, scan["document"][len(PREFIX):])
+        assert os.listdir(target) == ["scan.png"]
+        assert (target / "scan.png").read_bytes() == str(scan["id"]).encode()
+    assert os.listdir(drop) == []
+
+
+def test_failed_filing_restores_files_and_rejects_invalid_scans(folders, monkeypatch):
+    root, drop = folders
+    scan = pending_scan("fattura")
+    source = drop_file(drop, f"{scan['id']}.png")
+
+    def broken(db, path_ids):
+        raise RuntimeError("disco pieno")
+
+    # Il file viene spostato e poi la transazione fallisce: il file torna nella cartella
+    # di acquisizione, il path non viene creato e dopo MAX_ATTEMPTS la voce viene scartata
+    monkeypatch.setattr(ingestion, "update_document_pages", broken)
+    report = run_ingestion(root, drop)
+    assert (report.filed, report.failed, report.retried) == (0, 1, ingestion.MAX_ATTEMPTS - 1)
+    assert source.exists() and not list(root.rglob("*.png"))
+
+    scans = client.get("/api/paperless/pending_scans/", params={"status": "failed"}).json()
+    failed = next(s for s in scans if s["id"] == scan["id"])
+    assert failed["attempts"] == ingestion.MAX_ATTEMPTS and "disco pieno" in failed["error"]
+    with session_scope() as db:
+        assert db.query(models.Document).filter(models.Document.name == f"{PREFIX}fattura").count() == 0
+
+    # Rimessa in coda, viene archiviata
+    monkeypatch.undo()
+    assert client.post(f"/api/paperless/pending_scans/{scan['id']}/retry").json()["status"] == "pending"
+    assert run_ingestion(root, drop).filed == 1
+
+    # Un file vuoto viene scartato subito, senza altri tentativi
+    empty = pending_scan("vuoto")
+    drop_file(drop, f"{empty['id']}.pdf", b"")
+    report = run_ingestion(root, drop)
+    assert (report.failed, report.retried) == (1, 0)
+    assert (drop / f"{empty['id']}.pdf").exists()
+    assert client.delete(f"/api/paperless/pending_scans/{empty['id']}").status_code == 204
+
+
+def test_scans_cannot_leave_the_archive(folders, tmp_path):
+    root, drop = folders
+    for label in ("..", "../fuori", ".nascosto", ""):
+        body = {**LEVELS, "document": label}
+        assert client.post("/api/paperless/pending_scans/", json=body).status_code == 422
+        assert client.post("/api/paperless/pending_scans/", json={**body, "document": "ok", "utility": label}).status_code == 422
+
+    # Voce inserita direttamente nel database, senza la validazione dello schema
+    with session_scope() as db:
+        scan = models.PendingScan(**LEVELS, document="../../../../../fuori")
+        db.add(scan)
+        db.commit()
+        scan_id = scan.id
+    drop_file(drop, f"{scan_id}.pdf")
+
+    # Cartella dell'utenza sostituita da un link simbolico verso l'esterno
+    outside = tmp_path / "fuori"
+    outside.mkdir()
+    root.joinpath(LEVELS["category"]).mkdir()
+    root.joinpath(LEVELS["category"], LEVELS["utility"]).symlink_to(outside)
+    linked = pending_scan("collegato")
+    drop_file(drop, f"{linked['id']}.pdf")
+
+    report = run_ingestion(root, drop)
+    assert (report.filed, report.failed, report.retried) == (0, 2, 0)
+    assert sorted(os.listdir(drop)) == sorted([f"{scan_id}.pdf", f"{linked['id']}.pdf"])
+    assert os.listdir(outside) == []
+    errors = {s["id"]: s["error"] for s in client.get("/api/paperless/pending_scans/", params={"status": "failed"}).json()}
+    assert "Nome non valido" in errors[scan_id] and "fuori dall'archivio" in errors[linked["id"]]
@@ -0,0 +1,52 @@
+from collections import namedtuple
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.config import FRONTEND_ADDRESS
+from app.main import app
+from app.paperless.models import Category, Document
+from app.paperless.routers.functions import PageParams, rows_to_dicts, schema_columns
+from app.paperless.schema.response import CategorySchema, DocumentSchema
+from app.responses import ORJSONResponse
+
+# Le righe SQLAlchemy espongono `_fields` come le namedtuple
+Row = namedtuple("Row", ["id", "name", "description", "tags"])
+
+
+def test_fields_projection_always_includes_id():
+    page = PageParams(after_id=None, limit=10, fields="name, description,name", with_total=False)
+    assert page.attrs(Category, CategorySchema) == ['id', 'name', 'description']
+    assert PageParams(after_id=None, limit=10, fields=None, with_total=False).attrs(Category, CategorySchema) is None
+
+
+def test_fields_projection_rejects_relationships_and_unknown_fields():
+    # `tags` è nello schema ma è una relazione, `pages` è una colonna non esposta
+    for fields in ("tags", "pages", "nope"):
+        with pytest.raises(HTTPException) as error:
+            PageParams(after_id=None, limit=10, fields=fields, with_total=False).attrs(Document, DocumentSchema)
+        assert error.value.status_code == 400
+
+
+def test_fast_path_builds_dicts_from_projected_rows():
+    # `tags` è una relazione: resta fuori dalle colonne e viene aggiunta con una sottoquery
+    assert schema_columns(Document, DocumentSchema) == ['id', 'name', 'description']
+
+    rows = [Row(1, "Bolletta", None, ["luce"]), Row(2, "Contratto", "firmato", [])]
+    assert rows_to_dicts(rows) == [
+        {"id": 1, "name": "Bolletta", "description": None, "tags": ["luce"]},
+        {"id": 2, "name": "Contratto", "description": "firmato", "tags": []},
+    ]
+    assert rows_to_dicts([]) == []
+    assert ORJSONResponse(rows_to_dicts(rows[:1])).body == \
+        b'[{"id":1,"name":"Bolletta","description":null,"tags":["luce"]}]'
+
+
+def test_cors_exposes_pagination_headers():
+    response = TestClient(app).get("/api/paperless/categories/", params={"limit": 1, "with_total": True},
+                                   headers={"Origin": FRONTEND_ADDRESS})
+    assert response.headers["access-control-allow-origin"] == FRONTEND_ADDRESS
+    exposed = {header.strip().lower() for header in response.headers["access-control-expose-headers"].split(",")}
+    assert {"x-next-after-id", "x-total-count", "etag"} <= exposed
+    assert "x-total-count" in response.headers
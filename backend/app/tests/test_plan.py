@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from app.paperless.manage_database.plan import SyncPlan
+from app.paperless.manage_database.tree import DB_Tree
+
+
+def make_tree(*paths):
+    tree = DB_Tree()
+    for path in paths:
+        for level, name in zip(DB_Tree.structure, path.split("/")):
+            tree.add(level, name)
+        tree.add("paths", path)
+    return tree
+
+
+def test_plan_from_trees():
+    real_tree = make_tree("Banca/Enel/2022/paid/Bolletta", "Banca/Enel/2023/paid/Bolletta")
+    db_tree = make_tree("Banca/Enel/2022/paid/Bolletta", "Salute/ASL/2022/default/Referto")
+
+    plan = SyncPlan.from_trees(real_tree, db_tree)
+
+    assert plan.create["year"] == ["2023"]
+    assert plan.create["paths"] == ["Banca/Enel/2023/paid/Bolletta"]
+    assert plan.delete["category"] == ["Salute"]
+    assert plan.counts["delete"]["paths"] == 1
+    assert not plan.is_empty()
+    assert SyncPlan.from_trees(real_tree, real_tree).is_empty()
+
+
+def test_plan_serialization_roundtrip():
+    plan = SyncPlan.from_trees(make_tree("Banca/Enel/2022/paid/Bolletta"), DB_Tree())
+
+    restored = SyncPlan.from_dict(json.loads(json.dumps(plan.to_dict())))
+
+    assert restored == plan
+
+
+def test_tree_is_compact_and_decodes_on_demand():
+    tree = make_tree("Banca/Enel/2022/paid/Bolletta", "Banca/Enel/2023/paid/Bolletta")
+
+    # Nessun __dict__: livelli e path sono insiemi di interi
+    assert not hasattr(tree, "__dict__")
+    assert all(isinstance(packed, int) for packed in tree._paths)
+    assert tree.interner.unpack(tree.interner.pack(("Banca", "Enel", "2022", "paid", "Bolletta"))) == \
+        ("Banca", "Enel", "2022", "paid", "Bolletta")
+
+    assert tree.year == {"2022", "2023"}
+    assert tree.paths == {"Banca/Enel/2022/paid/Bolletta", "Banca/Enel/2023/paid/Bolletta"}
+    assert (tree - make_tree("Banca/Enel/2022/paid/Bolletta"))["paths"] == {"Banca/Enel/2023/paid/Bolletta"}
+
+    with pytest.raises(AttributeError):
+        tree.add("nope", "x")
+
+
+def test_tree_names_are_scoped_and_views_cached():
+    real_tree = make_tree("Banca/Enel/2022/paid/Bolletta")
+    db_tree = DB_Tree(real_tree.interner)
+    db_tree.add("category", "Banca")
+    db_tree.add("paths", "Banca/Enel/2021/paid/Bolletta")
+
+    # Alberi con lo stesso dizionario dei nomi o con dizionari diversi danno la stessa differenza
+    assert (real_tree - db_tree)["paths"] == {"Banca/Enel/2022/paid/Bolletta"}
+    assert (real_tree - make_tree("Banca/Enel/2021/paid/Bolletta"))["year"] == {"2022"}
+    assert len(make_tree("Salute/ASL/2022/default/Referto").interner) == 5
+
+    # La vista decodificata viene riusata finché l'albero non cambia
+    paths = real_tree.paths
+    assert real_tree.paths is paths and isinstance(paths, frozenset)
+    real_tree.update(db_tree)
+    assert real_tree.paths == {"Banca/Enel/2022/paid/Bolletta", "Banca/Enel/2021/paid/Bolletta"}
+    assert real_tree.category == {"Banca"}
@@ -0,0 +1,94 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import session_scope
+from app.main import app
+from app.paperless import models
+from app.paperless.manage_database.files import index_files
+from app.paperless.previews import EVICTION_TARGET, PreviewCache, preview_cache
+from app.tests.helpers import cleanup_paths
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+client = TestClient(app)
+
+PREFIX = "__test_previews__"
+LEVELS = (f"{PREFIX}cat", f"{PREFIX}ut", "2099", "paid", f"{PREFIX}doc")
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    """Un path con la sua cartella documento; archivio e cache delle anteprime temporanei."""
+    path = dict(zip(("category", "utility", "year", "document_type", "document"), LEVELS))
+    with cleanup_paths(PREFIX, LEVELS[:4]):
+        assert client.post("/api/paperless/paths/batch", json=[path]).status_code == 200
+        folder = tmp_path.joinpath("archive", *LEVELS)
+        folder.mkdir(parents=True)
+        monkeypatch.setattr("app.paperless.routers.file.ARCHIVE_PATH", str(tmp_path / "archive"))
+        monkeypatch.setattr(preview_cache, "folder", tmp_path / "cache")
+
+        yield folder
+
+
+def file_ids(folder) -> dict[str, int]:
+    index_files(folder.parents[len(LEVELS) - 1], workers=1)
+    with session_scope() as db:
+        return {name: file_id for file_id, name in db.query(models.DocumentFile.id, models.DocumentFile.filename)
+                .join(models.Path).join(models.Document).filter(models.Document.name == LEVELS[-1])}
+
+
+def test_preview_is_cached_and_conditional(archive):
+    cv2.imwrite(str(archive / "scansione.png"), np.full((400, 200, 3), 255, dtype=np.uint8))
+    (archive / "note.txt").write_text("testo")
+    ids = file_ids(archive)
+    url = f"/api/paperless/files/{ids['scansione.png']}/preview"
+
+    response = client.get(url, params={"size": 100})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["cache-control"].startswith("private, max-age=")
+    image = cv2.imdecode(np.frombuffer(response.content, np.uint8), cv2.IMREAD_COLOR)
+    assert image.shape[:2] == (100, 50)
+
+    # Stessa anteprima: 304 con l'ETag, porzioni con Range
+    etag = response.headers["etag"]
+    assert client.get(url, params={"size": 100}, headers={"If-None-Match": etag}).status_code == 304
+    partial = client.get(url, params={"size": 100}, headers={"Range": "bytes=0-9"})
+    assert partial.status_code == 206 and partial.content == response.content[:10]
+    assert len(list(preview_cache.folder.rglob("*.png"))) == 1
+
+    assert client.get(f"/api/paperless/files/{ids['note.txt']}/preview").status_code == 415
+    assert client.get("/api/paperless/files/0/preview").status_code == 404
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    sources = []
+    for i in range(3):
+        source = tmp_path / f"immagine{i}.png"
+        cv2.imwrite(str(source), np.random.default_rng(i).integers(0, 255, (64, 64, 3), dtype=np.uint8))
+        sources.append(source)
+
+    cache = PreviewCache(tmp_path / "cache", max_bytes=10 ** 9)
+    first = cache.get(sources[0], "aa" * 32, 64)
+    second = cache.get(sources[1], "bb" * 32, 64)
+    os.utime(first, (1, 1))
+    os.utime(second, (2, 2))
+    # La lettura aggiorna l'mtime: la prima anteprima diventa la più recente
+    cache.get(sources[0], "aa" * 32, 64)
+
+    # Spazio sufficiente per due anteprime (anche dopo la pulizia): la terza fa eliminare
+    # quella usata meno di recente
+    cache.max_bytes = int((first.stat().st_size + second.stat().st_size) / EVICTION_TARGET) + 1
+    third = cache.get(sources[2], "cc" * 32, 64)
+    assert first.exists() and third.exists() and not second.exists()
+
+    # Un'anteprima appena restituita non viene eliminata, anche oltre la dimensione massima
+    cache.max_bytes = 1
+    fourth = cache.get(sources[1], "dd" * 32, 64)
+    assert first.exists() and third.exists() and fourth.exists()
+    os.utime(first, (1, 1))
+    cache.get(sources[0], "ee" * 32, 64)
+    assert not first.exists() and third.exists()
@@ -0,0 +1,53 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.database import session_scope
+from app.main import app
+from app.paperless import models
+from app.tests.helpers import assert_max_queries
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def tagged_documents():
+    """Assegna un tag temporaneo ai primi documenti, rimuovendolo a fine test."""
+    with session_scope() as db:
+        ids = db.execute(select(models.Document.id).order_by(models.Document.id).limit(5)).scalars().all()
+        if not ids:
+            pytest.skip("Nessun documento nel database")
+        tag = models.Tag(name="__test_query_count__")
+        db.add(tag)
+        db.flush()
+        db.add_all(models.DocumentTag(document_id=doc_id, tag_id=tag.id) for doc_id in ids)
+        tag_id = tag.id
+
+    yield ids
+
+    with session_scope() as db:
+        db.query(models.DocumentTag).filter_by(tag_id=tag_id).delete()
+        db.query(models.Tag).filter_by(id=tag_id).delete()
+
+
+def test_documents_tags_are_loaded_in_one_query(tagged_documents):
+    # Una query per i documenti e una (selectinload) per i tag dell'intera pagina
+    with assert_max_queries(2):
+        response = client.get("/api/paperless/documents/", params={"limit": 20})
+
+    assert response.status_code == 200
+    tags = {doc["id"]: doc["tags"] for doc in response.json()}
+    assert all(tags[doc_id] == ["__test_query_count__"] for doc_id in tagged_documents)
+
+
+def test_paths_listing_is_a_single_join():
+    with assert_max_queries(1):
+        response = client.get("/api/paperless/paths/", params={"limit": 50})
+
+    if response.status_code == 200 and response.json():
+        path = response.json()[0]
+        assert set(path) == {"id", "category", "utility", "year", "document_type", "document"}
+
+        with assert_max_queries(1):
+            detail = client.get(f"/api/paperless/paths/{path['id']}")
+        assert detail.json() == path
@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import text
+
+from app.database import engine, session_scope
+from app.paperless.CRUD.search import decode_cursor, encode_cursor, search_names
+
+
+def test_cursor_roundtrip():
+    cursor = encode_cursor(0.800000011920929, "document", 42)
+    assert decode_cursor(cursor) == (0.800000011920929, "document", 42)
+
+
+def test_invalid_cursor():
+    with pytest.raises(ValueError):
+        decode_cursor("non-un-cursore")
+
+
+@pytest.fixture
+def categories():
+    names = ["zzqxa_cz", "zzqxabcz", "zzqx100%"]
+    with engine.begin() as connection:
+        ids = [connection.execute(text("INSERT INTO paperless.categories (name) VALUES (:name) RETURNING id"),
+                                  {"name": name}).scalar() for name in names]
+    yield dict(zip(names, ids))
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM paperless.categories WHERE id = ANY(:ids)"), {"ids": ids})
+
+
+def test_search_names_treats_wildcards_literally(categories):
+    with session_scope() as db:
+        # '_' e '%' non fanno da caratteri jolly nel pattern ILIKE
+        assert [row.name for row in search_names(db, "a_c", kinds=["category"], limit=10)] == ["zzqxa_cz"]
+        assert [row.name for row in search_names(db, "x100%", kinds=["category"], limit=10)] == ["zzqx100%"]
+
+        rows = search_names(db, "zzqx", kinds=["category", "utility"], limit=2)
+        assert {row.kind for row in rows} == {"category"} and len(rows) == 2
+        cursor = encode_cursor(rows[-1].score, rows[-1].kind, rows[-1].id)
+        rest = search_names(db, "zzqx", kinds=["category"], limit=10, cursor=cursor)
+        assert {row.name for row in rows + rest} == set(categories)
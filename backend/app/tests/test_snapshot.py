@@ -0,0 +1,82 @@
+import os
+
+from app.paperless.manage_database import snapshot as snapshot_module
+from app.paperless.manage_database.exclusion import ExclusionFilter
+from app.paperless.manage_database.snapshot import ScanSnapshot, scan_incremental
+
+EXCLUDED = ["Nuove Acquisizioni"]
+
+
+def make_archive(root, paths):
+    for path in paths:
+        os.makedirs(root / path)
+    # Retrodata tutte le cartelle per evitare il margine di granularità dell'mtime
+    for dirpath, _, _ in os.walk(root):
+        os.utime(dirpath, ns=(1_000_000_000, 1_000_000_000))
+
+
+def test_full_scan_builds_tree(tmp_path):
+    make_archive(tmp_path, [
+        "Banca/Enel/2022/paid/Bolletta gennaio",
+        "Banca/Enel/2023/not_paid/Bolletta marzo",
+        "Nuove Acquisizioni/X/2022/paid/scan",
+    ])
+
+    tree, snapshot, stats = scan_incremental(tmp_path, ExclusionFilter(EXCLUDED))
+
+    assert tree.paths == {"Banca/Enel/2022/paid/Bolletta gennaio", "Banca/Enel/2023/not_paid/Bolletta marzo"}
+    assert tree.category == {"Banca"}
+    assert tree.year == {"2022", "2023"}
+    assert stats.reused == 0
+    assert "" in snapshot.dirs
+
+
+def test_incremental_scan_reuses_unchanged_dirs(tmp_path):
+    make_archive(tmp_path, [
+        "Banca/Enel/2022/paid/Bolletta gennaio",
+        "Salute/ASL/2022/default/Referto",
+    ])
+    _, snapshot, first = scan_incremental(tmp_path, ExclusionFilter(EXCLUDED))
+
+    # Nuovo documento: cambia solo l'mtime della cartella 'paid' di Enel
+    os.makedirs(tmp_path / "Banca/Enel/2022/paid/Bolletta febbraio")
+
+    tree, _, second = scan_incremental(tmp_path, ExclusionFilter(EXCLUDED), snapshot)
+
+    assert "Banca/Enel/2022/paid/Bolletta febbraio" in tree.paths
+    assert "Salute/ASL/2022/default/Referto" in tree.paths
+    assert second.listed == 1
+    assert second.reused == first.listed - 1
+
+
+def test_snapshot_roundtrip_and_compatibility(tmp_path):
+    make_archive(tmp_path / "archive", ["Banca/Enel/2022/paid/Bolletta"])
+    _, snapshot, _ = scan_incremental(tmp_path / "archive", ExclusionFilter(EXCLUDED))
+
+    snapshot.save(tmp_path / "snapshot.json")
+    loaded = ScanSnapshot.load(tmp_path / "snapshot.json")
+
+    assert loaded.dirs == snapshot.dirs
+    assert loaded.is_compatible(str(tmp_path / "archive"), EXCLUDED)
+    assert not loaded.is_compatible(str(tmp_path / "archive"), EXCLUDED + ["Altro"])
+    assert ScanSnapshot.load(tmp_path / "missing.json") is None
+
+
+def test_unreadable_dirs_are_skipped(tmp_path, monkeypatch):
+    make_archive(tmp_path, [
+        "Banca/Enel/2022/paid/Bolletta gennaio",
+        "Salute/ASL/2022/default/Referto",
+    ])
+    list_subdirs = snapshot_module.list_subdirs
+
+    def unreadable_asl(path, excluded, parts=()):
+        if parts == ("Salute", "ASL"):
+            raise PermissionError(13, "Permission denied", path)
+        return list_subdirs(path, excluded, parts)
+
+    monkeypatch.setattr(snapshot_module, "list_subdirs", unreadable_asl)
+    tree, snapshot, _ = scan_incremental(tmp_path, ExclusionFilter(EXCLUDED))
+
+    assert tree.paths == {"Banca/Enel/2022/paid/Bolletta gennaio"}
+    assert tree.category == {"Banca", "Salute"}
+    assert "ASL" not in tree.utility and "Salute/ASL" not in snapshot.dirs
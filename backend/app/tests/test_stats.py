@@ -0,0 +1,44 @@
+from fastapi.testclient import TestClient
+
+from app.database import session_scope
+from app.main import app
+from app.paperless.CRUD.stats import get_stats
+from app.paperless.generation import data_generation
+from app.tests.helpers import paths_from_another_process
+
+client = TestClient(app)
+
+PREFIX = "__test_stats__"
+LEVELS = (f"{PREFIX}cat", f"{PREFIX}ut", 2096, "paid")
+
+
+def test_stats_group_and_filter_levels():
+    documents = [f"{PREFIX}doc{i}" for i in range(3)]
+    with paths_from_another_process(LEVELS, documents), \
+            paths_from_another_process((*LEVELS[:2], 2096, "not_paid"), [f"{PREFIX}altro"]):
+        data_generation.refresh()
+        with session_scope() as db:
+            rows = get_stats(db, ["year", "document_type"], {"category": LEVELS[0], "utility": None})
+        assert rows == [
+            {"year": 2096, "document_type": "not_paid", "count": 1},
+            {"year": 2096, "document_type": "paid", "count": 3},
+        ]
+
+        response = client.get("/api/paperless/stats/", params={"by": ["utility", "utility"], "category": LEVELS[0]})
+        assert response.json() == {"group_by": ["utility"], "total": 4, "rows": [{"utility": LEVELS[1], "count": 4}]}
+
+        filtered = client.get("/api/paperless/stats/", params={"category": LEVELS[0], "document_type": "paid"}).json()
+        assert filtered["rows"] == [{"category": LEVELS[0], "count": 3}]
+
+
+def test_stats_follow_writes_from_another_process(monkeypatch):
+    monkeypatch.setattr(data_generation, "ttl", 0)
+    params = {"category": LEVELS[0]}
+    with paths_from_another_process(LEVELS, [f"{PREFIX}doc"]):
+        assert client.get("/api/paperless/stats/", params=params).json()["total"] == 1
+
+        # Nessun hook di sincronizzazione: la nuova generazione basta a scartare il risultato in cache
+        with paths_from_another_process(LEVELS, [f"{PREFIX}doc2"]):
+            assert client.get("/api/paperless/stats/", params=params).json()["total"] == 2
+        assert client.get("/api/paperless/stats/", params=params).json()["total"] == 1
+    assert client.get("/api/paperless/stats/", params=params).json()["total"] == 0
@@ -0,0 +1,201 @@
+import json
+import shutil
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import session_scope
+from app.main import app
+from app.paperless.manage_database import jobs
+from app.paperless.manage_database.bulk import load_state
+from app.paperless.manage_database.core import get_db_tree, get_needed_models, sync_db
+from app.paperless.manage_database.jobs import SyncInProgress, SyncJob, start_sync_job
+from app.paperless.models import Document, Path
+
+client = TestClient(app)
+
+PREFIX = "__test_sync__"
+DOCUMENTS = 20
+NEW_PATHS = [f"{PREFIX}cat/{PREFIX}ut/2099/paid/{PREFIX}doc{i}" for i in range(DOCUMENTS)]
+
+
+def database_state() -> tuple[dict, frozenset]:
+    """Nomi per livello e path del database, confrontabili tra sincronizzazioni diverse (senza id)."""
+    with session_scope() as db:
+        tree = get_db_tree(db, get_needed_models())
+    return tree.dict(), tree.paths
+
+
+@pytest.fixture
+def archive(tmp_path):
+    """
+    Archivio temporaneo con la stessa struttura del database: una sincronizzazione
+    su di esso non modifica nulla finché il test non aggiunge o toglie cartelle.
+    """
+    root = tmp_path / "_amministrazione"
+    levels, paths = database_state()
+    if not paths and any(levels.values()):
+        pytest.skip("Il database contiene livelli senza path")
+    for path in paths:
+        (root / path).mkdir(parents=True)
+
+    # I livelli non usati da nessun path vengono appesi al primo path esistente
+    first = next(iter(paths), None)
+    parents = first.split("/") if first else []
+    used = {level: {path.split("/")[i] for path in paths} for i, level in enumerate(levels)}
+    for depth, (level, names) in enumerate(levels.items()):
+        orphans = names - used[level]
+        if orphans and (depth == 4 or len(parents) < depth):
+            pytest.skip("Il database contiene livelli senza path")
+        for name in orphans:
+            root.joinpath(*parents[:depth], name).mkdir(parents=True, exist_ok=True)
+
+    sync_db(root)
+    baseline = database_state()
+    try:
+        yield root, baseline
+    finally:
+        for path in NEW_PATHS:
+            shutil.rmtree(root / path.split("/")[0], ignore_errors=True)
+        sync_db(root, bulk=True)
+
+
+def add_documents(root):
+    for path in NEW_PATHS:
+        (root / path).mkdir(parents=True)
+
+
+def remove_documents(root):
+    shutil.rmtree(root / NEW_PATHS[0].split("/")[0])
+
+
+def test_bulk_and_classic_sync_reach_the_same_state(archive):
+    root, baseline = archive
+
+    add_documents(root)
+    classic = sync_db(root)
+    after_classic = database_state()
+    assert classic.created["paths"] == DOCUMENTS and classic.created["category"] == 1
+    assert after_classic[1] - baseline[1] == set(NEW_PATHS)
+
+    remove_documents(root)
+    removed = sync_db(root, bulk=True)
+    assert removed.removed["paths"] == DOCUMENTS
+    assert database_state() == baseline
+
+    add_documents(root)
+    bulk = sync_db(root, bulk=True)
+    assert database_state() == after_classic
+    assert (bulk.created, bulk.removed) == (classic.created, classic.removed)
+
+    remove_documents(root)
+    sync_db(root)
+    assert database_state() == baseline
+
+    # Il motore bulk esegue un numero di round trip che non dipende dalle voci:
+    # lock, stato, un INSERT per livello e per i path, commit
+    assert bulk.round_trips <= 12 < classic.round_trips
+    assert removed.round_trips <= 12
+
+
+def test_bulk_sync_with_duplicate_document_names(archive):
+    root, baseline = archive
+    add_documents(root)
+    sync_db(root, bulk=True)
+
+    # Il nome dei documenti non è univoco: un secondo documento omonimo sotto gli stessi livelli
+    name = NEW_PATHS[0].rsplit("/", 1)[1]
+    with session_scope() as db:
+        first = db.query(Path).join(Document, Path.document == Document.id).filter(Document.name == name).one()
+        twin = Document(name=name)
+        db.add(twin)
+        db.flush()
+        duplicate = Path(category=first.category, utility=first.utility, year=first.year,
+                         document_type=first.document_type, document=twin.id)
+        db.add(duplicate)
+        db.flush()
+        first_ids, twin_ids = (first.id, first.document), (duplicate.id, twin.id)
+
+    try:
+        with session_scope() as db:
+            state = load_state(db, get_needed_models())
+        # Vince l'id più basso, come nell'identity map
+        assert state.names["document"][name] == first_ids[1]
+        assert state.paths[NEW_PATHS[0]] == first_ids[0]
+
+        report = sync_db(root, bulk=True)
+        assert not any(report.created.values()) and not any(report.removed.values())
+        assert database_state()[1] - baseline[1] == set(NEW_PATHS)
+    finally:
+        with session_scope() as db:
+            db.query(Path).filter(Path.id == twin_ids[0]).delete()
+            db.query(Document).filter(Document.id == twin_ids[1]).delete()
+
+
+def test_sync_job_state_and_stream():
+    job = SyncJob()
+
+    def run():
+        job.update("scan")
+        for processed in range(1, 4):
+            job.update("apply", processed, 3)
+        job.finish(report={"created": {}, "removed": {}, "round_trips": 0})
+
+    worker = threading.Thread(target=run)
+    worker.start()
+    states = list(job.stream(heartbeat=1, min_interval=0))
+    worker.join()
+
+    # Lo stream termina con lo stato finale, senza eventi dopo la conclusione
+    assert states[-1]["status"] == "done" and states[-1]["phase"] == "done"
+    assert all(state["status"] == "running" for state in states[:-1])
+    assert states[-1]["report"]["round_trips"] == 0
+    assert job.finished and job.state()["job_id"] == job.id
+
+    failed = SyncJob()
+    failed.finish(error="disco pieno")
+    assert (failed.state()["status"], failed.state()["error"]) == ("failed", "disco pieno")
+
+
+def test_sync_job_streams_ndjson_until_done(archive, monkeypatch):
+    root, baseline = archive
+    monkeypatch.setattr("app.paperless.routers.sync.ARCHIVE_PATH", root)
+    add_documents(root)
+
+    response = client.post("/api/paperless/sync/jobs", json={"files": False})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    with client.stream("GET", f"/api/paperless/sync/jobs/{job_id}/progress") as stream:
+        assert stream.headers["content-type"].startswith("application/x-ndjson")
+        states = [json.loads(line) for line in stream.iter_lines() if line]
+
+    assert {state["job_id"] for state in states} == {job_id}
+    assert states[-1]["status"] == "done"
+    assert states[-1]["report"]["created"]["paths"] == DOCUMENTS
+    final = client.get(f"/api/paperless/sync/jobs/{job_id}").json()
+    assert (final["status"], final["report"]["created"]) == ("done", states[-1]["report"]["created"])
+    assert database_state()[1] - baseline[1] == set(NEW_PATHS)
+    assert client.get("/api/paperless/sync/jobs/sconosciuto").status_code == 404
+
+
+def test_concurrent_sync_job_is_rejected(monkeypatch):
+    release = threading.Event()
+
+    def blocked_sync(path, progress, **options):
+        progress("scan")
+        release.wait(10)
+        raise RuntimeError("interrotta")
+
+    monkeypatch.setattr(jobs, "sync_db", blocked_sync)
+    job = start_sync_job("/non/usato")
+    try:
+        with pytest.raises(SyncInProgress):
+            start_sync_job("/non/usato")
+        assert client.post("/api/paperless/sync/jobs", json={"files": False}).status_code == 409
+    finally:
+        release.set()
+
+    states = list(job.stream(min_interval=0))
+    assert (states[-1]["status"], states[-1]["error"]) == ("failed", "interrotta")
@@ -0,0 +1,64 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import session_scope
+from app.main import app
+from app.paperless.CRUD.tree import escape_like, get_paths_under, get_tree_children
+from app.paperless.generation import data_generation
+from app.tests.helpers import paths_from_another_process
+
+client = TestClient(app)
+
+PREFIX = "__test_tree__"
+
+
+def test_escape_like_protects_wildcards():
+    assert escape_like("Banca/Enel") == "Banca/Enel"
+    assert escape_like("100%_saldo") == "100\\%\\_saldo"
+    assert escape_like("a\\b") == "a\\\\b"
+
+
+@pytest.fixture
+def outside_paths(monkeypatch):
+    """
+    Due documenti (uno con '%' nel nome) inseriti da "un altro processo" (vedi
+    `paths_from_another_process`). Restituisce i nomi dei livelli e la funzione
+    che elimina i path allo stesso modo.
+    """
+    # Generazione dei dati riletta a ogni richiesta, invece che dopo il TTL
+    monkeypatch.setattr(data_generation, "ttl", 0)
+    levels = (f"{PREFIX}cat", f"{PREFIX}ut", 2097, "paid")
+    with paths_from_another_process(levels, [f"{PREFIX}100%", f"{PREFIX}bolletta"]) as delete:
+        yield tuple(map(str, levels)), delete
+
+
+def test_tree_children_follow_writes_from_another_process(outside_paths):
+    levels, delete_outside = outside_paths
+
+    with session_scope() as db:
+        categories = {row.name: row.count for row in get_tree_children(db, ())}
+        assert categories[levels[0]] == 2
+        children = get_tree_children(db, levels)
+        assert [(row.name, row.count) for row in children] == [(f"{PREFIX}100%", 1), (f"{PREFIX}bolletta", 1)]
+        assert get_paths_under(db, levels) == [(*levels, f"{PREFIX}100%"), (*levels, f"{PREFIX}bolletta")]
+        # '%' nel prefisso non fa da carattere jolly
+        assert get_paths_under(db, (levels[0], f"{PREFIX}u%")) == []
+
+    delete_outside()
+    with session_scope() as db:
+        assert levels[0] not in {row.name for row in get_tree_children(db, ())}
+
+
+def test_tree_router_levels(outside_paths):
+    levels, _ = outside_paths
+
+    root = client.get("/api/paperless/tree/").json()
+    assert root["level"] == "category" and root["prefix"] == ""
+    assert {child["name"]: child["count"] for child in root["children"]}[levels[0]] == 2
+
+    level = client.get("/api/paperless/tree/", params={"prefix": "/".join(levels[:2])}).json()
+    assert level["level"] == "year"
+    assert [(child["name"], child["count"]) for child in level["children"]] == [("2097", 2)]
+
+    document = "/".join((*levels, f"{PREFIX}bolletta"))
+    assert client.get("/api/paperless/tree/", params={"prefix": document}).status_code == 400
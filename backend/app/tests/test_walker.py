@@ -0,0 +1,75 @@
+import os
+
+from app.paperless.manage_database.core import get_real_tree
+from app.paperless.manage_database.exclusion import ExclusionFilter
+from app.paperless.manage_database.walker import walk_parallel, walk_subtree
+
+PATHS = [
+    "Banca/Enel/2022/paid/Bolletta gennaio",
+    "Banca/Enel/2022/not_paid/Bolletta febbraio",
+    "Banca/Poste/2021/default/Estratto conto",
+    "Salute/ASL/2023/default/Referto",
+    "Salute/Vuota",
+]
+
+
+def make_archive(root):
+    for path in PATHS:
+        os.makedirs(root / path)
+    os.makedirs(root / "Nuove Acquisizioni/X/2022/paid/scan")
+
+
+def test_parallel_walk_matches_os_walk(tmp_path):
+    # get_real_tree ricava i livelli dal path dopo la cartella '_amministrazione'
+    root = tmp_path / "_amministrazione"
+    make_archive(root)
+    os.makedirs(root / "Banca/Enel/2022/paid/Bolletta gennaio/allegati")
+    os.makedirs(root / "Banca/Enel/2022/paid_backup/Bolletta vecchia")
+    excluded = ["Nuove Acquisizioni", "*_backup"]
+
+    expected = get_real_tree(root, excluded=ExclusionFilter(excluded))
+    tree = walk_parallel(root, ExclusionFilter(excluded), workers=4)
+
+    assert tree.dict() == expected.dict()
+    assert tree.paths == expected.paths
+    assert "Vuota" in tree.utility
+    assert "X" not in tree.utility
+
+
+def test_walk_subtree_stops_at_document_level(tmp_path):
+    os.makedirs(tmp_path / "Banca/Enel/2022/paid/Bolletta/allegati")
+
+    tree = walk_subtree(str(tmp_path), ("Banca", "Enel"), ExclusionFilter([]))
+
+    assert tree.paths == {"Banca/Enel/2022/paid/Bolletta"}
+    assert tree.category == set()
+    assert tree.utility == {"Enel"}
+
+
+def test_excluded_branches_are_pruned_at_any_depth(tmp_path):
+    make_archive(tmp_path)
+    os.makedirs(tmp_path / "Banca/Enel/2022/paid_backup/Bolletta vecchia")
+    os.makedirs(tmp_path / "Salute/ASL/2023/default/.cache")
+    excluded = ExclusionFilter(["Nuove Acquisizioni", "*_backup", ".*", "Banca/Poste"])
+
+    tree = walk_parallel(tmp_path, excluded, workers=2)
+
+    assert tree.paths == {
+        "Banca/Enel/2022/paid/Bolletta gennaio",
+        "Banca/Enel/2022/not_paid/Bolletta febbraio",
+        "Salute/ASL/2023/default/Referto",
+    }
+    assert "Poste" not in tree.utility
+    assert "paid_backup" not in tree.document_type
+    assert excluded.skipped == 4
+
+
+def test_exclusion_filter_matches_names_and_paths():
+    excluded = ExclusionFilter(["Altro", ".*", "Banca/*/2019"])
+
+    assert excluded.matches(("Banca", "Altro"))
+    assert excluded.matches((".Nuove Acquisizioni_backup",))
+    assert excluded.matches(("Banca", "Enel", "2019"))
+    assert not excluded.matches(("Salute", "ASL", "2019"))
+    assert excluded.prune(("Banca",), ["Enel", "Altro", ".DS"]) == ["Enel"]
+    assert excluded.skipped == 2
@@ -0,0 +1,148 @@
+import os
+
+import pytest
+
+from app.database import session_scope
+from app.paperless.manage_database.core import get_all_path_labels
+from app.paperless.manage_database.exclusion import ExclusionFilter
+from app.paperless.manage_database.tree import DB_Tree
+from app.paperless.manage_database.watcher import InotifySource, Watcher, collapse, scan_subtree
+from app.tests.helpers import cleanup_paths
+
+PREFIX = "__test_watcher__"
+LEVELS = (f"{PREFIX}cat", f"{PREFIX}ut", "2099", "paid")
+
+
+def test_collapse_keeps_outermost_keys():
+    keys = {("Banca",), ("Banca", "Enel"), ("Banca", "Enel", "2022"), ("Salute", "ASL")}
+
+    assert sorted(collapse(keys)) == [("Banca",), ("Salute", "ASL")]
+    assert collapse({()} | keys) == [()]
+
+
+def test_scan_subtree_includes_prefix_levels(tmp_path):
+    os.makedirs(tmp_path / "Banca/Enel/2022/paid/Bolletta gennaio")
+    os.makedirs(tmp_path / "Banca/Enel/2022/paid/Nuove Acquisizioni/x")
+    os.makedirs(tmp_path / "Banca/Poste/2022/paid/Estratto conto")
+
+    tree = DB_Tree()
+    scan_subtree(str(tmp_path), ("Banca", "Enel"), ExclusionFilter(["Nuove Acquisizioni"]), tree)
+
+    assert tree.paths == {"Banca/Enel/2022/paid/Bolletta gennaio"}
+    assert tree.category == {"Banca"}
+    assert tree.utility == {"Enel"}
+
+
+def test_scan_subtree_of_missing_folder_is_empty(tmp_path):
+    tree = DB_Tree()
+    scan_subtree(str(tmp_path), ("Banca", "Enel"), ExclusionFilter([]), tree)
+
+    assert tree.paths == set()
+    assert tree.category == set()
+
+
+class ScriptedSource:
+    """Sorgente che restituisce le chiavi indicate, una attesa alla volta, poi ferma il watcher."""
+
+    def __init__(self, watcher, batches):
+        self.watcher = watcher
+        self.batches = list(batches)
+
+    def wait(self, timeout):
+        if not self.batches:
+            self.watcher._stop.set()
+            return set()
+        return self.batches.pop(0)
+
+    def close(self):
+        pass
+
+
+def run_scripted(monkeypatch, batches, **options) -> list[set]:
+    """Esegue il ciclo del watcher sulle chiavi `batches` e restituisce le chiavi di ogni flush."""
+    flushed = []
+    watcher = Watcher("/non/usato", **options)
+    monkeypatch.setattr(watcher, "_source", lambda excluded: ScriptedSource(watcher, batches))
+    monkeypatch.setattr(watcher, "flush", lambda keys, excluded: flushed.append(set(keys)))
+    watcher.run()
+    return flushed
+
+
+def test_watcher_debounces_events_into_one_flush(monkeypatch):
+    a, b, c = ("Banca",), ("Banca", "Enel"), ("Salute",)
+
+    # Gli eventi arrivati senza pause vengono applicati insieme quando il file system torna quieto
+    assert run_scripted(monkeypatch, [{a}, {b}, {c}, set()]) == [{a, b, c}]
+    # Con un'attesa massima nulla ogni gruppo di eventi viene applicato subito
+    assert run_scripted(monkeypatch, [{a}, {b}, set()], max_delay=0) == [{a}, {b}]
+
+
+def test_inotify_events_become_dirty_keys(tmp_path):
+    pytest.importorskip("inotify_simple")
+    os.makedirs(tmp_path / "Banca/Enel/2022/paid")
+    os.makedirs(tmp_path / "Banca/Enel/2022/paid/Vecchia")
+    os.makedirs(tmp_path / "Banca/Enel/2022/paid/Rimossa")
+
+    source = InotifySource(str(tmp_path), ExclusionFilter(["Nuove Acquisizioni"]))
+    try:
+        paid = tmp_path / "Banca/Enel/2022/paid"
+        os.mkdir(paid / "Nuova")
+        os.mkdir(paid / "Nuove Acquisizioni")
+        (paid / "file.pdf").touch()
+        os.rename(paid / "Vecchia", paid / "Rinominata")
+        os.rmdir(paid / "Rimossa")
+        os.makedirs(tmp_path / "Salute/ASL")
+
+        parent = ("Banca", "Enel", "2022", "paid")
+        # Creazione, rinomina (entrambi i nomi) ed eliminazione; file ed esclusioni ignorati
+        assert source.wait(1) == {
+            parent + ("Nuova",), parent + ("Vecchia",), parent + ("Rinominata",), parent + ("Rimossa",),
+            ("Salute",)
+        }
+
+        # Una cartella nuova viene sorvegliata a sua volta
+        os.mkdir(tmp_path / "Salute/ASL/2023")
+        assert source.wait(1) == {("Salute", "ASL", "2023")}
+    finally:
+        source.close()
+
+
+def test_inotify_overflow_rescans_the_whole_archive(tmp_path):
+    inotify_simple = pytest.importorskip("inotify_simple")
+
+    class OverflowingINotify:
+        def read(self, timeout=None):
+            return [inotify_simple.Event(wd=-1, mask=inotify_simple.flags.Q_OVERFLOW, cookie=0, name="")]
+
+        def close(self):
+            pass
+
+    source = InotifySource(str(tmp_path), ExclusionFilter([]))
+    source.inotify.close()
+    source.inotify = OverflowingINotify()
+
+    # La chiave vuota è la radice: `collapse` la fa assorbire ogni altra chiave
+    assert source.wait(1) == {()}
+
+
+def test_watcher_flush_applies_create_rename_and_delete(tmp_path):
+    parent = tmp_path.joinpath(*LEVELS)
+    os.makedirs(parent / f"{PREFIX}A")
+    os.makedirs(parent / f"{PREFIX}B")
+    watcher = Watcher(tmp_path)
+    excluded = ExclusionFilter([])
+
+    def db_paths():
+        with session_scope() as db:
+            return set(get_all_path_labels(db, "posix", prefix=LEVELS[:1]))
+
+    with cleanup_paths(PREFIX, (LEVELS[0], LEVELS[1], 2099, "paid")):
+        # Creazione: la chiave della categoria copre l'intero sottoalbero
+        watcher.flush({LEVELS[:1], LEVELS + (f"{PREFIX}A",)}, excluded)
+        assert db_paths() == {"/".join(LEVELS + (name,)) for name in (f"{PREFIX}A", f"{PREFIX}B")}
+
+        # Rinomina ed eliminazione, con le chiavi prodotte dagli eventi
+        os.rename(parent / f"{PREFIX}A", parent / f"{PREFIX}C")
+        os.rmdir(parent / f"{PREFIX}B")
+        watcher.flush({LEVELS + (f"{PREFIX}A",), LEVELS + (f"{PREFIX}C",), LEVELS + (f"{PREFIX}B",)}, excluded)
+        assert db_paths() == {"/".join(LEVELS + (f"{PREFIX}C",))}
@@ -0,0 +1,137 @@
+# backend/bin/bench_serialization.py
+
+"""
+Confronta i due modi di servire l'elenco dei documenti:
+
+- ORM: oggetti `Document` con i tag caricati da `selectinload`, validati riga per riga
+  da `DocumentSchema` e serializzati con `json.dumps` (il percorso di `response_model`);
+- veloce: proiezione SQL con i tag in una sottoquery, righe convertite direttamente in
+  dizionari (`rows_to_dicts`) e serializzate con orjson (`ORJSONResponse`).
+
+I documenti di prova vengono inseriti in una transazione che al termine viene annullata,
+quindi il database non viene modificato.
+
+Uso (dalla cartella backend):
+    python -m bin.bench_serialization --rows 50000 --repeat 5
+"""
+
+import argparse
+import json
+import time
+from typing import Callable
+
+from sqlalchemy import insert
+
+from app.database import SessionLocal
+# I router vanno importati prima dei moduli CRUD, che a loro volta importano i router
+from app.paperless.routers.functions import rows_to_dicts, schema_columns
+from app.paperless.CRUD.document import get_all_documents
+from app.paperless.models import Document, DocumentTag, Tag
+from app.paperless.schema.response import DocumentSchema
+from app.responses import ORJSONResponse
+
+
+def seed(db, rows: int):
+    """
+    Inserisce `rows` documenti di prova, uno su tre con due tag.
+
+    :param db: Sessione del database (la transazione verrà annullata).
+    :param rows: Numero di documenti da inserire.
+    """
+    tag_ids = db.execute(
+        insert(Tag).returning(Tag.id),
+        [{"name": f"bench-tag-{i}"} for i in range(10)]
+    ).scalars().all()
+    document_ids = db.execute(
+        insert(Document).returning(Document.id),
+        [{"name": f"Documento di prova {i:06d}", "description": "benchmark" if i % 2 else None}
+         for i in range(rows)]
+    ).scalars().all()
+    db.execute(insert(DocumentTag), [
+        {"document_id": document_id, "tag_id": tag_ids[(i + k) % len(tag_ids)]}
+        for i, document_id in enumerate(document_ids) if i % 3 == 0
+        for k in range(2)
+    ])
+    db.flush()
+
+
+def orm_path(db) -> tuple[bytes, dict]:
+    timings = {}
+    start = time.perf_counter()
+    rows = get_all_documents(db)
+    timings["query"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data = [DocumentSchema.model_validate(row).model_dump() for row in rows]
+    timings["validate"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+    timings["serialize"] = time.perf_counter() - start
+    # Gli oggetti restano nella identity map: li si rimuove per non falsare la ripetizione successiva
+    db.expunge_all()
+    return body, timings
+
+
+def fast_path(db) -> tuple[bytes, dict]:
+    timings = {}
+    start = time.perf_counter()
+    rows = get_all_documents(db, attrs=schema_columns(Document, DocumentSchema), with_tags=True)
+    timings["query"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data = rows_to_dicts(rows)
+    timings["validate"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    body = ORJSONResponse(data).body
+    timings["serialize"] = time.perf_counter() - start
+    return body, timings
+
+
+def best_of(path: Callable, db, repeat: int) -> tuple[bytes, dict]:
+    """Esegue `path` `repeat` volte e restituisce, per ogni fase, il tempo migliore."""
+    best = {}
+    body = b""
+    for _ in range(repeat):
+        body, timings = path(db)
+        for phase, elapsed in timings.items():
+            best[phase] = min(best.get(phase, elapsed), elapsed)
+    return body, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark della serializzazione di /documents/")
+    parser.add_argument("--rows", type=int, default=50_000, help="documenti di prova da inserire")
+    parser.add_argument("--repeat", type=int, default=5, help="ripetizioni per percorso")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        seed(db, args.rows)
+        total = db.query(Document).count()
+        print(f"Documenti nella tabella: {total}")
+
+        results = {}
+        for name, path in (("orm", orm_path), ("fast", fast_path)):
+            body, timings = best_of(path, db, args.repeat)
+            timings["total"] = sum(timings.values())
+            results[name] = (body, timings)
+
+        # I due percorsi devono produrre lo stesso contenuto (a meno dell'ordine dei tag)
+        def normalize(body):
+            return [{**item, "tags": sorted(item["tags"])} for item in json.loads(body)]
+        assert normalize(results["orm"][0]) == normalize(results["fast"][0]), "I due percorsi differiscono"
+
+        print(f"{'fase':<10}{'orm (ms)':>12}{'fast (ms)':>12}{'speedup':>10}")
+        for phase in ("query", "validate", "serialize", "total"):
+            orm, fast = results["orm"][1][phase], results["fast"][1][phase]
+            speedup = f"{orm / fast:.1f}x" if fast else "-"
+            print(f"{phase:<10}{orm * 1000:>12.1f}{fast * 1000:>12.1f}{speedup:>10}")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -174,7 +174,8 @@ if [ -z "$(ls -A "$MIGRATIONS_DIR")" ]; then
         echo "✅ Migrazione iniziale creata"
     fi
 else
-    echo "✅ Migrazioni già presenti"
+    echo "✅ Migrazioni già presenti. Aggiorno il database all'ultima revisione..."
+    ALEMBIC_SCHEMA=paperless alembic -c backend/alembic.ini upgrade head
 fi
 
 # 1️⃣4️⃣ Aggiunta degli alias personalizzati (solo su Zsh e sistemi Unix-like)